@@ -0,0 +1,274 @@
+"""
+Admission module for the backend.
+
+This module bounds the inbound load on the extraction endpoints: a limited number of
+requests run at once, a bounded queue holds the next ones, and anything beyond that is
+shed straight away with 429 (queue full) or 503 (waited too long) and a Retry-After
+header. Every admitted request also gets a deadline, taken from the x-request-timeout
+header or the endpoint's default, which cancels its outstanding LLM calls when it expires.
+"""
+
+import asyncio
+import contextvars
+import math
+import time
+from collections import deque
+from typing import Optional
+
+from starlette.responses import JSONResponse
+
+from backend.config import (
+    ADMISSION_ENABLED,
+    ADMISSION_MAX_IN_FLIGHT,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_QUEUE_TIMEOUT,
+    REQUEST_TIMEOUT,
+    BATCH_REQUEST_TIMEOUT,
+    REQUEST_TIMEOUT_MAX,
+    REQUEST_TIMEOUTS,
+)
+
+# Path prefixes of the endpoints that do extraction work and are admission controlled
+ADMITTED_PREFIXES = ("/extract", "/sync")
+DEADLINE_HEADER = b"x-request-timeout"
+# Extra time given to the app after the deadline, so per-call deadline errors (and partial
+# batch results) are reported before the whole request is cut off
+DEADLINE_GRACE = 0.5
+
+# Event-loop time by which the current request must be answered (None: no deadline)
+request_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+class DeadlineExceeded(Exception):
+    """
+    The current request's deadline passed before the work could finish.
+    """
+
+class Overloaded(Exception):
+    """
+    A request was shed by admission control.
+    """
+    def __init__(self, status_code: int, retry_after: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.detail = detail
+
+def deadline_remaining() -> Optional[float]:
+    """
+    Seconds left before the current request's deadline, or None when it has none.
+    """
+    deadline = request_deadline.get()
+    return None if deadline is None else deadline - asyncio.get_running_loop().time()
+
+async def within_deadline(awaitable):
+    """
+    Await `awaitable`, cancelling it when the current request's deadline passes.
+
+    Raises:
+        DeadlineExceeded: The deadline has passed (the work is not started if it already had).
+        A TimeoutError raised by the work itself propagates unchanged.
+    """
+    remaining = deadline_remaining()
+    if remaining is None:
+        return await awaitable
+    if remaining <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded("Request deadline exceeded")
+    expiry = asyncio.timeout_at(request_deadline.get())
+    try:
+        async with expiry:
+            return await awaitable
+    except TimeoutError:
+        if not expiry.expired():
+            raise
+        raise DeadlineExceeded("Request deadline exceeded") from None
+
+def request_timeout(path: str, headers) -> Optional[float]:
+    """
+    Deadline in seconds for a request: the x-request-timeout header if valid (capped by
+    REQUEST_TIMEOUT_MAX), else the path's configured default. None means no deadline.
+    """
+    raw = dict(headers).get(DEADLINE_HEADER)
+    if raw:
+        try:
+            requested = float(raw)
+        except ValueError:
+            requested = 0.0
+        if requested > 0 and math.isfinite(requested):
+            return min(requested, REQUEST_TIMEOUT_MAX)
+    if path in REQUEST_TIMEOUTS:
+        timeout = REQUEST_TIMEOUTS[path]
+    elif "-batch" in path or path == "/sync":
+        timeout = BATCH_REQUEST_TIMEOUT
+    else:
+        timeout = REQUEST_TIMEOUT
+    return timeout if timeout > 0 else None
+
+class AdmissionController:
+    """
+    Bounded concurrency with a bounded FIFO queue. A released slot is handed directly
+    to the oldest waiter, so queued requests are never overtaken by new arrivals.
+    """
+    def __init__(self, max_in_flight: int = ADMISSION_MAX_IN_FLIGHT, max_queue: int = ADMISSION_MAX_QUEUE,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: deque = deque()
+        # Moving average of how long admitted requests hold their slot, for Retry-After
+        self.service_time = 1.0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.deadline_exceeded = 0
+
+    def retry_after(self) -> int:
+        """
+        Seconds a shed client should wait: roughly the time to drain the current queue.
+        """
+        slots = max(1, self.max_in_flight)
+        return max(1, math.ceil(self.service_time * (len(self._waiters) + 1) / slots))
+
+    async def acquire(self, timeout: Optional[float] = None) -> None:
+        """
+        Take a slot, waiting in the queue for at most ADMISSION_QUEUE_TIMEOUT (or `timeout`).
+
+        Raises:
+            Overloaded: 429 when the queue is full, 503 when no slot freed up in time.
+        """
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(429, self.retry_after(), "Too many requests, retry later")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self.queued += 1
+        wait = self.queue_timeout if timeout is None else min(self.queue_timeout, timeout)
+        expiry = asyncio.timeout(wait)
+        try:
+            async with expiry:
+                await future
+        except TimeoutError:
+            self._forget(future)
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as the wait expired; pass it on
+                self.release()
+            if not expiry.expired():
+                raise
+            self.timed_out += 1
+            raise Overloaded(503, self.retry_after(), "Server busy, retry later") from None
+        except asyncio.CancelledError:
+            self._forget(future)
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as the caller went away; pass it on
+                self.release()
+            raise
+        self.admitted += 1
+
+    def release(self, seconds: Optional[float] = None) -> None:
+        """
+        Give the slot to the oldest waiter, or free it.
+        """
+        if seconds is not None:
+            self.service_time = 0.8 * self.service_time + 0.2 * seconds
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _forget(self, future: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(future)
+        except ValueError:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "deadline_exceeded": self.deadline_exceeded,
+            "service_time": round(self.service_time, 4),
+        }
+
+_controller: Optional[AdmissionController] = None
+
+def get_admission_controller() -> AdmissionController:
+    """
+    Return the process-wide admission controller, creating it on first use.
+    """
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController()
+    return _controller
+
+def admission_stats() -> dict:
+    """
+    Admission counters for /stats and /metrics.
+    """
+    return get_admission_controller().stats()
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying admission control and request deadlines to the extraction
+    endpoints. Plain ASGI, so streamed request and response bodies are untouched.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ADMISSION_ENABLED or not scope["path"].startswith(ADMITTED_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        loop = asyncio.get_running_loop()
+        timeout = request_timeout(scope["path"], scope.get("headers", []))
+        deadline = loop.time() + timeout if timeout is not None else None
+        controller = get_admission_controller()
+        try:
+            await controller.acquire(timeout)
+        except Overloaded as exc:
+            response = JSONResponse({"detail": exc.detail}, status_code=exc.status_code,
+                                    headers={"Retry-After": str(exc.retry_after)})
+            await response(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        token = request_deadline.set(deadline)
+        response_started = False
+
+        async def send_tracking(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        # Only this deadline's own expiry is a 504 here; any other TimeoutError from the
+        # app (a pool timeout, a handler's own wait_for) takes the normal error path
+        expiry = asyncio.timeout_at(deadline + DEADLINE_GRACE if deadline is not None else None)
+        try:
+            async with expiry:
+                await self.app(scope, receive, send_tracking)
+        except TimeoutError:
+            if not expiry.expired():
+                raise
+            controller.deadline_exceeded += 1
+            if not response_started:
+                await JSONResponse({"detail": "Request deadline exceeded"}, status_code=504)(scope, receive, send)
+        finally:
+            request_deadline.reset(token)
+            controller.release(time.perf_counter() - started)
@@ -0,0 +1,228 @@
+"""
+Batch module for the backend.
+
+This module runs many products through the models layer with bounded concurrency,
+isolating failures so that one bad or slow product never fails the whole batch.
+"""
+
+import asyncio
+import logging
+from typing import AsyncIterator, List, Optional, Union
+
+import openai
+from pydantic import ValidationError
+
+from backend.admission import DeadlineExceeded
+from backend.config import BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY, BATCH_ITEM_TIMEOUT
+from backend.models import run_extraction_basic_async, run_targeted_prompt_async, run_hybrid_pipeline_async
+from backend.packing import plan_packs, run_pack_async
+from backend.ratelimit import priority, PRIORITY_BATCH
+from backend.schemas import (
+    BatchItem,
+    BatchItemResult,
+    CleanedBatchItemResult,
+    ExtractBatchResponse,
+    CleanedExtractBatchResponse,
+)
+
+logger = logging.getLogger(__name__)
+
+MODES = ("basic", "targeted", "hybrid")
+
+def resolve_concurrency(requested: Optional[int]) -> int:
+    """
+    Requested concurrency, defaulted and capped by configuration.
+    """
+    return max(1, min(requested or BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY))
+
+async def extract_item(mode: str, item: BatchItem, default_schema: Optional[List[str]] = None,
+                       use_cache: bool = True):
+    """
+    Run one batch item through the extraction function for `mode`.
+    """
+    if mode == "basic":
+        return await run_extraction_basic_async(item.title, item.description, use_cache)
+
+    schema_attributes = item.schema_attributes or default_schema
+    if not schema_attributes:
+        raise ValueError("schema_attributes is required for targeted and hybrid extraction")
+    if mode == "targeted":
+        return await run_targeted_prompt_async(item.title, item.description, schema_attributes, use_cache)
+    if mode == "hybrid":
+        return await run_hybrid_pipeline_async(item.title, item.description, schema_attributes, use_cache)
+    raise ValueError(f"Unknown extraction mode: {mode}")
+
+def describe_error(exc: BaseException) -> str:
+    """
+    Short, client-facing description of a per-item failure.
+    """
+    if isinstance(exc, asyncio.TimeoutError):
+        return f"Timed out after {BATCH_ITEM_TIMEOUT:g}s"
+    return f"{type(exc).__name__}: {exc}"
+
+# Failures that say nothing about the item itself and may well succeed later
+TRANSIENT_ERRORS = (
+    asyncio.TimeoutError,
+    DeadlineExceeded,
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+def failed_item(mode: str, index: int, item: BatchItem, exc: BaseException):
+    """
+    Batch result model recording a failed item.
+    """
+    logger.warning("Batch item %d (%s) failed: %r", index, item.id, exc)
+    result_cls = CleanedBatchItemResult if mode == "hybrid" else BatchItemResult
+    return result_cls(index=index, id=item.id, error=describe_error(exc))
+
+async def run_item(mode: str, index: int, item: BatchItem, default_schema: Optional[List[str]] = None,
+                   use_cache: bool = True, raise_transient: bool = False):
+    """
+    Extract one item and wrap the outcome (result or error) in its batch result model.
+    With `raise_transient`, transient failures are raised instead, for callers that retry.
+    """
+    result_cls = CleanedBatchItemResult if mode == "hybrid" else BatchItemResult
+    try:
+        result = await asyncio.wait_for(extract_item(mode, item, default_schema, use_cache), BATCH_ITEM_TIMEOUT)
+        return result_cls(index=index, id=item.id, result=result)
+    except Exception as exc:
+        if raise_transient and isinstance(exc, TRANSIENT_ERRORS):
+            raise
+        return failed_item(mode, index, item, exc)
+
+async def run_packed_items(mode: str, items: List[BatchItem], default_schema: Optional[List[str]],
+                           semaphore: asyncio.Semaphore, use_cache: bool = True) -> List[BatchItemResult]:
+    """
+    Extract items in multi-product packs, one pack per concurrency slot.
+    """
+    schemas = [item.schema_attributes or default_schema for item in items]
+    results: List[Optional[BatchItemResult]] = [None] * len(items)
+
+    async def bounded_pack(indexes: List[int]) -> None:
+        async with semaphore:
+            try:
+                outcomes = await asyncio.wait_for(
+                    run_pack_async(mode, [items[i] for i in indexes], [schemas[i] for i in indexes], use_cache),
+                    BATCH_ITEM_TIMEOUT,
+                )
+            except Exception as exc:
+                outcomes = [exc] * len(indexes)
+        for index, outcome in zip(indexes, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.warning("Batch item %d (%s) failed: %r", index, items[index].id, outcome)
+                results[index] = BatchItemResult(index=index, id=items[index].id, error=describe_error(outcome))
+            else:
+                results[index] = BatchItemResult(index=index, id=items[index].id, result=outcome)
+
+    await asyncio.gather(*(bounded_pack(pack) for pack in plan_packs(mode, items, schemas)))
+    return results
+
+async def run_batch(mode: str, items: List[BatchItem], default_schema: Optional[List[str]] = None,
+                    concurrency: Optional[int] = None, use_cache: bool = True, pack: bool = False):
+    """
+    Extract every item with at most `concurrency` in flight.
+    With `pack` (basic and targeted modes), short products share LLM calls.
+    Returns an ExtractBatchResponse (CleanedExtractBatchResponse for hybrid) in input order.
+    """
+    semaphore = asyncio.Semaphore(resolve_concurrency(concurrency))
+
+    async def bounded(index: int, item: BatchItem):
+        async with semaphore:
+            return await run_item(mode, index, item, default_schema, use_cache)
+
+    # Batch traffic queues behind interactive single-item requests for OpenAI capacity
+    with priority(PRIORITY_BATCH):
+        if pack and mode in ("basic", "targeted"):
+            results = await run_packed_items(mode, items, default_schema, semaphore, use_cache)
+        else:
+            results = await asyncio.gather(*(bounded(i, item) for i, item in enumerate(items)))
+    failed = sum(1 for r in results if r.error is not None)
+    response_cls = CleanedExtractBatchResponse if mode == "hybrid" else ExtractBatchResponse
+    return response_cls(results=results, succeeded=len(results) - failed, failed=failed)
+
+async def parse_ndjson_items(chunks: AsyncIterator[bytes]) -> AsyncIterator[Union[BatchItem, ValueError]]:
+    """
+    Incrementally parse an NDJSON body (one BatchItem object per line) from raw byte chunks.
+    Blank lines are skipped; a line that is not a valid item yields a ValueError in its place
+    so that the item still gets an (error) result at its index.
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_item_line(line)
+    if buffer.strip():
+        yield _parse_item_line(buffer)
+
+def _parse_item_line(line: bytes) -> Union[BatchItem, ValueError]:
+    """
+    Validate one NDJSON line into a BatchItem, returning the error instead of raising it.
+    """
+    try:
+        return BatchItem.model_validate_json(line)
+    except ValidationError as exc:
+        return ValueError(f"Invalid item: {exc.errors(include_url=False)[0]['msg']}")
+
+async def stream_batch(mode: str, items: AsyncIterator[Union[BatchItem, ValueError]],
+                       default_schema: Optional[List[str]] = None, concurrency: Optional[int] = None,
+                       use_cache: bool = True) -> AsyncIterator[str]:
+    """
+    Extract items as they are read and yield one NDJSON line per item as soon as it completes
+    (completion order, tagged with `index` and `id`).
+
+    The next input item is only read once a concurrency slot is free, and finished results
+    wait in a bounded queue, so memory stays flat however large the batch is.
+    """
+    limit = resolve_concurrency(concurrency)
+    semaphore = asyncio.Semaphore(limit)
+    finished: asyncio.Queue = asyncio.Queue(maxsize=limit)
+    workers = set()
+    result_cls = CleanedBatchItemResult if mode == "hybrid" else BatchItemResult
+
+    async def work(index: int, item: Union[BatchItem, ValueError]) -> None:
+        try:
+            if isinstance(item, ValueError):
+                result = result_cls(index=index, error=str(item))
+            else:
+                result = await run_item(mode, index, item, default_schema, use_cache)
+            await finished.put(result)
+        finally:
+            semaphore.release()
+
+    async def produce() -> None:
+        index = 0
+        async for item in items:
+            await semaphore.acquire()
+            task = asyncio.create_task(work(index, item))
+            workers.add(task)
+            task.add_done_callback(workers.discard)
+            index += 1
+        # Wait for the last workers, then signal the end of the stream
+        while workers:
+            await asyncio.gather(*list(workers), return_exceptions=True)
+        await finished.put(None)
+
+    with priority(PRIORITY_BATCH):
+        producer = asyncio.create_task(produce())
+    try:
+        while True:
+            get = asyncio.ensure_future(finished.get())
+            if not producer.done():
+                await asyncio.wait({get, producer}, return_when=asyncio.FIRST_COMPLETED)
+            if not get.done() and producer.done() and producer.exception() is not None:
+                # Reading the request body failed; end the stream with that error
+                get.cancel()
+                raise producer.exception()
+            result = await get
+            if result is None:
+                break
+            yield result.model_dump_json() + "\n"
+    finally:
+        producer.cancel()
+        for task in list(workers):
+            task.cancel()
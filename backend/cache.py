@@ -0,0 +1,212 @@
+"""
+Cache module for the backend.
+
+This module provides a content-addressed cache of extraction results: an in-memory
+LRU with TTL, optionally backed by a SQLite file that survives restarts and can be
+shared by several workers on the same host.
+"""
+
+import contextvars
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional, Type, TypeVar
+
+from pydantic import BaseModel
+
+from backend.config import CACHE_ENABLED, CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS, CACHE_SQLITE_PATH
+from backend.hedging import current_endpoint
+from backend.metrics import add_stage_time, stage_timings
+from backend.ratelimit import request_priority
+from backend.registry import normalize_attributes
+from backend.singleflight import get_single_flight
+
+T = TypeVar("T", bound=BaseModel)
+
+def normalize_schema_attributes(schema_attributes: Optional[List[str]]) -> List[str]:
+    """
+    Canonical form of a schema attribute list for hashing: the attributes as rendered
+    into the prompt. Order is kept, since results come back in schema order.
+    """
+    return list(normalize_attributes(schema_attributes or []))
+
+def fingerprint(kind: str, model: str, prompt_version: str, title: str, description: str,
+                schema_attributes: Optional[List[str]] = None) -> str:
+    """
+    Content hash identifying one extraction request.
+    """
+    payload = json.dumps(
+        [kind, model, prompt_version, title.strip(), description.strip(), normalize_schema_attributes(schema_attributes)],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class SQLiteCacheTier:
+    """
+    Persistent cache tier stored in a SQLite file (WAL mode so several workers can share it).
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: dict, ttl: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), time.time() + ttl),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class ResultCache:
+    """
+    In-memory LRU with TTL and an optional persistent tier.
+    Values are stored as plain dicts (the `model_dump()` of a response model).
+    """
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS,
+                 persistent: Optional[SQLiteCacheTier] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persistent = persistent
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at >= time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        if self.persistent is not None:
+            value = self.persistent.get(key)
+            if value is not None:
+                self._remember(key, value)
+                self.hits += 1
+                self.disk_hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: dict) -> None:
+        self._remember(key, value)
+        if self.persistent is not None:
+            self.persistent.set(key, value, self.ttl)
+
+    def _remember(self, key: str, value: dict) -> None:
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        if self.persistent is not None:
+            self.persistent.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "persistent": self.persistent.path if self.persistent is not None else None,
+        }
+
+_cache: Optional[ResultCache] = None
+
+def get_result_cache() -> ResultCache:
+    """
+    Return the process-wide result cache, creating it on first use.
+    """
+    global _cache
+    if _cache is None:
+        persistent = SQLiteCacheTier(CACHE_SQLITE_PATH) if CACHE_SQLITE_PATH else None
+        _cache = ResultCache(persistent=persistent)
+    return _cache
+
+def cache_lookup(key: str, model_cls: Type[T]) -> Optional[T]:
+    """
+    Cached result for `key` as a `model_cls` instance, or None.
+    """
+    cached = get_result_cache().get(key) if CACHE_ENABLED else None
+    return model_cls.model_validate(cached) if cached is not None else None
+
+def cache_store(key: str, result: BaseModel) -> None:
+    """
+    Cache a result computed outside `cached_call` (e.g. assembled from a stream).
+    """
+    if CACHE_ENABLED:
+        get_result_cache().set(key, result.model_dump())
+
+async def cached_call(key: str, model_cls: Type[T], compute: Callable[[], Awaitable[T]],
+                      use_cache: bool = True, store: Callable[[T], bool] = None) -> T:
+    """
+    Return the cached result for `key`, or await `compute()` and cache it.
+    Concurrent misses for the same key, priority and endpoint share a single `compute()`
+    call, which runs at that priority and is hedged as that endpoint, but outside any
+    caller's request context; its stage timings are reported to the caller that started it.
+    With `use_cache=False` the lookup is skipped but the fresh result is still stored.
+    `store` can veto caching a particular result (e.g. a partial one).
+    """
+    cache = get_result_cache() if CACHE_ENABLED else None
+    if cache is not None and use_cache:
+        cached = cache_lookup(key, model_cls)
+        if cached is not None:
+            return cached
+
+    async def compute_and_store() -> T:
+        result = await compute()
+        if cache is not None and (store is None or store(result)):
+            cache.set(key, result.model_dump())
+        return result
+
+    # Batch work must not delay interactive callers, nor run ahead of other batch work;
+    # each endpoint keeps its own hedge budget and latency samples
+    priority = request_priority.get()
+    name = current_endpoint.get()
+    timings = {}
+    context = contextvars.Context()
+    context.run(request_priority.set, priority)
+    context.run(current_endpoint.set, name)
+    context.run(stage_timings.set, timings)
+    result = await get_single_flight().do(f"{key}:p{priority}:{name}", compute_and_store, context)
+    # Only the caller whose context started the work has timings to report
+    for name, seconds in timings.items():
+        add_stage_time(name, seconds)
+    return result
@@ -0,0 +1,137 @@
+"""
+Cascade module for the backend.
+
+This module runs a completion through a configurable cascade of models: the request
+goes to a fast, cheap tier first, its output is checked locally (N/A ratio, requested
+attributes missing, malformed names, empty value lists) and only a failing output is
+sent again to the next, stronger tier.
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from backend.config import CASCADE_MODELS, CASCADE_MAX_NA_RATIO, CASCADE_MAX_NAME_LENGTH
+from backend.merge import is_na, normalize_name
+from backend.metrics import CASCADE_TIER_DURATION, CASCADE_ESCALATIONS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+def parse_tier(spec: str) -> Tuple[str, Optional[float]]:
+    """
+    Split a tier spec "model" or "model@temperature" into its parts.
+    """
+    model, _, temperature = spec.partition("@")
+    return model.strip(), float(temperature) if temperature.strip() else None
+
+def cascade_tiers(kind: str) -> List[str]:
+    """
+    Tier specs configured for a call kind ("basic", "targeted" or "merge"); empty when none.
+    """
+    return CASCADE_MODELS.get(kind, [])
+
+def quality_issues(result, requested: Optional[List[str]] = None, max_na_ratio: float = CASCADE_MAX_NA_RATIO,
+                   max_name_length: int = CASCADE_MAX_NAME_LENGTH) -> List[str]:
+    """
+    Reasons (possibly none) for which an extraction output is not good enough to keep:
+    "empty", "missing" (requested attributes absent), "na_ratio", "bad_name", "empty_value".
+    """
+    attributes = result.attributes
+    if not attributes:
+        return ["empty"]
+    issues = []
+    if requested:
+        returned = {normalize_name(attribute.name) for attribute in attributes}
+        if any(normalize_name(name) not in returned for name in requested):
+            issues.append("missing")
+    na = sum(1 for attribute in attributes if attribute.value and all(is_na(v) for v in attribute.value))
+    if na / len(attributes) > max_na_ratio:
+        issues.append("na_ratio")
+    if any(not attribute.name.strip() or len(attribute.name) > max_name_length or is_na(attribute.name)
+           or "\n" in attribute.name or ":" in attribute.name for attribute in attributes):
+        issues.append("bad_name")
+    if any(not [v for v in attribute.value if v.strip()] for attribute in attributes):
+        issues.append("empty_value")
+    return issues
+
+@dataclass
+class TierStats:
+    """
+    Calls served by one tier of one cascade, and how many of them were escalated.
+    """
+    calls: int = 0
+    accepted: int = 0
+    escalated: int = 0
+    seconds: float = 0.0
+    reasons: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, seconds: float, issues: List[str]) -> None:
+        self.calls += 1
+        self.seconds += seconds
+        if issues:
+            self.escalated += 1
+            for reason in issues:
+                self.reasons[reason] = self.reasons.get(reason, 0) + 1
+        else:
+            self.accepted += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "accepted": self.accepted,
+            "escalated": self.escalated,
+            "escalation_rate": round(self.escalated / self.calls, 4) if self.calls else 0.0,
+            "mean_latency": round(self.seconds / self.calls, 4) if self.calls else 0.0,
+            "reasons": dict(self.reasons),
+        }
+
+# Call kind -> tier model -> stats
+_stats: Dict[str, Dict[str, TierStats]] = {}
+
+def cascade_stats() -> dict:
+    """
+    Per-kind, per-tier counters for /stats and /metrics.
+    """
+    return {kind: {model: tier.as_dict() for model, tier in tiers.items()} for kind, tiers in _stats.items()}
+
+async def run_cascade(kind: str, request: dict, parse: Callable[[str], T], send: Callable[[dict], Awaitable[str]],
+                      requested: Optional[List[str]] = None) -> T:
+    """
+    Send `request` through the cascade configured for `kind` and return the first output
+    that passes the quality checks (the last tier's output is always kept). Output that
+    cannot be parsed also escalates; errors raised by `send` propagate unchanged.
+    Without a cascade for `kind` the request is sent once, as built.
+    """
+    tiers = cascade_tiers(kind)
+    if not tiers:
+        return parse(await send(request))
+
+    for position, spec in enumerate(tiers):
+        last = position == len(tiers) - 1
+        model, temperature = parse_tier(spec)
+        tier_request = {**request, "model": model}
+        if temperature is not None:
+            tier_request["temperature"] = temperature
+
+        started = time.perf_counter()
+        content = await send(tier_request)
+        try:
+            result = parse(content)
+        except ValueError:
+            if last:
+                raise
+            result, issues = None, ["invalid_output"]
+        else:
+            issues = [] if last else quality_issues(result, requested)
+        elapsed = time.perf_counter() - started
+
+        _stats.setdefault(kind, {}).setdefault(model, TierStats()).record(elapsed, issues)
+        CASCADE_TIER_DURATION.labels(kind=kind, model=model).observe(elapsed)
+        if not issues:
+            return result
+        for reason in issues:
+            CASCADE_ESCALATIONS.labels(kind=kind, model=model, reason=reason).inc()
+        logger.info("Cascade %s: %s output escalated (%s)", kind, model, ", ".join(issues))
@@ -0,0 +1,171 @@
+"""
+Catalog module for the backend.
+
+This module keeps the last extraction result of every SKU together with a fingerprint
+of its inputs (title, description, schema, model and prompt version), so a full catalog
+feed can be synced by re-extracting only the products that are new or have changed.
+Syncs with more than SYNC_INLINE_MAX_ITEMS products to extract run as a background job.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from backend.batch import extract_item, describe_error, resolve_concurrency
+from backend.cache import fingerprint
+from backend.config import SKU_STORE_PATH, SYNC_INLINE_MAX_ITEMS, JOBS_ENABLED, BATCH_ITEM_TIMEOUT
+from backend.models import EXTRACTION_MODEL, prompt_version
+from backend.ratelimit import priority, PRIORITY_BATCH
+from backend.schemas import BatchItem, SyncItemResult, SyncResponse
+
+logger = logging.getLogger(__name__)
+
+def item_fingerprint(mode: str, item: BatchItem, default_schema: Optional[List[str]] = None) -> str:
+    """
+    Fingerprint of everything that determines an item's extraction result.
+    """
+    schema_attributes = None if mode == "basic" else (item.schema_attributes or default_schema)
+    return fingerprint(
+        f"sku:{mode}", EXTRACTION_MODEL, prompt_version(mode), item.title, item.description, schema_attributes
+    )
+
+class SkuStore:
+    """
+    Last result per (mode, SKU) in a SQLite file (WAL mode).
+    """
+    def __init__(self, path: str = SKU_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sku_results ("
+            " mode TEXT NOT NULL, sku TEXT NOT NULL, fingerprint TEXT NOT NULL, result TEXT NOT NULL,"
+            " updated_at REAL NOT NULL, PRIMARY KEY (mode, sku))"
+        )
+
+    def fingerprints(self, mode: str) -> dict:
+        """
+        SKU -> stored fingerprint for every SKU of a mode.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT sku, fingerprint FROM sku_results WHERE mode = ?", (mode,)).fetchall()
+        return dict(rows)
+
+    def get(self, mode: str, sku: str) -> Optional[Tuple[str, dict, float]]:
+        """
+        (fingerprint, result, updated_at) stored for a SKU, or None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint, result, updated_at FROM sku_results WHERE mode = ? AND sku = ?", (mode, sku)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), row[2]
+
+    def put(self, mode: str, sku: str, item_fingerprint: str, result: dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sku_results (mode, sku, fingerprint, result, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (mode, sku, item_fingerprint, json.dumps(result, ensure_ascii=False), time.time()),
+            )
+
+    def delete(self, mode: str, skus: List[str]) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            deleted = self._conn.executemany(
+                "DELETE FROM sku_results WHERE mode = ? AND sku = ?", ((mode, sku) for sku in skus)
+            ).rowcount
+            self._conn.execute("COMMIT")
+        return deleted
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+_store: Optional[SkuStore] = None
+
+def get_sku_store() -> SkuStore:
+    """
+    Return the process-wide SKU store, opening it on first use.
+    """
+    global _store
+    if _store is None:
+        _store = SkuStore()
+    return _store
+
+def store_sync_result(mode: str, item: BatchItem, default_schema: Optional[List[str]], result,
+                      current: Optional[str] = None) -> bool:
+    """
+    Store a SKU's fresh result with the fingerprint of its inputs. Partial results are not
+    stored, so the SKU is extracted again on the next sync; returns whether it was stored.
+    """
+    if getattr(result, "failed_stages", None):
+        return False
+    get_sku_store().put(mode, item.id, current or item_fingerprint(mode, item, default_schema), result.model_dump())
+    return True
+
+async def run_sync(mode: str, items: List[BatchItem], default_schema: Optional[List[str]] = None,
+                   concurrency: Optional[int] = None, use_cache: bool = True, force: bool = False,
+                   prune: bool = False) -> SyncResponse:
+    """
+    Sync a full feed against the SKU store: unchanged items are skipped, new and changed
+    ones are re-extracted (bounded concurrency, batch priority) and their results stored.
+    With `prune`, stored SKUs missing from the feed are deleted. Only complete results are
+    stored, so failed or partial items are retried on the next sync. When more than
+    SYNC_INLINE_MAX_ITEMS items need extracting (and jobs are enabled), they are queued as
+    a job instead, which stores each SKU as it completes; the response carries the job.
+    """
+    store = get_sku_store()
+    known = store.fingerprints(mode)
+    semaphore = asyncio.Semaphore(resolve_concurrency(concurrency))
+    seen = set()
+    unchanged = 0
+    work = []
+    results: List[SyncItemResult] = []
+
+    for index, item in enumerate(items):
+        if item.id in seen:
+            results.append(SyncItemResult(index=index, id=item.id, status="failed", error="Duplicate SKU in feed"))
+            continue
+        seen.add(item.id)
+        current = item_fingerprint(mode, item, default_schema)
+        previous = known.get(item.id)
+        if previous == current and not force:
+            unchanged += 1
+            continue
+        work.append((index, item, current, "new" if previous is None else "changed"))
+
+    async def extract(index: int, item: BatchItem, current: str, status: str) -> SyncItemResult:
+        async with semaphore:
+            try:
+                result = await asyncio.wait_for(extract_item(mode, item, default_schema, use_cache), BATCH_ITEM_TIMEOUT)
+            except Exception as exc:
+                logger.warning("Sync item %d (%s) failed: %r", index, item.id, exc)
+                return SyncItemResult(index=index, id=item.id, status="failed", error=describe_error(exc))
+        if not store_sync_result(mode, item, default_schema, result, current):
+            error = f"Partial result, failed stages: {', '.join(result.failed_stages)}"
+            return SyncItemResult(index=index, id=item.id, status="failed", result=result, error=error)
+        return SyncItemResult(index=index, id=item.id, status=status, result=result)
+
+    job = None
+    if len(work) > SYNC_INLINE_MAX_ITEMS and JOBS_ENABLED:
+        # Imported here: the job runner stores sync results through this module
+        from backend.jobs import get_job_runner
+        job = await get_job_runner().submit(mode, [entry[1] for entry in work], default_schema, use_cache, sync=True)
+        counts = {status: sum(1 for entry in work if entry[3] == status) for status in ("new", "changed")}
+        counts["failed"] = len(results)
+    else:
+        with priority(PRIORITY_BATCH):
+            results += await asyncio.gather(*(extract(*entry) for entry in work))
+        results.sort(key=lambda r: r.index)
+        counts = {status: sum(1 for r in results if r.status == status) for status in ("new", "changed", "failed")}
+
+    removed = store.delete(mode, [sku for sku in known if sku not in seen]) if prune else 0
+    return SyncResponse(total=len(items), unchanged=unchanged, removed=removed, results=results, job=job, **counts)
@@ -0,0 +1,117 @@
+"""
+Client module for the backend.
+
+This module owns the process-wide OpenAI clients so that HTTP connections are
+pooled and reused across requests instead of re-established on every call.
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+import httpx
+from openai import OpenAI, AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient
+from backend.config import (
+    OPENAI_API_KEY,
+    OPENAI_MAX_CONNECTIONS,
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+    OPENAI_KEEPALIVE_EXPIRY,
+    OPENAI_TIMEOUT,
+    OPENAI_CONNECT_TIMEOUT,
+    OPENAI_MAX_RETRIES,
+    OPENAI_SYNC_MAX_RETRIES,
+    OPENAI_WARMUP_CONNECTIONS,
+)
+
+logger = logging.getLogger(__name__)
+
+_async_client: Optional[AsyncOpenAI] = None
+_sync_client: Optional[OpenAI] = None
+
+def build_limits() -> httpx.Limits:
+    """
+    Connection pool limits for the OpenAI HTTP client.
+    """
+    return httpx.Limits(
+        max_connections=OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+    )
+
+def build_timeout() -> httpx.Timeout:
+    """
+    Request timeouts for the OpenAI HTTP client.
+    """
+    return httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT)
+
+def create_async_openai_client() -> AsyncOpenAI:
+    """
+    Build a new async OpenAI client with a configured connection pool.
+    """
+    return AsyncOpenAI(
+        api_key=OPENAI_API_KEY,
+        max_retries=OPENAI_MAX_RETRIES,
+        timeout=build_timeout(),
+        http_client=DefaultAsyncHttpxClient(limits=build_limits(), timeout=build_timeout()),
+    )
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """
+    Return the shared async OpenAI client, creating it on first use.
+    """
+    global _async_client
+    if _async_client is None:
+        _async_client = create_async_openai_client()
+    return _async_client
+
+def get_openai_client() -> OpenAI:
+    """
+    Return the shared sync OpenAI client, creating it on first use.
+    """
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = OpenAI(
+            api_key=OPENAI_API_KEY,
+            max_retries=OPENAI_SYNC_MAX_RETRIES,
+            timeout=build_timeout(),
+            http_client=DefaultHttpxClient(limits=build_limits(), timeout=build_timeout()),
+        )
+    return _sync_client
+
+async def warm_up(client: AsyncOpenAI, connections: int = OPENAI_WARMUP_CONNECTIONS) -> int:
+    """
+    Open `connections` pooled connections by issuing cheap concurrent requests.
+    Returns the number of warm-up requests that succeeded. Failures are logged, never raised.
+    """
+    if connections <= 0:
+        return 0
+    results = await asyncio.gather(
+        *(client.models.list() for _ in range(connections)),
+        return_exceptions=True,
+    )
+    failures = [r for r in results if isinstance(r, BaseException)]
+    if failures:
+        logger.warning("OpenAI warm-up: %d of %d requests failed (%s)", len(failures), connections, failures[0])
+    return connections - len(failures)
+
+async def startup_openai_client() -> AsyncOpenAI:
+    """
+    Create the shared async client and warm its connection pool.
+    Called from the FastAPI lifespan.
+    """
+    client = get_async_openai_client()
+    await warm_up(client)
+    return client
+
+async def shutdown_openai_client() -> None:
+    """
+    Close the shared clients and release their sockets.
+    Called from the FastAPI lifespan.
+    """
+    global _async_client, _sync_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
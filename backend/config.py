@@ -31,3 +31,175 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 # Verify keys are loaded
 # print(f"API_KEY loaded: {bool(API_KEY)}")
 # print(f"OPENAI_API_KEY loaded: {bool(OPENAI_API_KEY)}")
+
+def _env_int(name: str, default: int) -> int:
+    """
+    Read an integer setting from the environment, falling back to a default.
+    """
+    raw = os.getenv(name)
+    return int(raw) if raw not in (None, "") else default
+
+def _env_float(name: str, default: float) -> float:
+    """
+    Read a float setting from the environment, falling back to a default.
+    """
+    raw = os.getenv(name)
+    return float(raw) if raw not in (None, "") else default
+
+def _env_bool(name: str, default: bool) -> bool:
+    """
+    Read a boolean setting from the environment, falling back to a default.
+    """
+    raw = os.getenv(name)
+    if raw in (None, ""):
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "on")
+
+# OpenAI HTTP connection pool (shared by every request in the process)
+OPENAI_MAX_CONNECTIONS = _env_int("OPENAI_MAX_CONNECTIONS", 200)
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = _env_int("OPENAI_MAX_KEEPALIVE_CONNECTIONS", 50)
+OPENAI_KEEPALIVE_EXPIRY = _env_float("OPENAI_KEEPALIVE_EXPIRY", 60.0)
+OPENAI_TIMEOUT = _env_float("OPENAI_TIMEOUT", 60.0)
+OPENAI_CONNECT_TIMEOUT = _env_float("OPENAI_CONNECT_TIMEOUT", 5.0)
+# SDK-level retries; 429/5xx retries are normally handled by the outbound scheduler instead
+OPENAI_MAX_RETRIES = _env_int("OPENAI_MAX_RETRIES", 0)
+# The sync client (run_extraction_basic etc.) bypasses the scheduler, so it keeps the SDK default
+OPENAI_SYNC_MAX_RETRIES = _env_int("OPENAI_SYNC_MAX_RETRIES", 2)
+# Number of connections opened at startup so the first requests skip the TLS handshake
+OPENAI_WARMUP_CONNECTIONS = _env_int("OPENAI_WARMUP_CONNECTIONS", 2)
+
+# Hybrid merge: "local" (never call the LLM), "llm" (always call it) or "auto" (LLM only when ambiguous)
+HYBRID_MERGE_MODE = os.getenv("HYBRID_MERGE_MODE", "auto").strip().lower()
+# Similarity ratio (0-1) above which two values / attribute names are folded together
+MERGE_VALUE_SIMILARITY = _env_float("MERGE_VALUE_SIMILARITY", 0.9)
+MERGE_NAME_SIMILARITY = _env_float("MERGE_NAME_SIMILARITY", 0.9)
+# Names at least this similar, but below MERGE_NAME_SIMILARITY, are treated as ambiguous
+MERGE_AMBIGUOUS_NAME_SIMILARITY = _env_float("MERGE_AMBIGUOUS_NAME_SIMILARITY", 0.75)
+# Treat an attribute whose targeted and non targeted values do not overlap at all as ambiguous
+MERGE_CONFLICTS_ARE_AMBIGUOUS = _env_bool("MERGE_CONFLICTS_ARE_AMBIGUOUS", True)
+
+# Extraction result cache
+CACHE_ENABLED = _env_bool("CACHE_ENABLED", True)
+CACHE_MAX_ENTRIES = _env_int("CACHE_MAX_ENTRIES", 10000)
+CACHE_TTL_SECONDS = _env_float("CACHE_TTL_SECONDS", 7 * 24 * 3600)
+# Optional persistent tier shared by workers; empty disables it
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH", "")
+
+# Batch extraction
+BATCH_MAX_ITEMS = _env_int("BATCH_MAX_ITEMS", 1000)
+BATCH_CONCURRENCY = _env_int("BATCH_CONCURRENCY", 16)
+BATCH_MAX_CONCURRENCY = _env_int("BATCH_MAX_CONCURRENCY", 64)
+# Per-item timeout so one slow product cannot hold up the whole batch
+BATCH_ITEM_TIMEOUT = _env_float("BATCH_ITEM_TIMEOUT", 120.0)
+
+# Multi-product prompt packing (batch requests with "pack": true)
+PACK_MAX_ITEMS = _env_int("PACK_MAX_ITEMS", 8)
+# Products longer than this are always sent on their own
+PACK_MAX_ITEM_TOKENS = _env_int("PACK_MAX_ITEM_TOKENS", 400)
+# Budget for the product content of one packed call
+PACK_MAX_INPUT_TOKENS = _env_int("PACK_MAX_INPUT_TOKENS", 2400)
+PACK_OUTPUT_TOKENS_PER_ITEM = _env_int("PACK_OUTPUT_TOKENS_PER_ITEM", 768)
+
+# Description preprocessing (markup/boilerplate removal and token budget)
+PREPROCESS_ENABLED = _env_bool("PREPROCESS_ENABLED", True)
+PREPROCESS_MAX_TOKENS = _env_int("PREPROCESS_MAX_TOKENS", 1500)
+# Extra boilerplate line patterns (regular expressions separated by "||")
+PREPROCESS_EXTRA_BOILERPLATE = [p for p in os.getenv("PREPROCESS_EXTRA_BOILERPLATE", "").split("||") if p.strip()]
+
+# Rule-based fast path for targeted extraction
+RULES_ENABLED = _env_bool("RULES_ENABLED", True)
+# Attributes resolved with at least this confidence skip the LLM
+RULES_MIN_CONFIDENCE = _env_float("RULES_MIN_CONFIDENCE", 0.9)
+
+# Targeted schemas longer than this are split into shards extracted in parallel (0 disables)
+TARGETED_SHARD_SIZE = _env_int("TARGETED_SHARD_SIZE", 25)
+
+# Variant reuse: near-duplicate products reuse a previous basic extraction
+VARIANT_REUSE_ENABLED = _env_bool("VARIANT_REUSE_ENABLED", True)
+# Minimum Jaccard similarity of the two products' word sets to count as variants
+VARIANT_MIN_SIMILARITY = _env_float("VARIANT_MIN_SIMILARITY", 0.85)
+# Products with fewer distinct words than this are too short to compare reliably
+VARIANT_MIN_TOKENS = _env_int("VARIANT_MIN_TOKENS", 25)
+# Extracted products kept in the similarity index
+VARIANT_INDEX_SIZE = _env_int("VARIANT_INDEX_SIZE", 20000)
+
+# Model cascade per call kind (basic, targeted, merge), cheapest first, e.g.
+# "basic=gpt-4.1-nano>gpt-4.1-mini,targeted=gpt-4.1-nano@0.2>gpt-4.1-mini" ("@" sets the tier's temperature)
+CASCADE_MODELS = {
+    kind.strip(): [tier.strip() for tier in tiers.split(">") if tier.strip()]
+    for kind, _, tiers in (entry.partition("=") for entry in os.getenv("CASCADE_MODELS", "").split(","))
+    if kind.strip() and tiers.strip()
+}
+# Escalate when more than this share of the returned attributes are N/A
+CASCADE_MAX_NA_RATIO = _env_float("CASCADE_MAX_NA_RATIO", 0.5)
+# Attribute names longer than this are treated as malformed
+CASCADE_MAX_NAME_LENGTH = _env_int("CASCADE_MAX_NAME_LENGTH", 60)
+
+# Outbound scheduler: client-side OpenAI rate limiting and retries
+RATE_LIMIT_ENABLED = _env_bool("RATE_LIMIT_ENABLED", True)
+# Starting limits per model; refined from the x-ratelimit-* response headers
+OPENAI_RPM_LIMIT = _env_int("OPENAI_RPM_LIMIT", 500)
+OPENAI_TPM_LIMIT = _env_int("OPENAI_TPM_LIMIT", 200000)
+# Retries for 429, 5xx and connection errors, with jittered exponential backoff
+RATE_LIMIT_MAX_RETRIES = _env_int("RATE_LIMIT_MAX_RETRIES", 4)
+RATE_LIMIT_BACKOFF_BASE = _env_float("RATE_LIMIT_BACKOFF_BASE", 0.5)
+RATE_LIMIT_BACKOFF_MAX = _env_float("RATE_LIMIT_BACKOFF_MAX", 20.0)
+
+# Hedged requests: duplicate slow completions to cut tail latency (opt-in)
+HEDGE_ENABLED = _env_bool("HEDGE_ENABLED", False)
+# Fire the duplicate once a call is slower than this percentile of recent latencies
+HEDGE_PERCENTILE = _env_float("HEDGE_PERCENTILE", 95.0)
+# Latency samples kept per endpoint and model, and needed before hedging starts
+HEDGE_WINDOW = _env_int("HEDGE_WINDOW", 200)
+HEDGE_MIN_SAMPLES = _env_int("HEDGE_MIN_SAMPLES", 20)
+# Never hedge sooner than this many seconds
+HEDGE_MIN_DELAY = _env_float("HEDGE_MIN_DELAY", 0.1)
+# Maximum share of an endpoint's recent calls that may be hedged
+HEDGE_MAX_RATE = _env_float("HEDGE_MAX_RATE", 0.05)
+# Per-endpoint overrides of HEDGE_MAX_RATE, e.g. "/extract=0.1,/extract-hybrid=0.02"
+HEDGE_ENDPOINT_RATES = {
+    path.strip(): float(rate)
+    for path, _, rate in (entry.partition("=") for entry in os.getenv("HEDGE_ENDPOINT_RATES", "").split(","))
+    if path.strip() and rate.strip()
+}
+
+# Inbound admission control for the extraction endpoints (/extract*, /sync)
+ADMISSION_ENABLED = _env_bool("ADMISSION_ENABLED", True)
+# Requests served at once; the next ones wait in a bounded queue, anything beyond is shed with 429
+ADMISSION_MAX_IN_FLIGHT = _env_int("ADMISSION_MAX_IN_FLIGHT", 64)
+ADMISSION_MAX_QUEUE = _env_int("ADMISSION_MAX_QUEUE", 128)
+# Queued requests still waiting for a slot after this many seconds are shed with 503
+ADMISSION_QUEUE_TIMEOUT = _env_float("ADMISSION_QUEUE_TIMEOUT", 10.0)
+# Default request deadline in seconds (0 disables); clients may send their own in x-request-timeout
+REQUEST_TIMEOUT = _env_float("REQUEST_TIMEOUT", 60.0)
+# Default deadline of batch and /sync requests (0: none, items keep their own BATCH_ITEM_TIMEOUT)
+BATCH_REQUEST_TIMEOUT = _env_float("BATCH_REQUEST_TIMEOUT", 0.0)
+# Upper bound for deadlines requested through the header
+REQUEST_TIMEOUT_MAX = _env_float("REQUEST_TIMEOUT_MAX", 900.0)
+# Per-endpoint default deadlines, e.g. "/extract=20,/extract-hybrid=45"
+REQUEST_TIMEOUTS = {
+    path.strip(): float(seconds)
+    for path, _, seconds in (entry.partition("=") for entry in os.getenv("REQUEST_TIMEOUTS", "").split(","))
+    if path.strip() and seconds.strip()
+}
+
+# Asynchronous jobs: persistent queue for catalog-scale runs
+JOBS_ENABLED = _env_bool("JOBS_ENABLED", True)
+# SQLite file holding jobs and per-item checkpoints (put it on a persistent volume)
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "jobs.sqlite3")
+# Items extracted concurrently across all jobs
+JOBS_WORKERS = _env_int("JOBS_WORKERS", 8)
+JOBS_MAX_ITEMS = _env_int("JOBS_MAX_ITEMS", 100000)
+# Attempts per item for transient failures (rate limits, timeouts, outages), and the base
+# of the exponential delay before each retry
+JOBS_MAX_ATTEMPTS = _env_int("JOBS_MAX_ATTEMPTS", 5)
+JOBS_RETRY_BACKOFF = _env_float("JOBS_RETRY_BACKOFF", 5.0)
+
+# Per-SKU result store used by /sync to skip unchanged products
+SKU_STORE_PATH = os.getenv("SKU_STORE_PATH", "sku_results.sqlite3")
+SYNC_MAX_ITEMS = _env_int("SYNC_MAX_ITEMS", 100000)
+# Most new/changed items a sync extracts within the request; larger syncs become a job
+SYNC_INLINE_MAX_ITEMS = _env_int("SYNC_INLINE_MAX_ITEMS", 200)
+
+# Schema registry (category schemas referenced by schema_id)
+SCHEMA_REGISTRY_PATH = os.getenv("SCHEMA_REGISTRY_PATH", "schemas.sqlite3")
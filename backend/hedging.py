@@ -0,0 +1,197 @@
+"""
+Hedging module for the backend.
+
+This module implements hedged requests: when an LLM call is still running past a
+percentile of the recently observed latencies, a duplicate is sent and whichever
+returns a valid result first wins (the other is cancelled). Each endpoint keeps its
+own latency samples and an upper bound on the share of calls that may be hedged.
+"""
+
+import asyncio
+import contextvars
+import math
+from collections import deque
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from backend.config import (
+    HEDGE_ENABLED,
+    HEDGE_PERCENTILE,
+    HEDGE_WINDOW,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_MIN_DELAY,
+    HEDGE_MAX_RATE,
+    HEDGE_ENDPOINT_RATES,
+)
+
+T = TypeVar("T")
+
+current_endpoint: contextvars.ContextVar[str] = contextvars.ContextVar("current_endpoint", default="default")
+
+@contextmanager
+def endpoint(name: str):
+    """
+    Attribute the enclosed LLM calls (and tasks created inside it) to an endpoint.
+    """
+    token = current_endpoint.set(name)
+    try:
+        yield
+    finally:
+        current_endpoint.reset(token)
+
+class LatencyTracker:
+    """
+    Sliding window of recent call latencies (seconds).
+    """
+    def __init__(self, size: int = HEDGE_WINDOW):
+        self.samples: Deque[float] = deque(maxlen=size)
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """
+        Nearest-rank percentile of the window, or None while it is empty.
+        """
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+        return ordered[rank - 1]
+
+class Hedger:
+    """
+    Hedging policy and counters for one endpoint.
+    """
+    def __init__(self, max_rate: float = HEDGE_MAX_RATE, percentile: float = HEDGE_PERCENTILE,
+                 min_samples: int = HEDGE_MIN_SAMPLES, min_delay: float = HEDGE_MIN_DELAY):
+        self.max_rate = max_rate
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.trackers: Dict[str, LatencyTracker] = {}
+        # One flag per recent call: was it hedged?
+        self.recent: Deque[bool] = deque(maxlen=HEDGE_WINDOW)
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.primary_wins = 0
+        self.capped = 0
+
+    def tracker(self, key: str) -> LatencyTracker:
+        if key not in self.trackers:
+            self.trackers[key] = LatencyTracker()
+        return self.trackers[key]
+
+    def hedge_delay(self, key: str) -> Optional[float]:
+        """
+        Seconds to wait before hedging a call for `key`, or None if there is too little data.
+        """
+        tracker = self.tracker(key)
+        if len(tracker.samples) < self.min_samples:
+            return None
+        return max(self.min_delay, tracker.percentile(self.percentile))
+
+    def may_hedge(self) -> bool:
+        """
+        True while hedging one more call keeps the endpoint under its hedge-rate cap.
+        """
+        return sum(self.recent) + 1 <= self.max_rate * len(self.recent)
+
+    async def run(self, call: Callable[[], Awaitable[T]], hedge_call: Optional[Callable[[], Awaitable[T]]] = None,
+                  key: str = "default") -> T:
+        """
+        Await `call()`, sending `hedge_call()` (default: `call()`) if it outlives the hedge delay.
+        A result counts as valid when the call returns without raising; if both fail, the
+        primary's error is raised.
+        """
+        loop = asyncio.get_running_loop()
+        tracker = self.tracker(key)
+        self.calls += 1
+        self.recent.append(False)
+        delay = self.hedge_delay(key)
+
+        started = loop.time()
+        primary = asyncio.ensure_future(call())
+        try:
+            if delay is not None:
+                await asyncio.wait({primary}, timeout=delay)
+            if primary.done() or delay is None:
+                result = await primary
+                tracker.record(loop.time() - started)
+                return result
+            if not self.may_hedge():
+                self.capped += 1
+                result = await primary
+                tracker.record(loop.time() - started)
+                return result
+
+            self.recent[-1] = True
+            self.hedged += 1
+            hedge_started = loop.time()
+            hedge = asyncio.ensure_future((hedge_call or call)())
+            try:
+                return await self._race(primary, hedge, started, hedge_started, tracker)
+            finally:
+                hedge.cancel()
+        finally:
+            primary.cancel()
+
+    async def _race(self, primary: asyncio.Future, hedge: asyncio.Future,
+                    started: float, hedge_started: float, tracker: LatencyTracker):
+        """
+        Return the first successful result of the two calls and record who won.
+        """
+        loop = asyncio.get_running_loop()
+        pending = {primary, hedge}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    continue
+                if task is primary:
+                    self.primary_wins += 1
+                    tracker.record(loop.time() - started)
+                else:
+                    self.hedge_wins += 1
+                    tracker.record(loop.time() - hedge_started)
+                    # The primary was at least this slow; keep that in the window too
+                    tracker.record(loop.time() - started)
+                return task.result()
+        return primary.result()
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "primary_wins": self.primary_wins,
+            "capped": self.capped,
+            "hedge_rate": round(self.hedged / self.calls, 4) if self.calls else 0.0,
+            "max_rate": self.max_rate,
+            "hedge_delay": {key: self.hedge_delay(key) for key in self.trackers},
+        }
+
+_hedgers: Dict[str, Hedger] = {}
+
+def get_hedger(name: Optional[str] = None) -> Hedger:
+    """
+    Return the hedger for an endpoint (default: the endpoint of the current request).
+    """
+    name = name or current_endpoint.get()
+    hedger = _hedgers.get(name)
+    if hedger is None:
+        hedger = _hedgers[name] = Hedger(max_rate=HEDGE_ENDPOINT_RATES.get(name, HEDGE_MAX_RATE))
+    return hedger
+
+async def hedged(call: Callable[[], Awaitable[T]], hedge_call: Optional[Callable[[], Awaitable[T]]] = None,
+                 key: str = "default") -> T:
+    """
+    Run `call()` hedged under the current endpoint's policy, or plainly if HEDGE_ENABLED is off.
+    """
+    if not HEDGE_ENABLED:
+        return await call()
+    return await get_hedger().run(call, hedge_call, key)
+
+def hedging_stats() -> dict:
+    return {name: hedger.stats() for name, hedger in _hedgers.items()}
@@ -0,0 +1,339 @@
+"""
+Jobs module for the backend.
+
+This module runs catalog-scale extraction jobs in the background. Jobs and their items
+are stored in SQLite; each finished item is checkpointed as soon as it completes, so a
+restart resumes every job from its remaining items without redoing finished ones. Items
+hit by a transient failure (rate limit, timeout, outage) are retried later, a bounded
+number of times, before being recorded as failed. The runner does its SQLite reads and
+writes in worker threads so that request handling is never blocked on them.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from typing import List, Optional, Set, Tuple
+
+from backend.batch import failed_item, run_item
+from backend.catalog import store_sync_result
+from backend.config import JOBS_DB_PATH, JOBS_WORKERS, JOBS_MAX_ATTEMPTS, JOBS_RETRY_BACKOFF
+from backend.ratelimit import priority, PRIORITY_BATCH
+from backend.schemas import BatchItem, JobStatus
+
+logger = logging.getLogger(__name__)
+
+class JobStore:
+    """
+    Jobs and per-item checkpoints in a SQLite file (WAL mode).
+    Items stay 'pending' until their result is written, so nothing is lost on a crash.
+    """
+    def __init__(self, path: str = JOBS_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                mode TEXT NOT NULL,
+                status TEXT NOT NULL,
+                schema_attributes TEXT,
+                use_cache INTEGER NOT NULL,
+                sync INTEGER NOT NULL DEFAULT 0,
+                total INTEGER NOT NULL,
+                succeeded INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS job_items (
+                job_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                item TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                seq INTEGER,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                not_before REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (job_id, idx)
+            );
+            CREATE INDEX IF NOT EXISTS job_items_pending ON job_items (status, job_id, idx);
+            CREATE INDEX IF NOT EXISTS job_items_seq ON job_items (job_id, seq);
+            """
+        )
+        # Files created by earlier versions lack the newer columns
+        for table, column, kind in (
+            ("job_items", "attempts", "INTEGER"), ("job_items", "not_before", "REAL"), ("jobs", "sync", "INTEGER")
+        ):
+            if column not in {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind} NOT NULL DEFAULT 0")
+
+    def create_job(self, mode: str, items: List[BatchItem], schema_attributes: Optional[List[str]] = None,
+                   use_cache: bool = True, sync: bool = False) -> JobStatus:
+        """
+        Queue a job. A `sync` job also stores each SKU's result in the catalog SKU store.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT INTO jobs (id, mode, status, schema_attributes, use_cache, sync, total, created_at, updated_at)"
+                    " VALUES (?, ?, 'queued', ?, ?, ?, ?, ?, ?)",
+                    (job_id, mode, json.dumps(schema_attributes), int(use_cache), int(sync), len(items), now, now),
+                )
+                self._conn.executemany(
+                    "INSERT INTO job_items (job_id, idx, item, status) VALUES (?, ?, ?, 'pending')",
+                    ((job_id, index, item.model_dump_json()) for index, item in enumerate(items)),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get_job(job_id)
+
+    def get_job(self, job_id: str) -> Optional[JobStatus]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, mode, status, total, succeeded, failed, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job_id, mode, status, total, succeeded, failed, created_at, updated_at = row
+        return JobStatus(
+            id=job_id, mode=mode, status=status, total=total, completed=succeeded + failed,
+            succeeded=succeeded, failed=failed, created_at=created_at, updated_at=updated_at,
+        )
+
+    def pending_items(self, limit: int, exclude: Set[Tuple[str, int]] = frozenset()) -> list:
+        """
+        Oldest jobs' pending items that are due first:
+        (job_id, idx, mode, item, schema_attributes, use_cache, attempts, sync).
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT i.job_id, i.idx, j.mode, i.item, j.schema_attributes, j.use_cache, i.attempts, j.sync"
+                " FROM job_items i JOIN jobs j ON j.id = i.job_id"
+                " WHERE i.status = 'pending' AND i.not_before <= ? ORDER BY j.created_at, i.idx LIMIT ?",
+                (time.time(), limit + len(exclude)),
+            ).fetchall()
+        claimable = [row for row in rows if (row[0], row[1]) not in exclude][:limit]
+        return [
+            (job_id, idx, mode, BatchItem.model_validate_json(item), json.loads(schema), bool(use_cache), attempts,
+             bool(sync))
+            for job_id, idx, mode, item, schema, use_cache, attempts, sync in claimable
+        ]
+
+    def retry_item(self, job_id: str, idx: int, delay: float) -> None:
+        """
+        Leave a pending item for another attempt in `delay` seconds.
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE job_items SET attempts = attempts + 1, not_before = ?"
+                " WHERE job_id = ? AND idx = ? AND status = 'pending'",
+                (time.time() + delay, job_id, idx),
+            )
+
+    def complete_item(self, job_id: str, idx: int, result_json: str, failed: bool) -> bool:
+        """
+        Checkpoint one finished item and update the job counters in a single transaction.
+        Returns False if the item was already complete.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                total, succeeded, failed_count = self._conn.execute(
+                    "SELECT total, succeeded, failed FROM jobs WHERE id = ?", (job_id,)
+                ).fetchone()
+                seq = succeeded + failed_count + 1
+                updated = self._conn.execute(
+                    "UPDATE job_items SET status = ?, result = ?, seq = ? WHERE job_id = ? AND idx = ? AND status = 'pending'",
+                    ("failed" if failed else "done", result_json, seq, job_id, idx),
+                ).rowcount
+                if updated:
+                    self._conn.execute(
+                        "UPDATE jobs SET succeeded = succeeded + ?, failed = failed + ?, status = ?, updated_at = ?"
+                        " WHERE id = ?",
+                        (0 if failed else 1, 1 if failed else 0, "completed" if seq >= total else "running", now, job_id),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return bool(updated)
+
+    def results(self, job_id: str, after: int = 0, limit: int = 1000) -> List[Tuple[int, str]]:
+        """
+        Finished item results in completion order, after the `after` sequence number: (seq, result JSON).
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT seq, result FROM job_items WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (job_id, after, limit),
+            ).fetchall()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class JobRunner:
+    """
+    Worker pool draining the pending items of all jobs, oldest job first.
+    """
+    def __init__(self, store: JobStore, workers: int = JOBS_WORKERS):
+        self.store = store
+        self.workers = max(1, workers)
+        self._queue: Optional[asyncio.Queue] = None
+        self._claimed: Set[Tuple[str, int]] = set()
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._progress: Optional[asyncio.Condition] = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        """
+        Start the dispatcher and workers; any pending items from before a restart are picked up.
+        """
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.workers)
+        self._wakeup = asyncio.Event()
+        self._progress = asyncio.Condition()
+        with priority(PRIORITY_BATCH):
+            self._tasks = [asyncio.create_task(self._dispatch())]
+            self._tasks += [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """
+        Cancel the workers. Items in flight stay pending and are redone on the next start.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._claimed.clear()
+
+    async def submit(self, mode: str, items: List[BatchItem], schema_attributes: Optional[List[str]] = None,
+                     use_cache: bool = True, sync: bool = False) -> JobStatus:
+        # Writing up to JOBS_MAX_ITEMS rows takes a while; keep it off the event loop
+        job = await asyncio.to_thread(self.store.create_job, mode, items, schema_attributes, use_cache, sync)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def get_job(self, job_id: str) -> Optional[JobStatus]:
+        """
+        The job's status, read off the event loop.
+        """
+        return await asyncio.to_thread(self.store.get_job, job_id)
+
+    async def _dispatch(self) -> None:
+        while True:
+            # Cleared before the query, so a wakeup arriving while it runs is not lost; the
+            # claimed set is copied because the workers update it meanwhile
+            self._wakeup.clear()
+            batch = await asyncio.to_thread(self.store.pending_items, self.workers * 4, set(self._claimed))
+            if not batch:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=5)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            for entry in batch:
+                self._claimed.add((entry[0], entry[1]))
+                await self._queue.put(entry)
+
+    async def _work(self) -> None:
+        while True:
+            job_id, idx, mode, item, schema, use_cache, attempts, sync = await self._queue.get()
+            try:
+                try:
+                    result = await run_item(mode, idx, item, schema, use_cache, raise_transient=True)
+                except Exception as exc:
+                    if attempts + 1 < JOBS_MAX_ATTEMPTS:
+                        logger.warning("Job %s item %d failed (attempt %d), retrying: %r", job_id, idx, attempts + 1, exc)
+                        delay = JOBS_RETRY_BACKOFF * 2 ** attempts
+                        await asyncio.to_thread(self.store.retry_item, job_id, idx, delay)
+                        self._wakeup.set()
+                        continue
+                    result = failed_item(mode, idx, item, exc)
+                if sync and result.result is not None:
+                    # Stored before the checkpoint, so a crash in between only redoes the item
+                    await asyncio.to_thread(store_sync_result, mode, item, schema, result.result)
+                await asyncio.to_thread(
+                    self.store.complete_item, job_id, idx, result.model_dump_json(), result.error is not None
+                )
+            except Exception:
+                # Storage failure: leave the item pending so it is retried later
+                logger.exception("Job %s item %d could not be checkpointed", job_id, idx)
+            finally:
+                self._claimed.discard((job_id, idx))
+            async with self._progress:
+                self._progress.notify_all()
+
+    async def wait_for_progress(self, timeout: float) -> None:
+        """
+        Wait until any item finishes (or `timeout` seconds pass).
+        """
+        if self._progress is None:
+            await asyncio.sleep(timeout)
+            return
+        async with self._progress:
+            try:
+                await asyncio.wait_for(self._progress.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def stream_results(self, job_id: str, after: int = 0, follow: bool = True,
+                             poll_interval: float = 1.0):
+        """
+        Yield finished item results as NDJSON lines in completion order, starting after
+        sequence number `after`. With `follow`, keep streaming until the job completes.
+        """
+        while True:
+            # Status first: a job seen as completed has all of its results committed, so the
+            # read that follows cannot miss an item finishing in between
+            job = await self.get_job(job_id)
+            rows = await asyncio.to_thread(self.store.results, job_id, after)
+            for seq, result in rows:
+                after = seq
+                yield result + "\n"
+            if rows:
+                continue
+            if not follow or job is None or job.status == "completed":
+                return
+            await self.wait_for_progress(poll_interval)
+
+_runner: Optional[JobRunner] = None
+
+def get_job_runner() -> JobRunner:
+    """
+    Return the process-wide job runner, opening the job store on first use.
+    """
+    global _runner
+    if _runner is None:
+        _runner = JobRunner(JobStore())
+    return _runner
+
+async def startup_jobs() -> None:
+    """
+    Start the worker pool, resuming any unfinished jobs.
+    """
+    get_job_runner().start()
+
+async def shutdown_jobs() -> None:
+    if _runner is not None:
+        await _runner.stop()
@@ -0,0 +1,183 @@
+"""
+Merge module for the backend.
+
+This module merges the exploratory (non targeted) and targeted extraction outputs
+locally, replacing the LLM merge call for the common, mechanical cases.
+"""
+
+import re
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional
+
+from backend.config import (
+    MERGE_VALUE_SIMILARITY,
+    MERGE_NAME_SIMILARITY,
+    MERGE_AMBIGUOUS_NAME_SIMILARITY,
+    MERGE_CONFLICTS_ARE_AMBIGUOUS,
+)
+from backend.schemas import ExtractResponse, CleanedAttribute, CleanedExtractResponse
+
+NA_VALUES = {"n/a", "na", "n.a.", "none", "unknown", "not applicable", "not specified", "-"}
+
+# Spelling variants folded before comparing attribute names
+NAME_SYNONYMS = {
+    "color": "colour",
+    "colors": "colour",
+    "colours": "colour",
+    "aluminum": "aluminium",
+}
+
+METHOD_NON_TARGETED = "non targeted"
+METHOD_TARGETED = "targeted"
+METHOD_BOTH = "non targeted; targeted"
+
+_SEPARATORS = re.compile(r"[\s\-_/]+")
+_EDGE_PUNCTUATION = re.compile(r"^[\s.,;:]+|[\s.,;:]+$")
+_DIGITS = re.compile(r"\d+(?:[.,]\d+)?")
+
+def normalize_value(value: str) -> str:
+    """
+    Normalise a value for comparison: casefold, hyphens/underscores to spaces, collapse whitespace.
+    """
+    value = _EDGE_PUNCTUATION.sub("", value.casefold())
+    return _SEPARATORS.sub(" ", value).strip()
+
+def normalize_name(name: str) -> str:
+    """
+    Normalise an attribute name for comparison, folding common spelling variants.
+    """
+    words = normalize_value(name).split(" ")
+    return " ".join(NAME_SYNONYMS.get(word, word) for word in words)
+
+def _compact(text: str) -> str:
+    """
+    Key that ignores spacing entirely, so 'T-Shirt', 't shirt' and 'tshirt' collide.
+    """
+    return text.replace(" ", "")
+
+def is_na(value: str) -> bool:
+    """
+    True when a value is empty or one of the N/A placeholders.
+    """
+    raw = value.strip().casefold()
+    return not raw or raw in NA_VALUES or normalize_value(value) in NA_VALUES
+
+def similarity(a: str, b: str) -> float:
+    """
+    Similarity ratio (0-1) of two already-normalised strings.
+    """
+    if _compact(a) == _compact(b):
+        return 1.0
+    return SequenceMatcher(None, a, b).ratio()
+
+def values_match(a: str, b: str, threshold: float = MERGE_VALUE_SIMILARITY) -> bool:
+    """
+    True when two values are duplicates: equal after normalisation, or fuzzily equal
+    with the same numbers (so '10 cm' and '12 cm' are never folded).
+    """
+    a_norm, b_norm = normalize_value(a), normalize_value(b)
+    if _compact(a_norm) == _compact(b_norm):
+        return True
+    if _DIGITS.findall(a_norm) != _DIGITS.findall(b_norm):
+        return False
+    return similarity(a_norm, b_norm) >= threshold
+
+def tidy_values(values: List[str], threshold: float = MERGE_VALUE_SIMILARITY) -> List[str]:
+    """
+    Drop N/A values and fold duplicates, keeping the first spelling seen.
+    """
+    kept: List[str] = []
+    for value in values:
+        if not isinstance(value, str) or is_na(value):
+            continue
+        value = value.strip()
+        if not any(values_match(value, existing, threshold) for existing in kept):
+            kept.append(value)
+    return kept
+
+def _find_name(name: str, names: List[str], threshold: float) -> Optional[int]:
+    """
+    Index of the best matching normalised name at or above `threshold`, if any.
+    """
+    best_index, best_score = None, threshold
+    for index, candidate in enumerate(names):
+        score = similarity(name, candidate)
+        if score >= best_score:
+            best_index, best_score = index, score
+    return best_index
+
+def _attributes(output) -> list:
+    """
+    Accept either an ExtractResponse or its plain dict form.
+    """
+    if isinstance(output, ExtractResponse):
+        return [(a.name, list(a.value)) for a in output.attributes]
+    return [(a.get("name"), list(a.get("value") or [])) for a in (output or {}).get("attributes", [])]
+
+def merge_outputs(non_targeted_output, targeted_output,
+                  value_threshold: float = MERGE_VALUE_SIMILARITY,
+                  name_threshold: float = MERGE_NAME_SIMILARITY) -> CleanedExtractResponse:
+    """
+    Merge non targeted and targeted outputs locally.
+
+    Targeted attributes come first and keep their (schema) names; non targeted attributes
+    that match one of them by name are folded in, the rest are appended. N/A values are
+    dropped, duplicate values folded, and empty attributes removed. `method` records
+    which extraction(s) contributed values.
+    """
+    names: List[str] = []
+    merged: List[Dict] = []
+
+    for method, output in ((METHOD_TARGETED, targeted_output), (METHOD_NON_TARGETED, non_targeted_output)):
+        for name, values in _attributes(output):
+            if not name or not isinstance(name, str):
+                continue
+            values = tidy_values(values, value_threshold)
+            norm = normalize_name(name)
+            if method == METHOD_TARGETED:
+                # Schema names are distinct by definition; only fold exact duplicates
+                index = names.index(norm) if norm in names else None
+            else:
+                index = _find_name(norm, names, name_threshold)
+            if index is None:
+                names.append(norm)
+                merged.append({"name": name.strip(), "value": [], "methods": set()})
+                index = len(merged) - 1
+            entry = merged[index]
+            if values:
+                entry["methods"].add(method)
+                entry["value"] = tidy_values(entry["value"] + values, value_threshold)
+
+    attributes = []
+    for entry in merged:
+        if not entry["value"]:
+            continue
+        methods = entry["methods"]
+        method = METHOD_BOTH if len(methods) == 2 else next(iter(methods))
+        attributes.append(CleanedAttribute(name=entry["name"], value=entry["value"], method=method))
+    return CleanedExtractResponse(attributes=attributes)
+
+def find_ambiguities(non_targeted_output, targeted_output,
+                     value_threshold: float = MERGE_VALUE_SIMILARITY,
+                     name_threshold: float = MERGE_NAME_SIMILARITY,
+                     ambiguous_name_threshold: float = MERGE_AMBIGUOUS_NAME_SIMILARITY,
+                     conflicts_are_ambiguous: bool = MERGE_CONFLICTS_ARE_AMBIGUOUS) -> List[str]:
+    """
+    Reasons the local merge may be wrong and an LLM merge is warranted:
+    attribute names that are close but not close enough to fold, and (optionally)
+    attributes whose targeted and non targeted values share nothing.
+    Returns an empty list when the local merge can be trusted.
+    """
+    reasons = []
+    targeted = [(normalize_name(n), n, tidy_values(v, value_threshold)) for n, v in _attributes(targeted_output) if n]
+    non_targeted = [(normalize_name(n), n, tidy_values(v, value_threshold)) for n, v in _attributes(non_targeted_output) if n]
+
+    for t_norm, t_name, t_values in targeted:
+        for n_norm, n_name, n_values in non_targeted:
+            score = similarity(t_norm, n_norm)
+            if ambiguous_name_threshold <= score < name_threshold:
+                reasons.append(f"similar names '{t_name}' / '{n_name}'")
+            elif score >= name_threshold and conflicts_are_ambiguous and t_values and n_values:
+                if not any(values_match(a, b, value_threshold) for a in t_values for b in n_values):
+                    reasons.append(f"conflicting values for '{t_name}'")
+    return reasons
@@ -0,0 +1,241 @@
+"""
+Metrics module for the backend.
+
+This module defines the Prometheus metrics (per-endpoint and per-stage latency, LLM call
+durations and token usage by model, model cascade tiers, in-flight requests, errors by
+type), the ASGI middleware that records them for every HTTP request, and the per-request
+stage timings returned to callers in the Server-Timing header.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from starlette.routing import Match
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by endpoint.",
+    ["method", "endpoint", "status"], buckets=REQUEST_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served.", ["method", "endpoint"],
+)
+HTTP_ERRORS = Counter(
+    "http_errors_total", "HTTP requests that failed, by error type (exception class or status).",
+    ["endpoint", "type"],
+)
+STAGE_DURATION = Histogram(
+    "pipeline_stage_duration_seconds", "Latency of extraction pipeline stages.",
+    ["stage"], buckets=REQUEST_BUCKETS,
+)
+LLM_CALL_DURATION = Histogram(
+    "llm_call_duration_seconds", "Duration of individual chat completion calls.",
+    ["model", "outcome"], buckets=LLM_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "Tokens reported in response.usage.", ["model", "kind"],
+)
+LLM_ERRORS = Counter(
+    "llm_errors_total", "Chat completion calls that raised, by exception class.", ["model", "type"],
+)
+CASCADE_TIER_DURATION = Histogram(
+    "cascade_tier_duration_seconds", "Latency of each model cascade tier (call and parse).",
+    ["kind", "model"], buckets=LLM_BUCKETS,
+)
+CASCADE_ESCALATIONS = Counter(
+    "cascade_escalations_total", "Tier outputs sent on to the next model, by failed check.",
+    ["kind", "model", "reason"],
+)
+
+# Stage name -> accumulated seconds for the current HTTP request (None outside requests)
+stage_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "stage_timings", default=None
+)
+
+def add_stage_time(name: str, seconds: float) -> None:
+    """
+    Add `seconds` to the current request's Server-Timing entry for `name`.
+    """
+    timings = stage_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+@contextmanager
+def stage(name: str):
+    """
+    Time the enclosed block as a pipeline stage (histogram and Server-Timing).
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_DURATION.labels(stage=name).observe(elapsed)
+        add_stage_time(name, elapsed)
+
+def observe_llm_call(model: str, seconds: float, response=None, error: BaseException = None) -> None:
+    """
+    Record one chat completion call: its duration, token usage and any error.
+    """
+    LLM_CALL_DURATION.labels(model=model, outcome="error" if error is not None else "ok").observe(seconds)
+    add_stage_time("llm", seconds)
+    if error is not None:
+        LLM_ERRORS.labels(model=model, type=type(error).__name__).inc()
+        return
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        LLM_TOKENS.labels(model=model, kind="prompt").inc(getattr(usage, "prompt_tokens", 0) or 0)
+        LLM_TOKENS.labels(model=model, kind="completion").inc(getattr(usage, "completion_tokens", 0) or 0)
+
+def server_timing_header(timings: Dict[str, float], total: float) -> str:
+    """
+    Format stage timings as a Server-Timing header value (durations in milliseconds).
+    """
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, in-flight and error metrics per route template,
+    and adding a Server-Timing header with the stage breakdown of each response.
+    Plain ASGI (not BaseHTTPMiddleware), so streamed request and response bodies are untouched.
+    """
+    def __init__(self, app, routes=()):
+        self.app = app
+        self.routes = routes
+
+    def endpoint_label(self, scope) -> str:
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", scope["path"])
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        endpoint = self.endpoint_label(scope)
+        timings: Dict[str, float] = {}
+        token = stage_timings.set(timings)
+        started = time.perf_counter()
+        status = 500
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method=method, endpoint=endpoint)
+        in_flight.inc()
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = server_timing_header(timings, time.perf_counter() - started)
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        except Exception as exc:
+            HTTP_ERRORS.labels(endpoint=endpoint, type=type(exc).__name__).inc()
+            raise
+        else:
+            if status >= 400:
+                HTTP_ERRORS.labels(endpoint=endpoint, type=f"http_{status}").inc()
+        finally:
+            in_flight.dec()
+            HTTP_REQUEST_DURATION.labels(method=method, endpoint=endpoint, status=str(status)).observe(
+                time.perf_counter() - started
+            )
+            stage_timings.reset(token)
+
+class RuntimeStatsCollector:
+    """
+    Expose the in-process counters already kept by the cache, single-flight, fast path,
+    scheduler, hedging, variant and admission modules as Prometheus metrics at scrape time.
+    """
+    def describe(self):
+        # Nothing to describe up front, so registering never imports the pipeline modules
+        return []
+
+    def collect(self):
+        # Imported here to keep this module free of import cycles with the pipeline modules
+        from backend.cache import get_result_cache
+        from backend.singleflight import get_single_flight
+        from backend import rules
+        from backend.ratelimit import scheduler_stats
+        from backend.hedging import hedging_stats
+        from backend.variants import variant_stats
+        from backend.admission import admission_stats
+
+        cache = get_result_cache().stats()
+        lookups = CounterMetricFamily("result_cache_lookups", "Result cache lookups by outcome.", labels=["result"])
+        lookups.add_metric(["hit"], cache.get("hits", 0))
+        lookups.add_metric(["miss"], cache.get("misses", 0))
+        lookups.add_metric(["disk_hit"], cache.get("disk_hits", 0))
+        yield lookups
+        evictions = CounterMetricFamily("result_cache_evictions", "Result cache evictions.")
+        evictions.add_metric([], cache.get("evictions", 0))
+        yield evictions
+
+        coalescing = get_single_flight().stats()
+        coalesced = CounterMetricFamily("coalesced_requests", "Identical concurrent calls by role.", labels=["role"])
+        coalesced.add_metric(["leader"], coalescing.get("leaders", 0))
+        coalesced.add_metric(["follower"], coalescing.get("followers", 0))
+        yield coalesced
+
+        fast_path = CounterMetricFamily("fast_path_events", "Rule-based fast path counters.", labels=["event"])
+        for event, value in rules.stats.as_dict().items():
+            if isinstance(value, int):
+                fast_path.add_metric([event], value)
+        yield fast_path
+
+        queued = GaugeMetricFamily("llm_scheduler_queued", "Calls waiting for rate-limit admission.", labels=["model"])
+        retries = CounterMetricFamily("llm_scheduler_retries", "Retried chat completion calls.", labels=["model"])
+        for model, values in scheduler_stats().items():
+            queued.add_metric([model], values["queued"])
+            retries.add_metric([model], values["retries"])
+        yield queued
+        yield retries
+
+        hedges = CounterMetricFamily("llm_hedges", "Hedged calls by outcome.", labels=["endpoint", "outcome"])
+        for name, values in hedging_stats().items():
+            hedges.add_metric([name, "hedged"], values["hedged"])
+            hedges.add_metric([name, "hedge_won"], values["hedge_wins"])
+            hedges.add_metric([name, "primary_won"], values["primary_wins"])
+            hedges.add_metric([name, "capped"], values["capped"])
+        yield hedges
+
+        variants = variant_stats()
+        reuse = CounterMetricFamily("variant_reuse_events", "Variant reuse counters for basic extraction.", labels=["event"])
+        for event in ("lookups", "matches", "full_reuse", "rules_only", "targeted_calls",
+                      "attributes_reused", "attributes_reextracted"):
+            reuse.add_metric([event], variants[event])
+        yield reuse
+        entries = GaugeMetricFamily("variant_index_entries", "Extracted products held in the variant index.")
+        entries.add_metric([], variants["entries"])
+        yield entries
+
+        admission = admission_stats()
+        load = GaugeMetricFamily("admission_requests", "Admission-controlled requests by state.", labels=["state"])
+        load.add_metric(["in_flight"], admission["in_flight"])
+        load.add_metric(["waiting"], admission["waiting"])
+        yield load
+        outcomes = CounterMetricFamily("admission_events", "Admission control outcomes.", labels=["event"])
+        for event in ("admitted", "queued", "rejected", "timed_out", "deadline_exceeded"):
+            outcomes.add_metric([event], admission[event])
+        yield outcomes
+
+REGISTRY.register(RuntimeStatsCollector())
+
+def render_metrics() -> tuple:
+    """
+    Return the Prometheus text exposition and its content type.
+    """
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
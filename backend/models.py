@@ -4,112 +4,285 @@ Models module for the backend.
 This module defines the model functions for LLM extraction.
 """
 
+import asyncio
 import json
-from openai import OpenAI
-from backend.schemas import ExtractResponse, CleanedExtractResponse
-from backend.config import OPENAI_API_KEY
+import logging
+import time
+from typing import AsyncIterator, Optional
+from backend.client import get_openai_client, get_async_openai_client
+from backend.admission import within_deadline
+from backend.cache import fingerprint, cached_call
+from backend.cascade import run_cascade, cascade_tiers
+from backend.config import (
+    HYBRID_MERGE_MODE,
+    RULES_ENABLED,
+    RULES_MIN_CONFIDENCE,
+    TARGETED_SHARD_SIZE,
+    RATE_LIMIT_ENABLED,
+    VARIANT_REUSE_ENABLED,
+)
+from backend.hedging import hedged
+from backend.metrics import stage, observe_llm_call
+from backend.merge import merge_outputs, find_ambiguities, normalize_name, is_na
+from backend.preprocess import preprocess_description, PreprocessResult
+from backend.ratelimit import get_scheduler
+from backend.registry import normalize_attributes, render_schema_fragment
+from backend.rules import extract_with_rules
+from backend.tokens import estimate_request_tokens
+from backend.variants import explains_added_tokens, get_variant_index, VariantMatch
+from backend.schemas import Attribute, ExtractResponse, CleanedExtractResponse
 
-def get_openai_client():
-    """
-    Set up the OpenAI client.
-    """
-    return OpenAI(api_key=OPENAI_API_KEY)
+logger = logging.getLogger(__name__)
 
-#Run the exploratory approach (LLM picks the names)
-def run_extraction_basic(title: str, description: str) -> ExtractResponse:
+EXTRACTION_MODEL = "gpt-4.1-mini"
+MERGE_MODEL = "gpt-4o-mini"
+# Bump when a prompt or response schema changes so cached results are not reused
+BASIC_PROMPT_VERSION = "basic-v1"
+TARGETED_PROMPT_VERSION = "targeted-v2"
+HYBRID_PROMPT_VERSION = "hybrid-v1"
+
+def prompt_version(mode: str, cascade: bool = True) -> str:
     """
-    Extract basic attributes from product content using OpenAI GPT-4.1-mini
-    Returns a Pydantic model ExtractResponse
+    Version tag of the prompts (and model cascades) behind an extraction mode; a change
+    invalidates stored results. Paths that call EXTRACTION_MODEL directly instead of the
+    cascade (streaming, packing) use `cascade=False`.
     """
-    client = get_openai_client()
-    response = client.chat.completions.create(
-        model="gpt-4.1-mini",
-        messages=[
-            {
-                "role": "system",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": (
-                            "Extract product specification attributes from the provided product content and return a structured output.\n\n"
-                            "# Steps\n\n"
-                            "1. Identify Key Specifications: Focus on objective specs such as dimensions, weight, material, colour, finish, size, capacity, model number, voltage, IP rating, etc. Do not include features, benefits, applications, marketing copy, or purposes.\n\n"
-                            "2. Analyze Context: Use context and industry terminology to extract precise specifications.\n\n"
-                            "3. Extract and Categorize: Propose clear attribute names and map the corresponding value(s) found in the content.\n\n"
-                            "4. Ensure Completeness: Prefer high-signal specs; avoid overly long or random attribute lists.\n\n"
-                            "5. Format for Consistency: Output values as a list of strings. If unknown, use ['N/A'].\n\n"
-                            "# Output Format\n\n"
-                            "Return JSON as an array of {name, value} objects where value is List[str].\n\n"
-                            "# Notes\n\n"
-                            "- Do NOT create attributes named 'Title', 'Description', 'Brand', or other metadata fields.\n"
-                            "- Extract only attributes applicable to this specific product; do not include options for other variants or the product family.\n"
-                            "- Consider synonyms only when certainty is high.\n"
-                            "- Handle ranges appropriately; when in doubt, return the range as it appears (e.g., '10-20 cm').\n"
-                            "- If multiple values exist (e.g., colours), return each as a separate string in the list (no semicolons).\n"
-                            "- Attribute names are 1-4 words, never sentences; keep labels concise and standard.\n"
-                            "- Ensure values are in a tidied up casing"
-                        )
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": f"{title}\n\n{description}"
+    if mode == "basic":
+        version, kinds = BASIC_PROMPT_VERSION, ("basic",)
+    elif mode == "targeted":
+        version, kinds = TARGETED_PROMPT_VERSION, ("targeted",)
+    else:
+        version, kinds = f"{HYBRID_PROMPT_VERSION}:{HYBRID_MERGE_MODE}", ("basic", "targeted", "merge")
+    cascades = [f"{kind}={'>'.join(cascade_tiers(kind))}" for kind in kinds if cascade and cascade_tiers(kind)]
+    return ":".join([version, *cascades])
+
+# System prompts for the two first-stage extractions
+BASIC_SYSTEM_PROMPT = (
+    "Extract product specification attributes from the provided product content and return a structured output.\n\n"
+    "# Steps\n\n"
+    "1. Identify Key Specifications: Focus on objective specs such as dimensions, weight, material, colour, finish, size, capacity, model number, voltage, IP rating, etc. Do not include features, benefits, applications, marketing copy, or purposes.\n\n"
+    "2. Analyze Context: Use context and industry terminology to extract precise specifications.\n\n"
+    "3. Extract and Categorize: Propose clear attribute names and map the corresponding value(s) found in the content.\n\n"
+    "4. Ensure Completeness: Prefer high-signal specs; avoid overly long or random attribute lists.\n\n"
+    "5. Format for Consistency: Output values as a list of strings. If unknown, use ['N/A'].\n\n"
+    "# Output Format\n\n"
+    "Return JSON as an array of {name, value} objects where value is List[str].\n\n"
+    "# Notes\n\n"
+    "- Do NOT create attributes named 'Title', 'Description', 'Brand', or other metadata fields.\n"
+    "- Extract only attributes applicable to this specific product; do not include options for other variants or the product family.\n"
+    "- Consider synonyms only when certainty is high.\n"
+    "- Handle ranges appropriately; when in doubt, return the range as it appears (e.g., '10-20 cm').\n"
+    "- If multiple values exist (e.g., colours), return each as a separate string in the list (no semicolons).\n"
+    "- Attribute names are 1-4 words, never sentences; keep labels concise and standard.\n"
+    "- Ensure values are in a tidied up casing"
+)
+
+TARGETED_SYSTEM_PROMPT = (
+    "Extract specific product specification attributes from given product content, returning a structured output "
+    "with values matched to requested attributes. Identify and match attributes with certainty, using precise "
+    "attribute names. If an attribute is not found, return ['N/A'].\n\n"
+    "# Steps\n"
+    "1. Input Parsing: Accept a list of specific attribute names and the corresponding product content.\n"
+    "2. Attribute Matching: For each attribute name provided:\n"
+    "   - Search for the corresponding attribute value(s) in the product content.\n"
+    "   - Ensure a high degree of certainty in the match.\n"
+    "3. Fallback: If a match cannot be confidently made, assign ['N/A'] to the attribute.\n"
+    "4. Output Construction: Assemble a structured response with the matched attributes and values.\n\n"
+    "# Output Format\n"
+    "Provide the output in JSON format as an array of objects with 'name' and 'value', where 'value' is a list of strings.\n\n"
+    "# Notes\n"
+    "- Attributes may not make sense for the product; if so, keep as ['N/A'].\n"
+    "- Prioritize exact matches for attribute names to ensure accuracy.\n"
+    "- Consider common synonyms only if certainty is high.\n"
+    "- If multiple values exist (e.g., colors), return each as a separate string in the list.\n"
+    "- For product sets, do not list out all individual pieces.\n"
+    "- Attributes are typically 1-4 words, never sentences.\n"
+    "- Only return the attributes passed into the input list.\n"
+    "- Ensure values are in a tidied up casing"
+)
+
+# System prompt for the merge/cleanup step
+HYBRID_SYSTEM_PROMPT = (
+    "Combine and cleanse two attribute extraction outputs in JSON format."
+    "Ensure values appear only once; consolidate duplicates that differ only in casing or minor wording. "
+    "If an attribute appears in both, retain a single attribute entry. Remove any values equal to 'N/A'. "
+    "Return name, value (List[str]), and method used ('non targeted', 'targeted', or 'non targeted; targeted').\n\n"
+    "# Steps\n"
+    "1. Input Capture: Receive two JSON inputs, one labeled 'non targeted' and another 'targeted'.\n"
+    "2. Attribute Prioritisation: Prefer attributes present in targeted over non targeted.\n"
+    "3. Duplicate Removal: Merge duplicate values across methods into a single list, normalizing trivial differences (e.g., casing, hyphens).\n"
+    "4. N/A Removal: Remove any values equal to 'N/A'. If no values remain, drop the attribute.\n"
+    "5. Output Compilation: Produce cleaned attributes with method provenance.\n\n"
+    "# Output Format\n"
+)
+
+# JSON schema of an ExtractResponse, used for structured output
+ATTRIBUTES_JSON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "attributes": {
+            "type": "array",
+            "description": "A list of attributes consisting of name-value pairs.",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string", "description": "The name of the attribute."},
+                    "value": {
+                        "type": "array",
+                        "description": "The value(s) of the attribute as a list of strings.",
+                        "items": {"type": "string"},
+                        "minItems": 1
                     }
-                ]
+                },
+                "required": ["name", "value"],
+                "additionalProperties": False
             }
-        ],
-        temperature=1.05,
-        max_tokens=2048,
-        top_p=1,
-        frequency_penalty=0,
-        presence_penalty=0,
-        response_format={
-            "type": "json_schema",
-            "json_schema": {
-                "name": "attributes",
-                "strict": True,
-                "schema": {
-                    "type": "object",
-                    "properties": {
-                        "attributes": {
-                            "type": "array",
-                            "description": "A list of attributes consisting of name-value pairs.",
-                            "items": {
-                                "type": "object",
-                                "properties": {
-                                    "name": {
-                                        "type": "string",
-                                        "description": "The name of the attribute."
-                                    },
-                                    "value": {
-                                        "type": "array",
-                                        "description": "The value(s) of the attribute as a list of strings.",
-                                        "items": {"type": "string"},
-                                        "minItems": 1
-                                    }
-                                },
-                                "required": ["name", "value"],
-                                "additionalProperties": False
-                            }
-                        }
+        }
+    },
+    "required": ["attributes"],
+    "additionalProperties": False
+}
+
+# JSON schema of a CleanedExtractResponse, used for the merge step's structured output
+HYBRID_JSON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "attributes": {
+            "type": "array",
+            "description": "Cleaned and prioritized attributes with method provenance.",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string", "description": "Attribute name."},
+                    "value": {
+                        "type": "array",
+                        "description": "Attribute value(s) as list of strings.",
+                        "items": {"type": "string"},
+                        "minItems": 1
                     },
-                    "required": ["attributes"],
-                    "additionalProperties": False
-                }
+                    "method": {
+                        "type": "string",
+                        "description": "Source method(s) for this attribute.",
+                        "enum": ["non targeted", "targeted", "non targeted; targeted"]
+                    }
+                },
+                "required": ["name", "value", "method"],
+                "additionalProperties": False
             }
         }
+    },
+    "required": ["attributes"],
+    "additionalProperties": False
+}
+
+def system_message(text: str) -> dict:
+    """
+    Chat message carrying a system prompt.
+    """
+    return {"role": "system", "content": [{"type": "text", "text": text}]}
+
+def user_message(text: str) -> dict:
+    """
+    Chat message carrying the per-request user content.
+    """
+    return {"role": "user", "content": [{"type": "text", "text": text}]}
+
+def json_schema_format(name: str, schema: dict) -> dict:
+    """
+    Strict structured-output `response_format` for a JSON schema.
+    """
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+
+# Request templates built once at import and shared by every call. They are sent as-is
+# (the SDK serializes them without copying), so they must never be mutated.
+BASIC_SYSTEM_MESSAGE = system_message(BASIC_SYSTEM_PROMPT)
+TARGETED_SYSTEM_MESSAGE = system_message(TARGETED_SYSTEM_PROMPT)
+HYBRID_SYSTEM_MESSAGE = system_message(HYBRID_SYSTEM_PROMPT)
+ATTRIBUTES_RESPONSE_FORMAT = json_schema_format("attributes", ATTRIBUTES_JSON_SCHEMA)
+HYBRID_RESPONSE_FORMAT = json_schema_format("product_attributes", HYBRID_JSON_SCHEMA)
+# Sampling parameters shared by the extraction and merge calls
+SAMPLING_PARAMS = dict(temperature=1.05, max_tokens=2048, top_p=1, frequency_penalty=0, presence_penalty=0)
+
+# Request builders shared by the sync and async variants
+def build_basic_request(title: str, description: str) -> dict:
+    """
+    Build the chat completion arguments for the exploratory extraction.
+    """
+    return dict(
+        model=EXTRACTION_MODEL,
+        messages=[BASIC_SYSTEM_MESSAGE, user_message(f"{title}\n\n{description}")],
+        response_format=ATTRIBUTES_RESPONSE_FORMAT,
+        **SAMPLING_PARAMS,
     )
 
-    # Extract and parse JSON from response
-    message_content = response.choices[0].message.content
-    data = json.loads(message_content)
+def build_targeted_request(title: str, description: str, schema_attributes: list) -> dict:
+    """
+    Build the chat completion arguments for the targeted extraction.
+    """
+    return dict(
+        model=EXTRACTION_MODEL,
+        messages=[
+            TARGETED_SYSTEM_MESSAGE,
+            # The schema fragment goes first so requests for the same schema share a prompt prefix
+            user_message(
+                f"{render_schema_fragment(normalize_attributes(schema_attributes))}\n"
+                f"Title: {title}\nDescription: {description}"
+            ),
+        ],
+        response_format=ATTRIBUTES_RESPONSE_FORMAT,
+        **SAMPLING_PARAMS,
+    )
 
-    # Return as Pydantic model
-    return ExtractResponse(**data)
+# Normalize inputs to plain dicts for safe JSON serialization
+def to_plain_dict(obj):
+    """
+    Convert a Pydantic model or arbitrary object into a plain dict.
+    """
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(include={"attributes": {"__all__": {"name", "value"}}})
+    if isinstance(obj, dict):
+        return obj
+    return json.loads(json.dumps(obj, default=lambda o: getattr(o, "__dict__", str(o))))
+
+def attributes_json(obj) -> str:
+    """
+    JSON text of an extraction output's attribute names and values, for the merge prompt.
+    Pydantic models are serialized directly, without an intermediate dict.
+    """
+    if hasattr(obj, "model_dump_json"):
+        return obj.model_dump_json(include={"attributes": {"__all__": {"name", "value"}}})
+    return json.dumps(to_plain_dict(obj), separators=(",", ":"))
+
+def build_hybrid_request(title: str, description: str, non_targeted_output: dict, targeted_output: dict) -> dict:
+    """
+    Build the chat completion arguments for the merge/cleanup step.
+    """
+    return dict(
+        model=MERGE_MODEL,
+        messages=[
+            HYBRID_SYSTEM_MESSAGE,
+            user_message(
+                f"Title: {title}\nDescription: {description}\n\n"
+                f"Non targeted extraction JSON: {attributes_json(non_targeted_output)}\n\n"
+                f"Targeted extraction JSON: {attributes_json(targeted_output)}"
+            ),
+        ],
+        response_format=HYBRID_RESPONSE_FORMAT,
+        **SAMPLING_PARAMS,
+    )
+
+#Run the exploratory approach (LLM picks the names)
+def run_extraction_basic(title: str, description: str) -> ExtractResponse:
+    """
+    Extract basic attributes from product content using OpenAI GPT-4.1-mini
+    Returns a Pydantic model ExtractResponse
+    """
+    client = get_openai_client()
+    description = preprocess_description(description).text
+    response = client.chat.completions.create(**build_basic_request(title, description))
+
+    # Validate the JSON content straight into the Pydantic model
+    return ExtractResponse.model_validate_json(response.choices[0].message.content)
 
 #Run the targeted approach (pass the schema names and the LLM try and match the values)
 def run_targeted_prompt(title: str, description: str, schema_attributes: list) -> ExtractResponse:
@@ -118,95 +291,11 @@ def run_targeted_prompt(title: str, description: str, schema_attributes: list) -
     Returns a Pydantic model ExtractResponse
     """
     client = get_openai_client()
-    response = client.chat.completions.create(
-        model="gpt-4.1-mini",
-        messages=[
-            {
-                "role": "system",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": (
-                            "Extract specific product specification attributes from given product content, returning a structured output "
-                            "with values matched to requested attributes. Identify and match attributes with certainty, using precise "
-                            "attribute names. If an attribute is not found, return ['N/A'].\n\n"
-                            "# Steps\n"
-                            "1. Input Parsing: Accept a list of specific attribute names and the corresponding product content.\n"
-                            "2. Attribute Matching: For each attribute name provided:\n"
-                            "   - Search for the corresponding attribute value(s) in the product content.\n"
-                            "   - Ensure a high degree of certainty in the match.\n"
-                            "3. Fallback: If a match cannot be confidently made, assign ['N/A'] to the attribute.\n"
-                            "4. Output Construction: Assemble a structured response with the matched attributes and values.\n\n"
-                            "# Output Format\n"
-                            "Provide the output in JSON format as an array of objects with 'name' and 'value', where 'value' is a list of strings.\n\n"
-                            "# Notes\n"
-                            "- Attributes may not make sense for the product; if so, keep as ['N/A'].\n"
-                            "- Prioritize exact matches for attribute names to ensure accuracy.\n"
-                            "- Consider common synonyms only if certainty is high.\n"
-                            "- If multiple values exist (e.g., colors), return each as a separate string in the list.\n"
-                            "- For product sets, do not list out all individual pieces.\n"
-                            "- Attributes are typically 1-4 words, never sentences.\n"
-                            "- Only return the attributes passed into the input list.\n"
-                            "- Ensure values are in a tidied up casing"
-                        )
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": f"Title: {title}\nDescription: {description}\nAttributes: {schema_attributes}"
-                    }
-                ]
-            }
-        ],
-        temperature=1.05,
-        max_tokens=2048,
-        top_p=1,
-        frequency_penalty=0,
-        presence_penalty=0,
-        response_format={
-            "type": "json_schema",
-            "json_schema": {
-                "name": "attributes",
-                "strict": True,
-                "schema": {
-                    "type": "object",
-                    "properties": {
-                        "attributes": {
-                            "type": "array",
-                            "description": "A list of attributes consisting of name-value pairs.",
-                            "items": {
-                                "type": "object",
-                                "properties": {
-                                    "name": {"type": "string", "description": "The name of the attribute."},
-                                    "value": {
-                                        "type": "array",
-                                        "description": "The value(s) of the attribute as a list of strings.",
-                                        "items": {"type": "string"},
-                                        "minItems": 1
-                                    }
-                                },
-                                "required": ["name", "value"],
-                                "additionalProperties": False
-                            }
-                        }
-                    },
-                    "required": ["attributes"],
-                    "additionalProperties": False
-                }
-            }
-        }
-    )
-
-    # Extract and parse JSON from response
-    message_content = response.choices[0].message.content
-    data = json.loads(message_content)
+    description = preprocess_description(description).text
+    response = client.chat.completions.create(**build_targeted_request(title, description, schema_attributes))
 
-    # Return as Pydantic model
-    return ExtractResponse(**data)
+    # Validate the JSON content straight into the Pydantic model
+    return ExtractResponse.model_validate_json(response.choices[0].message.content)
 
 # Cleanup/merge approach
 def run_hybrid_prompt(title: str, description: str, non_targeted_output: dict, targeted_output: dict) -> CleanedExtractResponse:
@@ -214,97 +303,399 @@ def run_hybrid_prompt(title: str, description: str, non_targeted_output: dict, t
     Merge non targeted and targeted extraction outputs, prioritizing targeted, removing N/A values, de-duplicating values, and indicating source method(s).
     """
     client = get_openai_client()
+    description = preprocess_description(description).text
+    response = client.chat.completions.create(
+        **build_hybrid_request(title, description, non_targeted_output, targeted_output)
+    )
 
-    # Normalize inputs to plain dicts for safe JSON serialization
-    def to_plain_dict(obj):
-        if hasattr(obj, "model_dump"):
-            return obj.model_dump()
-        if isinstance(obj, dict):
-            return obj
-        return json.loads(json.dumps(obj, default=lambda o: getattr(o, "__dict__", str(o))))
+    return CleanedExtractResponse.model_validate_json(response.choices[0].message.content)
 
-    non_targeted_dict = to_plain_dict(non_targeted_output)
-    targeted_dict = to_plain_dict(targeted_output)
+# Async variants used by the API so the event loop is never blocked on an LLM round trip
+async def create_completion_async(request: dict) -> str:
+    """
+    Send one chat completion request on the shared async client and return the message content.
+    Unless RATE_LIMIT_ENABLED is off, the call goes through the model's outbound scheduler
+    (RPM/TPM buckets, priority queue, 429/5xx retries). With HEDGE_ENABLED, a call that is
+    slower than the endpoint's hedge percentile is duplicated and the first answer wins.
+    The call (queueing and retries included) is cancelled when the request's deadline passes;
+    calls shared through cached_call run without one and each caller's deadline bounds its wait.
+    """
+    return await within_deadline(_create_completion_async(request))
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {
-                "role": "system",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": (
-                            "Combine and cleanse two attribute extraction outputs in JSON format."
-                            "Ensure values appear only once; consolidate duplicates that differ only in casing or minor wording. "
-                            "If an attribute appears in both, retain a single attribute entry. Remove any values equal to 'N/A'. "
-                            "Return name, value (List[str]), and method used ('non targeted', 'targeted', or 'non targeted; targeted').\n\n"
-                            "# Steps\n"
-                            "1. Input Capture: Receive two JSON inputs, one labeled 'non targeted' and another 'targeted'.\n"
-                            "2. Attribute Prioritisation: Prefer attributes present in targeted over non targeted.\n"
-                            "3. Duplicate Removal: Merge duplicate values across methods into a single list, normalizing trivial differences (e.g., casing, hyphens).\n"
-                            "4. N/A Removal: Remove any values equal to 'N/A'. If no values remain, drop the attribute.\n"
-                            "5. Output Compilation: Produce cleaned attributes with method provenance.\n\n"
-                            "# Output Format\n"
-                            # "A JSON object with 'attributes': Array<{name: string, value: List<string>, method: string}>."
-                        )
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": f"Title: {title}\nDescription: {description}\n\nNon targeted extraction JSON: {json.dumps(non_targeted_dict)}\n\nTargeted extraction JSON: {json.dumps(targeted_dict)}"
-                    }
-                ]
-            }
-        ],
-        temperature=1.05,
-        max_tokens=2048,
-        top_p=1,
-        frequency_penalty=0,
-        presence_penalty=0,
-        response_format={
-            "type": "json_schema",
-            "json_schema": {
-                "name": "product_attributes",
-                "strict": True,
-                "schema": {
-                    "type": "object",
-                    "properties": {
-                        "attributes": {
-                            "type": "array",
-                            "description": "Cleaned and prioritized attributes with method provenance.",
-                            "items": {
-                                "type": "object",
-                                "properties": {
-                                    "name": {"type": "string", "description": "Attribute name."},
-                                    "value": {
-                                        "type": "array",
-                                        "description": "Attribute value(s) as list of strings.",
-                                        "items": {"type": "string"},
-                                        "minItems": 1
-                                    },
-                                    "method": {
-                                        "type": "string",
-                                        "description": "Source method(s) for this attribute.",
-                                        "enum": ["non targeted", "targeted", "non targeted; targeted"]
-                                    }
-                                },
-                                "required": ["name", "value", "method"],
-                                "additionalProperties": False
-                            }
-                        }
-                    },
-                    "required": ["attributes"],
-                    "additionalProperties": False
-                }
-            }
-        }
+async def _create_completion_async(request: dict) -> str:
+    """
+    Body of create_completion_async, without the deadline.
+    """
+    client = get_async_openai_client()
+    model = request["model"]
+    if not RATE_LIMIT_ENABLED:
+        async def send():
+            started = time.perf_counter()
+            try:
+                response = await client.chat.completions.create(**request)
+            except Exception as exc:
+                observe_llm_call(model, time.perf_counter() - started, error=exc)
+                raise
+            observe_llm_call(model, time.perf_counter() - started, response)
+            return response
+
+        response = await hedged(send, key=model)
+        return response.choices[0].message.content
+
+    scheduler = get_scheduler(model)
+    estimated_tokens = estimate_request_tokens(request)
+
+    async def send():
+        started = time.perf_counter()
+        try:
+            raw = await client.chat.completions.with_raw_response.create(**request)
+        except Exception as exc:
+            observe_llm_call(model, time.perf_counter() - started, error=exc)
+            raise
+        scheduler.observe_headers(raw.headers)
+        response = raw.parse()
+        observe_llm_call(model, time.perf_counter() - started, response)
+        return response
+
+    async def send_hedge():
+        # The duplicate costs a request too, so it waits for the buckets like any other call
+        await scheduler.acquire(estimated_tokens)
+        return await send()
+
+    response = await scheduler.run(lambda: hedged(send, send_hedge, key=model), estimated_tokens)
+    return response.choices[0].message.content
+
+async def stream_completion_async(request: dict) -> AsyncIterator[str]:
+    """
+    Stream the message content of one chat completion as text deltas.
+    The call waits for the model's outbound scheduler like any other (within the request's
+    deadline), but it is neither retried nor hedged: output already forwarded to the caller
+    cannot be taken back.
+    """
+    client = get_async_openai_client()
+    model = request["model"]
+    if RATE_LIMIT_ENABLED:
+        await within_deadline(get_scheduler(model).acquire(estimate_request_tokens(request)))
+    started = time.perf_counter()
+    last_chunk = None
+    try:
+        stream = await client.chat.completions.create(**request, stream=True, stream_options={"include_usage": True})
+        try:
+            async for chunk in stream:
+                last_chunk = chunk
+                for choice in chunk.choices:
+                    if choice.delta.content:
+                        yield choice.delta.content
+        finally:
+            await stream.close()
+    except Exception as exc:
+        observe_llm_call(model, time.perf_counter() - started, error=exc)
+        raise
+    # With include_usage the final chunk carries the token counts
+    observe_llm_call(model, time.perf_counter() - started, last_chunk)
+
+async def run_extraction_basic_async(title: str, description: str, use_cache: bool = True) -> ExtractResponse:
+    """
+    Async version of run_extraction_basic, served from the result cache when possible.
+    The description is preprocessed first; the result reports the tokens saved.
+    Returns a Pydantic model ExtractResponse
+    """
+    with stage("basic"):
+        with stage("preprocess"):
+            prepared = preprocess_description(description)
+        return await run_basic_llm_async(title, prepared, use_cache)
+
+async def run_basic_llm_async(title: str, prepared: PreprocessResult, use_cache: bool = True) -> ExtractResponse:
+    """
+    Basic extraction of an already preprocessed description, served from the result
+    cache when possible.
+    """
+    key = fingerprint("basic", EXTRACTION_MODEL, prompt_version("basic"), title, prepared.text)
+    return await cached_call(
+        key, ExtractResponse, lambda: _run_extraction_basic_async(title, prepared, use_cache), use_cache
+    )
+
+async def _run_extraction_basic_async(title: str, prepared: PreprocessResult, use_cache: bool = True) -> ExtractResponse:
+    """
+    Uncached body of run_extraction_basic_async.
+    A near-duplicate of an already extracted product reuses that extraction instead.
+    """
+    match = find_variant(title, prepared, use_cache)
+    if match is not None:
+        result = await extract_variant_async(title, prepared, match, use_cache)
+        if result is not None:
+            return result
+
+    result = await run_cascade(
+        "basic", build_basic_request(title, prepared.text), ExtractResponse.model_validate_json, create_completion_async
+    )
+    result.tokens_saved = prepared.tokens_saved
+    if VARIANT_REUSE_ENABLED:
+        get_variant_index().add(title, prepared.text, result.model_dump())
+    return result
+
+def find_variant(title: str, prepared: PreprocessResult, use_cache: bool = True) -> Optional[VariantMatch]:
+    """
+    The already extracted near-duplicate of a product, when variant reuse applies.
+    """
+    if not (VARIANT_REUSE_ENABLED and use_cache):
+        return None
+    with stage("variants"):
+        return get_variant_index().find(title, prepared.text)
+
+async def extract_variant_async(title: str, prepared: PreprocessResult, match: VariantMatch,
+                                use_cache: bool = True) -> Optional[ExtractResponse]:
+    """
+    Build a basic extraction from a matching variant: attributes whose values do not
+    depend on the differing text are reused, the others are resolved by the rules when
+    possible and otherwise by one targeted call for just those attributes.
+    Returns None when the variant gained words that none of the re-extracted values
+    account for (e.g. a colour the other product did not mention): it needs a full call.
+    """
+    stats = get_variant_index().stats
+    changed = match.changed
+    if match.added and not changed:
+        stats.fallbacks += 1
+        return None
+    with stage("rules"):
+        resolved = extract_with_rules(title, prepared.text, changed, RULES_MIN_CONFIDENCE) if RULES_ENABLED and changed else {}
+    unresolved = [name for name in changed if name not in resolved]
+    llm_output = await run_targeted_llm_async(title, prepared, unresolved, use_cache) if unresolved else None
+
+    reextracted = [{"value": rule.values} for rule in resolved.values()]
+    reextracted += [attribute.model_dump() for attribute in (llm_output.attributes if llm_output else [])]
+    if not explains_added_tokens(reextracted, match.added):
+        stats.fallbacks += 1
+        return None
+
+    stats.attributes_reused += len(match.result["attributes"]) - len(changed)
+    stats.attributes_reextracted += len(changed)
+    if not changed:
+        stats.full_reuse += 1
+    elif unresolved:
+        stats.targeted_calls += 1
+    else:
+        stats.rules_only += 1
+
+    llm_attributes = {attribute.name: attribute for attribute in (llm_output.attributes if llm_output else [])}
+    attributes = []
+    for attribute in match.result["attributes"]:
+        name = attribute["name"]
+        if name in resolved:
+            attributes.append(Attribute(name=name, value=resolved[name].values, source="rules"))
+        elif name in llm_attributes:
+            attributes.append(llm_attributes.pop(name))
+        elif name not in changed:
+            attributes.append(Attribute(name=name, value=attribute["value"], source="variant"))
+    attributes.extend(llm_attributes.values())
+    return ExtractResponse(attributes=attributes, tokens_saved=prepared.tokens_saved)
+
+async def run_targeted_prompt_async(title: str, description: str, schema_attributes: list,
+                                    use_cache: bool = True) -> ExtractResponse:
+    """
+    Async version of run_targeted_prompt.
+    The description is preprocessed first, then the rule-based fast path resolves what it
+    can; only the attributes it could not resolve confidently are sent to the LLM (and the
+    LLM is skipped entirely when none are left). Attributes carry their `source`.
+    Returns a Pydantic model ExtractResponse
+    """
+    with stage("targeted"):
+        with stage("preprocess"):
+            prepared = preprocess_description(description)
+        return await _run_targeted_rules_async(title, prepared, schema_attributes, use_cache)
+
+async def _run_targeted_rules_async(title: str, prepared: PreprocessResult, schema_attributes: list,
+                                    use_cache: bool = True) -> ExtractResponse:
+    """
+    Body of run_targeted_prompt_async for an already preprocessed description.
+    """
+    with stage("rules"):
+        resolved = (
+            extract_with_rules(title, prepared.text, schema_attributes, RULES_MIN_CONFIDENCE) if RULES_ENABLED else {}
+        )
+    unresolved = [name for name in schema_attributes if name not in resolved]
+
+    llm_output = await run_targeted_llm_async(title, prepared, unresolved, use_cache) if unresolved else None
+    if llm_output is not None and not resolved:
+        return llm_output
+    return combine_rule_results(schema_attributes, resolved, llm_output, prepared.tokens_saved)
+
+def combine_rule_results(schema_attributes: list, resolved: dict, llm_output: ExtractResponse = None,
+                         tokens_saved: int = None) -> ExtractResponse:
+    """
+    Combine fast-path matches with the LLM output for the remaining attributes, in schema
+    order, followed by anything extra the LLM returned.
+    """
+    llm_attributes = {attribute.name: attribute for attribute in (llm_output.attributes if llm_output else [])}
+    attributes = []
+    for name in schema_attributes:
+        if name in resolved:
+            attributes.append(Attribute(name=name, value=resolved[name].values, source="rules"))
+        elif name in llm_attributes:
+            attributes.append(llm_attributes.pop(name))
+    attributes.extend(llm_attributes.values())
+    return ExtractResponse(attributes=attributes, tokens_saved=tokens_saved)
+
+def shard_attributes(schema_attributes: list, shard_size: int) -> list:
+    """
+    Split a schema into the fewest shards of at most `shard_size` attributes, balanced so
+    the largest shard (which bounds latency) is as small as possible.
+    """
+    if shard_size <= 0 or len(schema_attributes) <= shard_size:
+        return [list(schema_attributes)]
+    count = -(-len(schema_attributes) // shard_size)
+    base, extra = divmod(len(schema_attributes), count)
+    shards, start = [], 0
+    for index in range(count):
+        end = start + base + (1 if index < extra else 0)
+        shards.append(list(schema_attributes[start:end]))
+        start = end
+    return shards
+
+def merge_shard_outputs(schema_attributes: list, outputs: list, tokens_saved: int = None) -> ExtractResponse:
+    """
+    Merge per-shard outputs into one ExtractResponse in the original attribute order.
+    Names are matched exactly, then after normalisation (the LLM may change casing);
+    anything the shards returned beyond the schema is appended at the end.
+    """
+    remaining = [attribute for output in outputs for attribute in output.attributes]
+    attributes = []
+    for name in schema_attributes:
+        match = next((a for a in remaining if a.name == name), None)
+        if match is None:
+            match = next((a for a in remaining if normalize_name(a.name) == normalize_name(name)), None)
+        if match is not None:
+            remaining.remove(match)
+            attributes.append(match)
+    return ExtractResponse(attributes=attributes + remaining, tokens_saved=tokens_saved)
+
+async def run_targeted_llm_async(title: str, prepared: PreprocessResult, schema_attributes: list,
+                                 use_cache: bool = True) -> ExtractResponse:
+    """
+    Targeted LLM extraction of an already preprocessed description, served from the
+    result cache when possible. Schemas longer than TARGETED_SHARD_SIZE are split into
+    shards that run as parallel calls and are merged back in the original order.
+    """
+    shards = shard_attributes(schema_attributes, TARGETED_SHARD_SIZE)
+    if len(shards) > 1:
+        outputs = await asyncio.gather(
+            *(run_targeted_llm_async(title, prepared, shard, use_cache) for shard in shards)
+        )
+        return merge_shard_outputs(schema_attributes, outputs, prepared.tokens_saved)
+
+    key = fingerprint("targeted", EXTRACTION_MODEL, prompt_version("targeted"), title, prepared.text, schema_attributes)
+    return await cached_call(
+        key, ExtractResponse, lambda: _run_targeted_prompt_async(title, prepared, schema_attributes), use_cache
+    )
+
+async def _run_targeted_prompt_async(title: str, prepared: PreprocessResult, schema_attributes: list) -> ExtractResponse:
+    """
+    Uncached body of run_targeted_llm_async.
+    """
+    result = await run_cascade(
+        "targeted",
+        build_targeted_request(title, prepared.text, schema_attributes),
+        ExtractResponse.model_validate_json,
+        create_completion_async,
+        requested=schema_attributes,
     )
+    result.tokens_saved = prepared.tokens_saved
+    for attribute in result.attributes:
+        attribute.source = "llm"
+    return result
+
+async def run_hybrid_prompt_async(title: str, description: str, non_targeted_output: dict, targeted_output: dict) -> CleanedExtractResponse:
+    """
+    Async version of run_hybrid_prompt.
+    With a merge cascade, every targeted attribute that has a value must survive the merge.
+    Returns a Pydantic model CleanedExtractResponse
+    """
+    targeted_names = [
+        attribute["name"] for attribute in to_plain_dict(targeted_output).get("attributes", [])
+        if any(not is_na(value) for value in attribute.get("value") or [])
+    ]
+    return await run_cascade(
+        "merge",
+        build_hybrid_request(title, description, non_targeted_output, targeted_output),
+        CleanedExtractResponse.model_validate_json,
+        create_completion_async,
+        requested=targeted_names,
+    )
+
+async def merge_hybrid_outputs_async(title: str, description: str, non_targeted_output, targeted_output,
+                                     merge_mode: str = None) -> CleanedExtractResponse:
+    """
+    Merge the two first-stage outputs. The deterministic local merge is used unless
+    `merge_mode` is "llm", or it is "auto" and the ambiguity check finds something
+    the local merge cannot settle; in those cases the LLM merge prompt is called.
+    """
+    merge_mode = merge_mode or HYBRID_MERGE_MODE
+    if merge_mode == "llm":
+        return await run_hybrid_prompt_async(title, description, non_targeted_output, targeted_output)
+    if merge_mode == "auto":
+        reasons = find_ambiguities(non_targeted_output, targeted_output)
+        if reasons:
+            logger.info("Hybrid merge escalated to LLM: %s", "; ".join(reasons))
+            return await run_hybrid_prompt_async(title, description, non_targeted_output, targeted_output)
+    return merge_outputs(non_targeted_output, targeted_output)
+
+# Full hybrid pipeline: both first-stage extractions run concurrently, then merge
+async def run_hybrid_pipeline_async(title: str, description: str, schema_attributes: list,
+                                    use_cache: bool = True) -> CleanedExtractResponse:
+    """
+    Run the exploratory and targeted extractions concurrently and merge them.
+    If one stage fails the other is still merged and the failed stage is listed in
+    `failed_stages`; only when both fail is the error raised. Complete results are cached.
+    The description is preprocessed once for all stages; the result reports the tokens saved.
+    """
+    with stage("preprocess"):
+        prepared = preprocess_description(description)
+    key = fingerprint(
+        "hybrid", EXTRACTION_MODEL, prompt_version("hybrid"), title, prepared.text, schema_attributes
+    )
+    return await cached_call(
+        key,
+        CleanedExtractResponse,
+        lambda: _run_hybrid_pipeline_async(title, prepared, schema_attributes, use_cache),
+        use_cache,
+        store=lambda result: not result.failed_stages,
+    )
+
+async def _run_hybrid_pipeline_async(title: str, prepared: PreprocessResult, schema_attributes: list,
+                                     use_cache: bool = True) -> CleanedExtractResponse:
+    """
+    Uncached body of run_hybrid_pipeline_async.
+    """
+    # Both stages work on the already preprocessed description, as /extract and
+    # /extract-targeted do, so they share those endpoints' cached results
+    async def basic():
+        with stage("basic"):
+            return await run_basic_llm_async(title, prepared, use_cache)
+
+    async def targeted():
+        with stage("targeted"):
+            return await _run_targeted_rules_async(title, prepared, schema_attributes, use_cache)
+
+    description = prepared.text
+    non_targeted_output, targeted_output = await asyncio.gather(basic(), targeted(), return_exceptions=True)
+
+    failed_stages = []
+    if isinstance(non_targeted_output, BaseException):
+        logger.warning("Hybrid stage 'non targeted' failed: %r", non_targeted_output)
+        failed_stages.append("non targeted")
+    if isinstance(targeted_output, BaseException):
+        logger.warning("Hybrid stage 'targeted' failed: %r", targeted_output)
+        failed_stages.append("targeted")
+
+    if len(failed_stages) == 2:
+        raise non_targeted_output
+    if isinstance(non_targeted_output, BaseException):
+        non_targeted_output = ExtractResponse(attributes=[])
+    if isinstance(targeted_output, BaseException):
+        targeted_output = ExtractResponse(attributes=[])
 
-    message_content = response.choices[0].message.content
-    data = json.loads(message_content)
-    return CleanedExtractResponse(**data)
+    with stage("merge"):
+        merged = await merge_hybrid_outputs_async(title, description, non_targeted_output, targeted_output)
+    merged.failed_stages = failed_stages
+    merged.tokens_saved = prepared.tokens_saved
+    return merged
@@ -0,0 +1,236 @@
+"""
+Packing module for the backend.
+
+This module packs several short products into one structured-output call so the
+system prompt is sent once per pack instead of once per product. The response
+schema has one required property per product ID; each property is validated back
+into its own ExtractResponse, and products whose part is missing or invalid fall
+back to a normal single-item call.
+"""
+
+import asyncio
+import json
+import logging
+from functools import lru_cache
+from typing import List, Optional, Union
+
+from pydantic import ValidationError
+
+from backend.cache import fingerprint, get_result_cache
+from backend.config import (
+    CACHE_ENABLED,
+    RULES_ENABLED,
+    RULES_MIN_CONFIDENCE,
+    PACK_MAX_ITEMS,
+    PACK_MAX_ITEM_TOKENS,
+    PACK_MAX_INPUT_TOKENS,
+    PACK_OUTPUT_TOKENS_PER_ITEM,
+)
+from backend.preprocess import preprocess_description, PreprocessResult
+from backend.registry import normalize_attributes, render_schema_fragment
+from backend.rules import extract_with_rules
+from backend.models import (
+    EXTRACTION_MODEL,
+    BASIC_SYSTEM_PROMPT,
+    TARGETED_SYSTEM_PROMPT,
+    ATTRIBUTES_JSON_SCHEMA,
+    SAMPLING_PARAMS,
+    system_message,
+    user_message,
+    json_schema_format,
+    prompt_version,
+    combine_rule_results,
+    create_completion_async,
+    run_basic_llm_async,
+    run_targeted_llm_async,
+)
+from backend.schemas import BatchItem, ExtractResponse
+from backend.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+PACK_INSTRUCTIONS = (
+    "\n\n# Multiple Products\n"
+    "The input contains several products, each introduced by a '### <product id>' heading. "
+    "Extract each product independently, as if it were the only input, and never mix values between products. "
+    "Return one entry per product id, keyed by that id."
+)
+
+def item_tokens(mode: str, item: BatchItem, schema_attributes: Optional[List[str]]) -> int:
+    """
+    Estimated prompt tokens contributed by one product.
+    """
+    text = f"{item.title}\n{item.description}"
+    if mode == "targeted":
+        text += str(schema_attributes)
+    return estimate_tokens(text)
+
+def plan_packs(mode: str, items: List[BatchItem], schemas: List[Optional[List[str]]],
+               max_items: int = PACK_MAX_ITEMS, max_item_tokens: int = PACK_MAX_ITEM_TOKENS,
+               max_input_tokens: int = PACK_MAX_INPUT_TOKENS) -> List[List[int]]:
+    """
+    Group item indexes into packs, adapting the pack size to token length.
+    Long products get a pack of their own; short ones are packed greedily, in input
+    order, until either the item count or the token budget is reached.
+    """
+    packs: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    for index, item in enumerate(items):
+        tokens = item_tokens(mode, item, schemas[index])
+        if tokens > max_item_tokens:
+            packs.append([index])
+            continue
+        if current and (len(current) >= max_items or current_tokens + tokens > max_input_tokens):
+            packs.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += tokens
+    if current:
+        packs.append(current)
+    return packs
+
+# Packed system messages, built once and shared (never mutated)
+PACKED_SYSTEM_MESSAGES = {
+    "basic": system_message(BASIC_SYSTEM_PROMPT + PACK_INSTRUCTIONS),
+    "targeted": system_message(TARGETED_SYSTEM_PROMPT + PACK_INSTRUCTIONS),
+}
+
+def _pack_id(position: int) -> str:
+    return f"product_{position + 1}"
+
+@lru_cache(maxsize=None)
+def packed_response_format(count: int) -> dict:
+    """
+    Structured-output format for a pack of `count` products (built once per pack size).
+    """
+    ids = [_pack_id(position) for position in range(count)]
+    return json_schema_format(
+        "packed_attributes",
+        {
+            "type": "object",
+            "properties": {product_id: ATTRIBUTES_JSON_SCHEMA for product_id in ids},
+            "required": ids,
+            "additionalProperties": False,
+        },
+    )
+
+def build_packed_request(mode: str, items: List[BatchItem], schemas: List[Optional[List[str]]]) -> dict:
+    """
+    Build one chat completion request covering several products.
+    """
+    sections = []
+    for position, item in enumerate(items):
+        if mode == "basic":
+            body = f"{item.title}\n\n{item.description}"
+        else:
+            # Same fragment-first layout as the single-item targeted prompt
+            fragment = render_schema_fragment(normalize_attributes(schemas[position]))
+            body = f"{fragment}\nTitle: {item.title}\nDescription: {item.description}"
+        sections.append(f"### {_pack_id(position)}\n{body}")
+
+    return dict(
+        model=EXTRACTION_MODEL,
+        messages=[PACKED_SYSTEM_MESSAGES[mode], user_message("\n\n".join(sections))],
+        response_format=packed_response_format(len(items)),
+        **{**SAMPLING_PARAMS, "max_tokens": PACK_OUTPUT_TOKENS_PER_ITEM * len(items)},
+    )
+
+def _cache_key(mode: str, item: BatchItem, schema_attributes: Optional[List[str]]) -> str:
+    """
+    Same fingerprint as the single-item functions, so packed and single results share the
+    cache. Packed calls skip the model cascade, so with one configured they are kept apart.
+    """
+    version = prompt_version(mode, cascade=False)
+    if mode == "basic":
+        return fingerprint("basic", EXTRACTION_MODEL, version, item.title, item.description)
+    return fingerprint("targeted", EXTRACTION_MODEL, version, item.title, item.description, schema_attributes)
+
+async def _run_single(mode: str, item: BatchItem, prepared: PreprocessResult,
+                      schema_attributes: Optional[List[str]], use_cache: bool) -> ExtractResponse:
+    """
+    Single-item LLM call for a product whose packed result was unusable.
+    """
+    if mode == "basic":
+        return await run_basic_llm_async(item.title, prepared, use_cache)
+    return await run_targeted_llm_async(item.title, prepared, schema_attributes, use_cache)
+
+async def run_pack_async(mode: str, items: List[BatchItem], schemas: List[Optional[List[str]]],
+                         use_cache: bool = True) -> List[Union[ExtractResponse, Exception]]:
+    """
+    Extract a pack of products ("basic" or "targeted" mode) with one LLM call.
+    Returns one ExtractResponse or exception per item, in order. Descriptions are
+    preprocessed, targeted attributes resolved by the rule-based fast path are not sent,
+    cached items are skipped, and items missing or invalid in the packed output are
+    retried one at a time.
+    """
+    prepared = [preprocess_description(item.description) for item in items]
+    items = [item.model_copy(update={"description": p.text}) for item, p in zip(items, prepared)]
+    results: List[Union[ExtractResponse, Exception, None]] = [None] * len(items)
+    llm_outputs: List[Optional[ExtractResponse]] = [None] * len(items)
+    resolved = [{} for _ in items]
+    llm_schemas = list(schemas)
+    cache = get_result_cache() if CACHE_ENABLED else None
+
+    pending = []
+    for position, item in enumerate(items):
+        if mode == "targeted":
+            if not schemas[position]:
+                results[position] = ValueError("schema_attributes is required for targeted and hybrid extraction")
+                continue
+            if RULES_ENABLED:
+                resolved[position] = extract_with_rules(item.title, item.description, schemas[position], RULES_MIN_CONFIDENCE)
+            llm_schemas[position] = [name for name in schemas[position] if name not in resolved[position]]
+            if not llm_schemas[position]:
+                continue
+        cached = cache.get(_cache_key(mode, item, llm_schemas[position])) if cache is not None and use_cache else None
+        if cached is not None:
+            llm_outputs[position] = ExtractResponse.model_validate(cached)
+        else:
+            pending.append(position)
+
+    if len(pending) > 1:
+        packed = {}
+        try:
+            content = await create_completion_async(
+                build_packed_request(mode, [items[p] for p in pending], [llm_schemas[p] for p in pending])
+            )
+            packed = json.loads(content)
+        except Exception as exc:
+            logger.warning("Packed call for %d products failed, falling back to single calls: %r", len(pending), exc)
+
+        for pack_position, position in enumerate(list(pending)):
+            part = packed.get(_pack_id(pack_position)) if isinstance(packed, dict) else None
+            try:
+                output = ExtractResponse(**part, tokens_saved=prepared[position].tokens_saved)
+            except (TypeError, ValidationError):
+                continue
+            if mode == "targeted":
+                for attribute in output.attributes:
+                    attribute.source = "llm"
+            llm_outputs[position] = output
+            pending.remove(position)
+            if cache is not None:
+                cache.set(_cache_key(mode, items[position], llm_schemas[position]), output.model_dump())
+
+    # Single-item fallback (also the path for a pack of one)
+    fallback = await asyncio.gather(
+        *(_run_single(mode, items[p], prepared[p], llm_schemas[p], use_cache) for p in pending),
+        return_exceptions=True,
+    )
+    for position, outcome in zip(pending, fallback):
+        if isinstance(outcome, BaseException):
+            results[position] = outcome
+        else:
+            llm_outputs[position] = outcome
+
+    for position in range(len(items)):
+        if results[position] is not None:
+            continue
+        tokens_saved = prepared[position].tokens_saved
+        if mode == "targeted":
+            results[position] = combine_rule_results(schemas[position], resolved[position], llm_outputs[position], tokens_saved)
+        else:
+            # A cached output may be another product's whose description cleaned to the same text
+            results[position] = llm_outputs[position].model_copy(update={"tokens_saved": tokens_saved})
+    return results
@@ -0,0 +1,185 @@
+"""
+Preprocess module for the backend.
+
+This module cleans product descriptions before they are put into a prompt: it strips
+markup, collapses whitespace, drops known boilerplate (shipping, returns, calls to
+action), removes repeated sentences, and trims to a token budget while keeping the
+spec-dense parts such as tables and "Specifications" blocks.
+"""
+
+import html
+import re
+from dataclasses import dataclass
+from typing import List
+
+from backend.config import PREPROCESS_ENABLED, PREPROCESS_MAX_TOKENS, PREPROCESS_EXTRA_BOILERPLATE
+from backend.tokens import estimate_tokens
+
+_DROP_ELEMENTS = re.compile(r"<(script|style|noscript|iframe)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_COMMENTS = re.compile(r"<!--.*?-->", re.DOTALL)
+_CELL_BREAK = re.compile(r"</t[dh]\s*>", re.IGNORECASE)
+_LINE_BREAK = re.compile(r"<br\s*/?>|</(p|div|li|tr|h[1-6]|ul|ol|table|section|dd|dt)\s*>", re.IGNORECASE)
+_TAGS = re.compile(r"<[A-Za-z/!][^<>\n]*>")
+_SPACES = re.compile(r"[ \t ]+")
+_SENTENCES = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9])")
+
+BOILERPLATE_PATTERNS = [
+    r"\b(free|fast|next[- ]day|standard|express)\s+(delivery|shipping)\b",
+    r"\b(delivery|shipping)\s+(times?|information|info|policy|charges?|costs?)\b",
+    r"\bdispatch(ed)?\s+(within|in|the same day)\b",
+    r"\b(returns?|refunds?)\s+(policy|within|accepted)\b",
+    r"\b\d+[- ]day\s+(returns?|money[- ]back)\b",
+    r"\bmoney[- ]back\s+guarantee\b",
+    r"\b(satisfaction|price match)\s+guarantee\b",
+    r"\b(add to (basket|cart)|buy now|order (now|today)|click here|shop now)\b",
+    r"\b(customer (service|support)|contact us|get in touch)\b",
+    r"\bterms\s+(and|&)\s+conditions\b",
+    r"\bimages? (are )?for illustration purposes only\b",
+    r"\bsubscribe to our newsletter\b",
+]
+_BOILERPLATE = re.compile("|".join(BOILERPLATE_PATTERNS + PREPROCESS_EXTRA_BOILERPLATE), re.IGNORECASE)
+
+_SPEC_HEADING = re.compile(
+    r"^\s*(technical\s+)?(specifications?|specs|technical (data|details)|dimensions|product details|key features)\s*:?\s*$",
+    re.IGNORECASE,
+)
+_KEY_VALUE = re.compile(r"^[^:|]{1,40}[:|]\s*\S")
+_MEASUREMENT = re.compile(
+    r"\d\s*(mm|cm|m|in|inch|ft|kg|g|lbs?|oz|v|w|kw|a|mah|ah|l|ml|hz|°c|%|ip\d{2})\b", re.IGNORECASE
+)
+
+@dataclass
+class PreprocessResult:
+    """
+    A cleaned description and the token counts before and after cleaning.
+    """
+    text: str
+    original_tokens: int
+    tokens: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.original_tokens - self.tokens)
+
+def strip_markup(text: str) -> str:
+    """
+    Convert HTML to plain text, keeping line structure and table cells ("a | b").
+    Entities are decoded first and only tag-shaped text is removed, so bare "<" and ">"
+    in specs (and "&lt;"/"&gt;") survive, and cleaning the output again changes nothing.
+    """
+    text = html.unescape(text)
+    if "<" in text:
+        text = _COMMENTS.sub(" ", text)
+        text = _DROP_ELEMENTS.sub(" ", text)
+        text = _CELL_BREAK.sub(" | ", text)
+        text = _LINE_BREAK.sub("\n", text)
+        text = _TAGS.sub(" ", text)
+    return text
+
+def collapse_whitespace(lines: List[str]) -> List[str]:
+    """
+    Collapse runs of spaces and drop empty lines and dangling table separators.
+    """
+    cleaned = []
+    for line in lines:
+        line = _SPACES.sub(" ", line).strip(" |")
+        line = re.sub(r"(\s*\|\s*)+", " | ", line)
+        if line:
+            cleaned.append(line)
+    return cleaned
+
+def drop_boilerplate(lines: List[str]) -> List[str]:
+    """
+    Remove sentences matching a known boilerplate pattern, keeping the rest of their line.
+    """
+    kept = []
+    for line in lines:
+        if not _BOILERPLATE.search(line):
+            kept.append(line)
+            continue
+        sentences = [sentence for sentence in _SENTENCES.split(line) if not _BOILERPLATE.search(sentence)]
+        if sentences:
+            kept.append(" ".join(sentences))
+    return kept
+
+def dedupe_sentences(lines: List[str]) -> List[str]:
+    """
+    Remove sentences (and whole lines) already seen earlier in the text.
+    """
+    seen = set()
+    kept = []
+    for line in lines:
+        sentences = []
+        for sentence in _SENTENCES.split(line):
+            key = " ".join(sentence.casefold().split()).rstrip(".!")
+            if key and key in seen:
+                continue
+            seen.add(key)
+            sentences.append(sentence)
+        if sentences:
+            kept.append(" ".join(sentences))
+    return kept
+
+def spec_scores(lines: List[str]) -> List[int]:
+    """
+    Spec density of each line: lines under a specifications heading, key/value and table
+    rows, and lines containing measurements score higher than prose.
+    """
+    scores = []
+    in_spec_block = False
+    for line in lines:
+        if _SPEC_HEADING.match(line):
+            in_spec_block = True
+            scores.append(3)
+            continue
+        score = 0
+        if in_spec_block:
+            score += 2
+        if _KEY_VALUE.match(line) or " | " in line:
+            score += 2
+        if _MEASUREMENT.search(line):
+            score += 1
+        if len(line) > 300 and score < 2:
+            # A long prose paragraph ends a spec block
+            in_spec_block = False
+        scores.append(score)
+    return scores
+
+def trim_to_budget(lines: List[str], max_tokens: int) -> List[str]:
+    """
+    Keep the most spec-dense lines (ties broken by position) until the budget is used,
+    then emit them in their original order. A single over-long line is cut at the budget.
+    """
+    if estimate_tokens("\n".join(lines)) <= max_tokens:
+        return lines
+    scores = spec_scores(lines)
+    order = sorted(range(len(lines)), key=lambda i: (-scores[i], i))
+    selected = set()
+    used = 0
+    for index in order:
+        cost = estimate_tokens(lines[index]) + 1
+        if used + cost > max_tokens:
+            continue
+        selected.add(index)
+        used += cost
+    if not selected and lines:
+        return [lines[0][: max_tokens * 4]]
+    return [line for i, line in enumerate(lines) if i in selected]
+
+def preprocess_description(description: str, max_tokens: int = PREPROCESS_MAX_TOKENS,
+                           enabled: bool = PREPROCESS_ENABLED) -> PreprocessResult:
+    """
+    Clean a product description for prompting and report the token savings.
+    Running it on already-cleaned text returns the text unchanged.
+    """
+    original_tokens = estimate_tokens(description)
+    if not enabled or not description:
+        return PreprocessResult(description, original_tokens, original_tokens)
+
+    lines = strip_markup(description).splitlines()
+    lines = collapse_whitespace(lines)
+    lines = drop_boilerplate(lines)
+    lines = dedupe_sentences(lines)
+    lines = trim_to_budget(lines, max_tokens)
+    text = "\n".join(lines)
+    return PreprocessResult(text, original_tokens, estimate_tokens(text))
@@ -0,0 +1,258 @@
+"""
+Rate limit module for the backend.
+
+This module schedules outbound OpenAI calls: token buckets for requests and estimated
+tokens per minute (kept in sync with the x-ratelimit-* response headers), a priority
+queue so interactive requests go ahead of batch traffic, and retries with jittered
+exponential backoff for 429s, 5xx responses and connection errors.
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import random
+import re
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Mapping, Optional, TypeVar
+
+import openai
+
+from backend.config import (
+    OPENAI_RPM_LIMIT,
+    OPENAI_TPM_LIMIT,
+    RATE_LIMIT_MAX_RETRIES,
+    RATE_LIMIT_BACKOFF_BASE,
+    RATE_LIMIT_BACKOFF_MAX,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Lower value = served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+request_priority: contextvars.ContextVar[int] = contextvars.ContextVar("request_priority", default=PRIORITY_INTERACTIVE)
+
+@contextmanager
+def priority(level: int):
+    """
+    Run the enclosed calls (and tasks created inside it) at the given scheduling priority.
+    """
+    token = request_priority.set(level)
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+class TokenBucket:
+    """
+    Bucket holding up to `capacity` units, refilled continuously over one minute.
+    """
+    def __init__(self, capacity: float):
+        self.capacity = float(capacity)
+        self.level = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60.0)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """
+        Seconds until `amount` units are available (0 if available now).
+        Requests larger than the bucket only wait for a full bucket.
+        """
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60.0 / self.capacity
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def sync(self, limit: Optional[float], remaining: Optional[float]) -> None:
+        """
+        Align the bucket with the provider's view of the limit and what is left of it.
+        """
+        self._refill()
+        if limit:
+            self.capacity = float(limit)
+        if remaining is not None:
+            self.level = min(self.level, float(remaining))
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """
+    Parse OpenAI reset durations such as '20ms', '1s' or '6m0s' into seconds.
+    """
+    if not value:
+        return None
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+def _header_number(headers: Mapping[str, str], name: str) -> Optional[float]:
+    try:
+        return float(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def is_retryable(exc: BaseException) -> bool:
+    """
+    True for rate limits, server errors and connection problems.
+    """
+    if isinstance(exc, openai.RateLimitError):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code >= 500
+    return isinstance(exc, openai.APIConnectionError)
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """
+    Server-suggested delay from the retry-after(-ms) headers of a failed response.
+    """
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    if headers.get("retry-after-ms"):
+        return _header_number(headers, "retry-after-ms") / 1000.0
+    return _header_number(headers, "retry-after")
+
+class OutboundScheduler:
+    """
+    Admission control for calls to one model. Waiters are served strictly by priority,
+    then arrival order, whenever both buckets can cover their estimated cost.
+    """
+    def __init__(self, rpm: int = OPENAI_RPM_LIMIT, tpm: int = OPENAI_TPM_LIMIT):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._waiters: list = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.granted = 0
+        self.retries = 0
+        self.throttled = 0
+
+    async def acquire(self, estimated_tokens: int, level: Optional[int] = None) -> None:
+        """
+        Wait until the call may be sent.
+        """
+        level = request_priority.get() if level is None else level
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (level, next(self._sequence), estimated_tokens, future))
+        self._pump()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Drop the waiter so it no longer holds up the queue
+            self._waiters = [w for w in self._waiters if w[3] is not future]
+            heapq.heapify(self._waiters)
+            self._pump()
+            raise
+
+    def _pump(self) -> None:
+        while self._waiters:
+            _, _, estimated_tokens, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(estimated_tokens))
+            if wait > 0:
+                self._schedule(wait)
+                return
+            heapq.heappop(self._waiters)
+            self.requests.take(1)
+            self.tokens.take(estimated_tokens)
+            self.granted += 1
+            future.set_result(None)
+
+    def _schedule(self, delay: float) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(delay, self._wake)
+
+    def _wake(self) -> None:
+        self._timer = None
+        self._pump()
+
+    def observe_headers(self, headers: Mapping[str, str]) -> None:
+        """
+        Refine the buckets from x-ratelimit-* response headers.
+        """
+        self.requests.sync(
+            _header_number(headers, "x-ratelimit-limit-requests"),
+            _header_number(headers, "x-ratelimit-remaining-requests"),
+        )
+        self.tokens.sync(
+            _header_number(headers, "x-ratelimit-limit-tokens"),
+            _header_number(headers, "x-ratelimit-remaining-tokens"),
+        )
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hold every waiter for `seconds` after a 429 by draining the request bucket.
+        """
+        self.requests._refill()
+        self.requests.level = -seconds * self.requests.capacity / 60.0
+        self.throttled += 1
+
+    async def run(self, call: Callable[[], Awaitable[T]], estimated_tokens: int,
+                  max_retries: int = RATE_LIMIT_MAX_RETRIES) -> T:
+        """
+        Send `call()` once admitted, retrying retryable failures with full-jitter backoff.
+        """
+        attempt = 0
+        while True:
+            await self.acquire(estimated_tokens)
+            try:
+                return await call()
+            except Exception as exc:
+                if not is_retryable(exc) or attempt >= max_retries:
+                    raise
+                delay = random.uniform(0, min(RATE_LIMIT_BACKOFF_MAX, RATE_LIMIT_BACKOFF_BASE * 2 ** attempt))
+                suggested = retry_after(exc)
+                if suggested is not None:
+                    delay = max(delay, suggested)
+                if isinstance(exc, openai.RateLimitError):
+                    self.pause(delay)
+                attempt += 1
+                self.retries += 1
+                logger.warning("OpenAI call failed (%r); retry %d/%d in %.2fs", exc, attempt, max_retries, delay)
+                await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._waiters),
+            "granted": self.granted,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "rpm_limit": self.requests.capacity,
+            "tpm_limit": self.tokens.capacity,
+        }
+
+_schedulers: Dict[str, OutboundScheduler] = {}
+
+def get_scheduler(model: str) -> OutboundScheduler:
+    """
+    Return the scheduler for `model` (OpenAI rate limits are per model).
+    """
+    scheduler = _schedulers.get(model)
+    if scheduler is None:
+        scheduler = _schedulers[model] = OutboundScheduler()
+    return scheduler
+
+def scheduler_stats() -> dict:
+    return {model: scheduler.stats() for model, scheduler in _schedulers.items()}
@@ -0,0 +1,177 @@
+"""
+Registry module for the backend.
+
+This module stores versioned category schemas so requests can reference them by
+`schema_id` instead of resending attribute lists, and renders schema prompt fragments
+once so identical schemas always produce byte-identical prompt prefixes.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from backend.config import SCHEMA_REGISTRY_PATH
+from backend.schemas import RegisteredSchema
+
+def normalize_attributes(schema_attributes: List[str]) -> Tuple[str, ...]:
+    """
+    Attribute names with whitespace collapsed and empties and duplicates dropped,
+    in their original order (the order the results come back in).
+    """
+    seen = {}
+    for name in schema_attributes:
+        name = " ".join(name.split())
+        if name and name.casefold() not in seen:
+            seen[name.casefold()] = name
+    return tuple(seen.values())
+
+@lru_cache(maxsize=4096)
+def render_schema_fragment(schema_attributes: Tuple[str, ...]) -> str:
+    """
+    Prompt fragment listing the requested attributes (rendered once per distinct schema).
+    """
+    return "Attributes: " + json.dumps(list(schema_attributes), ensure_ascii=False)
+
+def parse_schema_id(schema_id: str) -> Tuple[str, Optional[int]]:
+    """
+    Split 'name@vN' into (name, N); a bare 'name' means the latest version.
+    """
+    name, _, version = schema_id.partition("@v")
+    if version:
+        if not version.isdigit():
+            raise KeyError(schema_id)
+        return name, int(version)
+    return name, None
+
+class SchemaRegistry:
+    """
+    Versioned category schemas in a SQLite file shared by every worker. Versions are
+    immutable, so each one is cached in memory once read; the latest version of a name
+    is always read from the file, so registrations made elsewhere are seen at once.
+    Registering the same attributes again under a name returns the existing version.
+    """
+    def __init__(self, path: str = SCHEMA_REGISTRY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS schemas ("
+            " name TEXT NOT NULL, version INTEGER NOT NULL, attributes TEXT NOT NULL, created_at REAL NOT NULL,"
+            " PRIMARY KEY (name, version))"
+        )
+        self._schemas: Dict[Tuple[str, int], RegisteredSchema] = {}
+
+    def _remember(self, name: str, version: int, attributes: Tuple[str, ...], created_at: float) -> RegisteredSchema:
+        schema = RegisteredSchema(
+            id=f"{name}@v{version}",
+            name=name,
+            version=version,
+            attributes=list(attributes),
+            fragment=render_schema_fragment(attributes),
+            created_at=created_at,
+        )
+        self._schemas[(name, version)] = schema
+        return schema
+
+    def _read(self, name: str, version: Optional[int] = None) -> Optional[RegisteredSchema]:
+        """
+        Read one version (the latest if None) from the file. Call with the lock held.
+        """
+        if version is not None and (name, version) in self._schemas:
+            return self._schemas[(name, version)]
+        if version is None:
+            row = self._conn.execute(
+                "SELECT version, attributes, created_at FROM schemas WHERE name = ? ORDER BY version DESC LIMIT 1",
+                (name,),
+            ).fetchone()
+        else:
+            row = self._conn.execute(
+                "SELECT version, attributes, created_at FROM schemas WHERE name = ? AND version = ?", (name, version)
+            ).fetchone()
+        if row is None:
+            return None
+        version, attributes, created_at = row
+        return self._schemas.get((name, version)) or self._remember(
+            name, version, tuple(json.loads(attributes)), created_at
+        )
+
+    def register(self, name: str, schema_attributes: List[str]) -> Tuple[RegisteredSchema, bool]:
+        """
+        Register a schema under `name`. Returns (schema, created): a new version is created
+        only when the normalized attributes differ from the latest version.
+        """
+        attributes = normalize_attributes(schema_attributes)
+        if not attributes:
+            raise ValueError("A schema needs at least one attribute")
+        with self._lock:
+            while True:
+                # The write lock is taken up front, so the version read below cannot be
+                # allocated by another worker before this insert commits
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    latest = self._read(name)
+                    if latest is not None and tuple(latest.attributes) == attributes:
+                        self._conn.execute("COMMIT")
+                        return latest, False
+                    version = (latest.version if latest is not None else 0) + 1
+                    created_at = time.time()
+                    self._conn.execute(
+                        "INSERT INTO schemas (name, version, attributes, created_at) VALUES (?, ?, ?, ?)",
+                        (name, version, json.dumps(list(attributes), ensure_ascii=False), created_at),
+                    )
+                    self._conn.execute("COMMIT")
+                except sqlite3.IntegrityError:
+                    # Another writer took the version anyway; read the new latest and try again
+                    self._conn.execute("ROLLBACK")
+                    continue
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+                return self._remember(name, version, attributes, created_at), True
+
+    def get(self, schema_id: str) -> RegisteredSchema:
+        """
+        Look up 'name@vN' or 'name' (latest version). Raises KeyError if unknown.
+        """
+        name, version = parse_schema_id(schema_id)
+        with self._lock:
+            schema = self._read(name, version)
+        if schema is None:
+            raise KeyError(schema_id)
+        return schema
+
+    def list(self) -> List[RegisteredSchema]:
+        """
+        Latest version of every registered schema.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT name, MAX(version) FROM schemas GROUP BY name ORDER BY name").fetchall()
+            return [self._read(name, version) for name, version in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+_registry: Optional[SchemaRegistry] = None
+
+def get_schema_registry() -> SchemaRegistry:
+    """
+    Return the process-wide schema registry, opening it on first use.
+    """
+    global _registry
+    if _registry is None:
+        _registry = SchemaRegistry()
+    return _registry
+
+def resolve_schema(schema_attributes: Optional[List[str]], schema_id: Optional[str]) -> Optional[List[str]]:
+    """
+    Attribute list for a request: the registered schema when `schema_id` is given
+    (KeyError if unknown), otherwise `schema_attributes` as sent.
+    """
+    if schema_id:
+        return get_schema_registry().get(schema_id).attributes
+    return schema_attributes
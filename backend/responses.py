@@ -0,0 +1,43 @@
+"""
+Responses module for the backend.
+
+This module provides the JSON response class used by the API: orjson when it is
+installed (an optional dependency), otherwise compact standard-library JSON.
+"""
+
+import inspect
+import json
+from typing import Any
+
+from fastapi import routing
+from fastapi.datastructures import Default
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson when available (several times faster than json.dumps
+    and allocation-light), falling back to compact json.dumps output.
+    """
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def native_json_fast_path() -> bool:
+    """
+    True when FastAPI serializes response models straight to JSON bytes with Pydantic.
+    That path is only taken with the default response class, and beats any custom class.
+    """
+    return "dump_json" in inspect.signature(routing.serialize_response).parameters
+
+def default_response_class():
+    """
+    Response class for the app: FastAPI's default (left as its placeholder, which is what
+    enables the native path) when available, FastJSONResponse otherwise.
+    """
+    return Default(JSONResponse) if native_json_fast_path() else FastJSONResponse
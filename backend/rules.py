@@ -0,0 +1,260 @@
+"""
+Rules module for the backend.
+
+This module is a local, pattern-based extractor that runs before the targeted LLM
+call. It resolves attributes that follow predictable patterns (explicit "Name: value"
+spec rows, dimensions, weight, voltage, wattage, IP rating, capacity, pack quantity)
+and colour/material names from a vocabulary, each with a confidence score.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from backend.merge import normalize_name
+
+NUMBER = r"(\d+(?:[.,]\d+)?)"
+
+# A value stated in the description is trusted; one only found in the title is less
+# certain, and a bare vocabulary word there ("Black+Decker", "Gold Medal") is just a hint
+SPEC_CONFIDENCE = 0.95
+TITLE_CONFIDENCE = 0.9
+TITLE_WORD_CONFIDENCE = 0.6
+
+@dataclass
+class RuleMatch:
+    """
+    Values found for one attribute and how confident the rule is in them.
+    """
+    values: List[str]
+    confidence: float
+    rule: str
+
+@dataclass
+class RuleStats:
+    """
+    Counters showing how much targeted traffic the fast path absorbs.
+    """
+    requests: int = 0
+    short_circuited: int = 0
+    attributes_requested: int = 0
+    attributes_resolved: int = 0
+    by_rule: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, requested: int, resolved: Dict[str, RuleMatch]) -> None:
+        self.requests += 1
+        self.attributes_requested += requested
+        self.attributes_resolved += len(resolved)
+        if requested and len(resolved) == requested:
+            self.short_circuited += 1
+        for match in resolved.values():
+            self.by_rule[match.rule] = self.by_rule.get(match.rule, 0) + 1
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "short_circuited": self.short_circuited,
+            "attributes_requested": self.attributes_requested,
+            "attributes_resolved": self.attributes_resolved,
+            "attribute_resolution_ratio": (
+                round(self.attributes_resolved / self.attributes_requested, 4) if self.attributes_requested else 0.0
+            ),
+            "by_rule": dict(self.by_rule),
+        }
+
+stats = RuleStats()
+
+COLOURS = [
+    "black", "white", "grey", "gray", "silver", "gold", "red", "blue", "navy", "green", "yellow",
+    "orange", "purple", "pink", "brown", "beige", "cream", "ivory", "khaki", "olive", "teal",
+    "turquoise", "burgundy", "maroon", "charcoal", "chrome", "bronze", "copper", "clear", "transparent",
+    "multicolour", "multicolor", "anthracite",
+]
+
+MATERIALS = [
+    "stainless steel", "carbon steel", "galvanised steel", "galvanized steel", "cast iron", "solid wood",
+    "tempered glass", "faux leather", "memory foam", "steel", "aluminium", "aluminum", "iron", "brass",
+    "copper", "zinc", "titanium", "wood", "oak", "pine", "walnut", "beech", "bamboo", "mdf", "plywood",
+    "plastic", "abs", "pvc", "polypropylene", "polycarbonate", "acrylic", "nylon", "polyester", "cotton",
+    "linen", "wool", "silk", "leather", "rubber", "silicone", "glass", "ceramic", "porcelain", "marble",
+    "granite", "concrete", "stone", "paper", "cardboard",
+]
+
+UNIT_DISPLAY = {
+    "v": "V", "volt": "V", "volts": "V",
+    "w": "W", "watt": "W", "watts": "W", "kw": "kW",
+    "kg": "kg", "g": "g", "lb": "lb", "lbs": "lb", "oz": "oz",
+    "l": "L", "litre": "L", "litres": "L", "liter": "L", "liters": "L", "ml": "ml",
+    "mah": "mAh", "ah": "Ah", "gb": "GB", "tb": "TB",
+    "mm": "mm", "cm": "cm", "m": "m", "in": "in", "inch": "in", "inches": "in", '"': "in",
+}
+
+# Electrical units are written without a space ("18V"), physical ones with one ("1.2 kg")
+COMPACT_UNITS = {"V", "W", "kW", "mAh", "Ah", "GB", "TB"}
+
+def _quantity(number: str, unit: str) -> str:
+    display = UNIT_DISPLAY.get(unit.lower(), unit)
+    number = number.replace(",", ".")
+    return f"{number}{display}" if display in COMPACT_UNITS else f"{number} {display}"
+
+def _unique(values: List[str]) -> List[str]:
+    seen = {}
+    for value in values:
+        seen.setdefault(value.casefold(), value)
+    return list(seen.values())
+
+def _single_value_match(values: List[str], rule: str, confidence: float = SPEC_CONFIDENCE) -> Optional[RuleMatch]:
+    """
+    One distinct value is a confident match; several distinct values are ambiguous.
+    """
+    values = _unique(values)
+    if not values:
+        return None
+    return RuleMatch(values, confidence if len(values) == 1 else 0.6, rule)
+
+def _scan(find: Callable[[str], List[str]], rule: str, title: str, text: str) -> Optional[RuleMatch]:
+    """
+    Match an unlabelled pattern in the title and description; values found only in the
+    title get TITLE_CONFIDENCE rather than the confidence of a stated spec.
+    """
+    in_text = find(text)
+    return _single_value_match(find(title) + in_text, rule, SPEC_CONFIDENCE if in_text else TITLE_CONFIDENCE)
+
+def _unit_rule(pattern: str, rule: str) -> Callable[[str, str], Optional[RuleMatch]]:
+    compiled = re.compile(pattern, re.IGNORECASE)
+
+    def find(text: str) -> List[str]:
+        return [_quantity(n, u) for n, u in compiled.findall(text)]
+
+    def extract(title: str, text: str) -> Optional[RuleMatch]:
+        return _scan(find, rule, title, text)
+
+    return extract
+
+_DIMENSIONS = re.compile(
+    NUMBER + r"\s*(?:x|×|\*)\s*" + NUMBER + r"(?:\s*(?:x|×|\*)\s*" + NUMBER + r")?\s*(mm|cm|m|inches|inch|in|\")(?![a-z])",
+    re.IGNORECASE,
+)
+
+def _dimension_values(text: str) -> List[str]:
+    values = []
+    for a, b, c, unit in _DIMENSIONS.findall(text):
+        parts = [p.replace(",", ".") for p in (a, b, c) if p]
+        values.append(" x ".join(parts) + " " + UNIT_DISPLAY.get(unit.lower(), unit))
+    return values
+
+def extract_dimensions(title: str, text: str) -> Optional[RuleMatch]:
+    return _scan(_dimension_values, "dimensions", title, text)
+
+def _labelled_dimension(label: str) -> Callable[[str, str], Optional[RuleMatch]]:
+    compiled = re.compile(
+        rf"\b{label}\s*[:=|]?\s*" + NUMBER + r"\s*(mm|cm|m|inches|inch|in)\b", re.IGNORECASE
+    )
+
+    def extract(title: str, text: str) -> Optional[RuleMatch]:
+        return _single_value_match([_quantity(n, u) for n, u in compiled.findall(f"{title}\n{text}")], label)
+
+    return extract
+
+_IP_RATING = re.compile(r"\bIP\s?([0-6X][0-9X])\b", re.IGNORECASE)
+
+def extract_ip_rating(title: str, text: str) -> Optional[RuleMatch]:
+    return _scan(lambda s: [f"IP{code.upper()}" for code in _IP_RATING.findall(s)], "ip_rating", title, text)
+
+_PACK_QUANTITY = re.compile(
+    r"\b(?:pack|box|set|bag|case) of\s*(\d+)\b|\b(\d+)\s*(?:-\s*)?(?:pack|pk|pcs|pieces|piece|count)\b",
+    re.IGNORECASE,
+)
+
+def extract_pack_quantity(title: str, text: str) -> Optional[RuleMatch]:
+    return _scan(lambda s: [a or b for a, b in _PACK_QUANTITY.findall(s)], "pack_quantity", title, text)
+
+def _vocabulary_rule(vocabulary: List[str], rule: str) -> Callable[[str, str], Optional[RuleMatch]]:
+    # Longest terms first so "stainless steel" wins over "steel"
+    terms = sorted(vocabulary, key=len, reverse=True)
+    compiled = re.compile(r"\b(" + "|".join(re.escape(t) for t in terms) + r")\b", re.IGNORECASE)
+
+    def extract(title: str, text: str) -> Optional[RuleMatch]:
+        # Descriptions mention other variants and accessories, so only the title is
+        # searched; a bare word there may be part of a name, so it needs the LLM to confirm
+        # (an explicit "Colour: ..." row is answered by the spec rows instead)
+        found = _unique([m.title() for m in compiled.findall(title)])
+        if not found:
+            return None
+        return RuleMatch(found, TITLE_WORD_CONFIDENCE if len(found) <= 2 else 0.5, rule)
+
+    return extract
+
+RULES: Dict[str, Callable[[str, str], Optional[RuleMatch]]] = {
+    "voltage": _unit_rule(NUMBER + r"\s*(v|volts?)\b", "voltage"),
+    "wattage": _unit_rule(NUMBER + r"\s*(kw|w|watts?)\b", "wattage"),
+    # A capital "G" is not grams: "5G", "4G LTE"
+    "weight": _unit_rule(NUMBER + r"\s*(kg|lbs?|oz|(?-i:g))\b", "weight"),
+    "capacity": _unit_rule(NUMBER + r"\s*(litres?|liters?|ml|l|mah|ah|gb|tb)\b", "capacity"),
+    "dimensions": extract_dimensions,
+    "width": _labelled_dimension("width"),
+    "height": _labelled_dimension("height"),
+    "depth": _labelled_dimension("depth"),
+    "length": _labelled_dimension("length"),
+    "ip_rating": extract_ip_rating,
+    "pack_quantity": extract_pack_quantity,
+    "colour": _vocabulary_rule(COLOURS, "colour"),
+    "material": _vocabulary_rule(MATERIALS, "material"),
+}
+
+# Requested attribute names (normalised) that each rule answers
+ATTRIBUTE_RULES = {
+    "voltage": ["voltage", "volts", "input voltage", "rated voltage", "battery voltage"],
+    "wattage": ["wattage", "power", "watts", "power output", "rated power", "power rating"],
+    "weight": ["weight", "net weight", "product weight", "item weight"],
+    "capacity": ["capacity", "volume", "battery capacity", "storage capacity"],
+    "dimensions": ["dimensions", "product dimensions", "overall dimensions", "size (wxhxd)"],
+    "width": ["width"],
+    "height": ["height"],
+    "depth": ["depth"],
+    "length": ["length"],
+    "ip_rating": ["ip rating", "ip", "ingress protection", "ip code"],
+    "pack_quantity": ["pack quantity", "pack size", "quantity", "pack qty", "pieces", "number of pieces", "units per pack"],
+    "colour": ["colour", "main colour", "primary colour"],
+    "material": ["material", "materials", "main material", "fabric", "frame material"],
+}
+_RULE_BY_NAME = {name: rule for rule, names in ATTRIBUTE_RULES.items() for name in names}
+
+_LABEL_ROW = re.compile(r"^\s*([^:|\n]{1,40}?)\s*[:|]\s*(.+?)\s*$", re.MULTILINE)
+# ";", ", " and "/" separate values ("S, M, L", "Black/White"), but not "1,5 kg" or "220/240V"
+_VALUE_SEPARATOR = re.compile(r"\s*(?:;|,\s|(?<!\d)/|/(?!\d))\s*")
+
+def labelled_values(text: str) -> Dict[str, str]:
+    """
+    Explicit "Name: value" / "Name | value" spec rows, keyed by normalised name.
+    """
+    rows = {}
+    for label, value in _LABEL_ROW.findall(text):
+        rows.setdefault(normalize_name(label), value.strip(" |"))
+    return rows
+
+def split_values(value: str) -> List[str]:
+    """
+    The separate values of a multi-valued spec row, as the LLM would list them.
+    """
+    return _unique([part for part in _VALUE_SEPARATOR.split(value) if part.strip(" ,")])
+
+def extract_with_rules(title: str, description: str, schema_attributes: List[str],
+                       min_confidence: float) -> Dict[str, RuleMatch]:
+    """
+    Resolve whichever requested attributes the rules can answer with at least
+    `min_confidence`. Returns {requested name: RuleMatch}; unresolved names are absent.
+    """
+    rows = labelled_values(description)
+    resolved: Dict[str, RuleMatch] = {}
+    for name in schema_attributes:
+        norm = normalize_name(name)
+        match = None
+        if rows.get(norm):
+            match = RuleMatch(split_values(rows[norm]), SPEC_CONFIDENCE, "spec_row")
+        elif norm in _RULE_BY_NAME:
+            match = RULES[_RULE_BY_NAME[norm]](title, description)
+        if match is not None and match.confidence >= min_confidence:
+            resolved[name] = match
+    stats.record(len(schema_attributes), resolved)
+    return resolved
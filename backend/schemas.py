@@ -1,11 +1,13 @@
 """
 Schemas module for the backend.
 
-This module defines the schemas for the backend.
+This module defines the schemas for the backend. It depends on nothing but Pydantic, so the
+Python client can use it without the server's configuration; configured limits (such as the
+maximum number of batch items) are enforced by the endpoints.
 """
 
-from typing import List
-from pydantic import BaseModel
+from typing import List, Literal, Optional, Union
+from pydantic import BaseModel, Field, model_validator
 
 class ExtractRequest(BaseModel):
     """
@@ -14,13 +16,36 @@ class ExtractRequest(BaseModel):
     title: str
     description: str
 
-class ExtractRequestTargeted(BaseModel):
+class SchemaReference(BaseModel):
+    """
+    Attribute schema sent inline (`schema_attributes`) or by registered `schema_id`
+    ('name' for the latest version, 'name@vN' for a specific one).
+    """
+    schema_attributes: Optional[List[str]] = None
+    schema_id: Optional[str] = None
+
+    @model_validator(mode="after")
+    def check_one_schema(self):
+        if self.schema_attributes is not None and self.schema_id is not None:
+            raise ValueError("Send either schema_attributes or schema_id, not both")
+        return self
+
+class RequiredSchemaReference(SchemaReference):
+    """
+    SchemaReference where one of `schema_attributes` / `schema_id` is required.
+    """
+    @model_validator(mode="after")
+    def check_schema_given(self):
+        if self.schema_attributes is None and self.schema_id is None:
+            raise ValueError("schema_attributes or schema_id is required")
+        return self
+
+class ExtractRequestTargeted(RequiredSchemaReference):
     """
     Request schema for the targeted extraction endpoint.
     """
     title: str
     description: str
-    schema_attributes: List[str]
 
 # Pydantic model for a single attribute
 class Attribute(BaseModel):
@@ -29,6 +54,8 @@ class Attribute(BaseModel):
     """
     name: str
     value: List[str]
+    # Provenance: 'rules' (local fast path), 'llm', or 'variant' (reused from a near-duplicate product)
+    source: Optional[str] = None
 
 # Pydantic model for extraction response
 class ExtractResponse(BaseModel):
@@ -36,6 +63,8 @@ class ExtractResponse(BaseModel):
     Response schema for the extraction endpoint.
     """
     attributes: List[Attribute]
+    # Estimated input tokens removed by description preprocessing
+    tokens_saved: Optional[int] = None
 
 # Cleaned models including method attribution
 class CleanedAttribute(BaseModel):
@@ -51,11 +80,159 @@ class CleanedExtractResponse(BaseModel):
     Response schema for the cleaned extraction endpoint.
     """
     attributes: List[CleanedAttribute]
+    # Extraction stages that failed; non-empty means the result is partial
+    failed_stages: List[str] = Field(default_factory=list)
+    # Estimated input tokens removed by description preprocessing
+    tokens_saved: Optional[int] = None
 
-class ExtractRequestHybrid(BaseModel):
+class ExtractRequestHybrid(RequiredSchemaReference):
     """
     Request schema for the hybrid extraction endpoint.
     """
     title: str
     description: str
-    schema_attributes: List[str]
+
+class BatchItem(BaseModel):
+    """
+    A single product in a batch request.
+    """
+    id: Optional[str] = None
+    title: str
+    description: str
+    # Overrides the batch-level schema_attributes for this item (targeted/hybrid only)
+    schema_attributes: Optional[List[str]] = None
+
+class ExtractBatchRequest(SchemaReference):
+    """
+    Request schema for the batch extraction endpoints.
+    The schema (inline or by id) is the default for items that do not carry their own
+    (targeted/hybrid only).
+    """
+    items: List[BatchItem] = Field(min_length=1)
+    # Maximum number of items extracted at once; capped server-side
+    concurrency: Optional[int] = Field(default=None, ge=1)
+    # Pack several short products into each LLM call (basic and targeted only)
+    pack: bool = False
+
+class BatchItemResult(BaseModel):
+    """
+    Result for one item of a basic or targeted batch; exactly one of result/error is set.
+    """
+    index: int
+    id: Optional[str] = None
+    result: Optional[ExtractResponse] = None
+    error: Optional[str] = None
+
+class ExtractBatchResponse(BaseModel):
+    """
+    Response schema for the basic and targeted batch endpoints, in input order.
+    """
+    results: List[BatchItemResult]
+    succeeded: int
+    failed: int
+
+class CleanedBatchItemResult(BaseModel):
+    """
+    Result for one item of a hybrid batch; exactly one of result/error is set.
+    """
+    index: int
+    id: Optional[str] = None
+    result: Optional[CleanedExtractResponse] = None
+    error: Optional[str] = None
+
+class CleanedExtractBatchResponse(BaseModel):
+    """
+    Response schema for the hybrid batch endpoint, in input order.
+    """
+    results: List[CleanedBatchItemResult]
+    succeeded: int
+    failed: int
+
+class JobRequest(SchemaReference):
+    """
+    Request schema for creating an asynchronous extraction job.
+    The schema (inline or by id) is the default for items that do not carry their own.
+    """
+    mode: Literal["basic", "targeted", "hybrid"]
+    items: List[BatchItem] = Field(min_length=1)
+
+class JobStatus(BaseModel):
+    """
+    Progress of an asynchronous extraction job.
+    """
+    id: str
+    mode: str
+    # 'queued', 'running' or 'completed'
+    status: str
+    total: int
+    completed: int
+    succeeded: int
+    failed: int
+    created_at: float
+    updated_at: float
+
+class SyncItem(BatchItem):
+    """
+    A product in a sync feed; `id` is its SKU and is required.
+    """
+    id: str
+
+class SyncRequest(SchemaReference):
+    """
+    Request schema for the sync endpoint: the full product feed.
+    The schema (inline or by id) is the default for items that do not carry their own.
+    """
+    mode: Literal["basic", "targeted", "hybrid"] = "hybrid"
+    items: List[SyncItem] = Field(min_length=1)
+    # Maximum number of items extracted at once; capped server-side
+    concurrency: Optional[int] = Field(default=None, ge=1)
+    # Re-extract every item, even unchanged ones
+    force: bool = False
+    # Delete stored SKUs that are not in the feed
+    prune: bool = False
+
+class SyncItemResult(BaseModel):
+    """
+    Outcome for one re-extracted (or failed) item of a sync; unchanged items are only counted.
+    """
+    index: int
+    id: str
+    # 'new', 'changed' or 'failed'
+    status: str
+    result: Optional[Union[CleanedExtractResponse, ExtractResponse]] = None
+    error: Optional[str] = None
+
+class SyncResponse(BaseModel):
+    """
+    Response schema for the sync endpoint.
+    """
+    total: int
+    unchanged: int
+    new: int
+    changed: int
+    failed: int
+    removed: int
+    results: List[SyncItemResult]
+    # Set when the new and changed items were queued as a job instead of extracted inline;
+    # `new` and `changed` then count queued items and `results` holds only feed errors
+    job: Optional[JobStatus] = None
+
+class SchemaRegisterRequest(BaseModel):
+    """
+    Request schema for registering a category schema.
+    """
+    name: str = Field(min_length=1, max_length=200, pattern=r"^[^@/]+$")
+    attributes: List[str] = Field(min_length=1)
+
+class RegisteredSchema(BaseModel):
+    """
+    A registered category schema version.
+    """
+    # 'name@vN'
+    id: str
+    name: str
+    version: int
+    attributes: List[str]
+    # Pre-rendered prompt fragment placed at the start of the targeted user message
+    fragment: str
+    created_at: float
@@ -0,0 +1,80 @@
+"""
+Single-flight module for the backend.
+
+This module coalesces identical concurrent calls: the first caller for a key (the
+leader) starts the work, later callers for the same key (followers) await the
+leader's result instead of repeating it.
+"""
+
+import asyncio
+import contextvars
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from backend.admission import within_deadline
+
+T = TypeVar("T")
+
+class _Call:
+    """
+    One in-flight call and the number of callers waiting on it.
+    """
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls sharing a key into one execution.
+
+    The work runs in its own task, so a follower is unaffected if the leader's
+    request is cancelled. The task is only cancelled once every caller waiting on
+    it has gone away. Exceptions raised by the work propagate to every caller.
+
+    The task runs in a fresh context (or `context`), not the leader's, so request-scoped
+    state such as the deadline never applies to other callers; each caller's own
+    deadline bounds only its wait for the result.
+    """
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]],
+                 context: Optional[contextvars.Context] = None) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            context = contextvars.Context() if context is None else context
+            call = _Call(context.run(asyncio.ensure_future, fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _task: self._forget(key, call))
+            self.leaders += 1
+        else:
+            self.followers += 1
+
+        call.waiters += 1
+        try:
+            return await within_deadline(asyncio.shield(call.task))
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Nobody is left to read the result; stop the work and let new callers start afresh
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        return {"leaders": self.leaders, "followers": self.followers, "in_flight": self.in_flight()}
+
+_single_flight = SingleFlight()
+
+def get_single_flight() -> SingleFlight:
+    """
+    Return the process-wide single-flight group used for extraction calls.
+    """
+    return _single_flight
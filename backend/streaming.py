@@ -0,0 +1,293 @@
+"""
+Streaming module for the backend.
+
+This module serves single-product extractions as server-sent events: the completion is
+streamed from the provider, the `attributes` array is parsed incrementally, and each
+attribute is emitted as soon as its object is complete, followed by the validated
+response. Cached results and rule-resolved attributes are emitted straight away.
+Streamed calls go to EXTRACTION_MODEL without the model cascade, so their results are
+cached apart from the cascaded ones.
+"""
+
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from backend.cache import cache_lookup, cache_store, fingerprint
+from backend.config import RULES_ENABLED, RULES_MIN_CONFIDENCE, TARGETED_SHARD_SIZE, VARIANT_REUSE_ENABLED
+from backend.models import (
+    EXTRACTION_MODEL,
+    build_basic_request,
+    build_targeted_request,
+    combine_rule_results,
+    extract_variant_async,
+    find_variant,
+    merge_hybrid_outputs_async,
+    merge_shard_outputs,
+    prompt_version,
+    shard_attributes,
+    stream_completion_async,
+)
+from backend.preprocess import preprocess_description, PreprocessResult
+from backend.rules import extract_with_rules
+from backend.schemas import Attribute, ExtractResponse, CleanedExtractResponse
+from backend.variants import get_variant_index
+
+logger = logging.getLogger(__name__)
+
+# A stream of (event name, payload) pairs; the payload is a Pydantic model or a plain dict
+Event = Tuple[str, object]
+
+class AttributeStreamParser:
+    """
+    Incremental parser for a streamed `{"attributes": [...]}` completion.
+    `feed()` returns the attribute objects completed by each chunk; `text` holds
+    everything received so far for the final validation.
+    """
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._key = None
+        self._in_attributes = False
+        self._item_start = None
+
+    def feed(self, chunk: str) -> List[dict]:
+        self.text += chunk
+        text = self.text
+        items = []
+        for i in range(self._pos, len(text)):
+            char = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        # Last string at the top level: the key of the next value
+                        self._key = text[self._string_start + 1:i]
+            elif char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char in "{[":
+                self._depth += 1
+                if char == "[" and self._depth == 2 and self._key == "attributes":
+                    self._in_attributes = True
+                elif char == "{" and self._depth == 3 and self._in_attributes:
+                    self._item_start = i
+            elif char in "}]":
+                if char == "}" and self._depth == 3 and self._item_start is not None:
+                    items.append(json.loads(text[self._item_start:i + 1]))
+                    self._item_start = None
+                elif char == "]" and self._depth == 2:
+                    self._in_attributes = False
+                self._depth -= 1
+        self._pos = len(text)
+        return items
+
+def sse_event(event: str, payload) -> str:
+    """
+    Format one server-sent event with a JSON payload.
+    """
+    data = payload.model_dump_json() if isinstance(payload, BaseModel) else json.dumps(payload, ensure_ascii=False)
+    return f"event: {event}\ndata: {data}\n\n"
+
+async def sse_stream(events: AsyncIterator[Event]) -> AsyncIterator[str]:
+    """
+    Render extraction events as SSE text; a failure ends the stream with an `error` event.
+    """
+    try:
+        async for event, payload in events:
+            yield sse_event(event, payload)
+    except Exception as exc:
+        logger.warning("Streaming extraction failed: %r", exc)
+        yield sse_event("error", {"detail": f"{type(exc).__name__}: {exc}"})
+
+async def _completed_attributes(result) -> AsyncIterator[Event]:
+    """
+    Replay an already complete result as attribute events followed by the result.
+    """
+    for attribute in result.attributes:
+        yield "attribute", attribute
+    yield "result", result
+
+async def stream_llm_attributes(request: dict, source: Optional[str] = None) -> AsyncIterator[Event]:
+    """
+    Stream one extraction completion: an `attribute` event per completed object, then a
+    `result` event with the whole output validated as an ExtractResponse.
+    """
+    parser = AttributeStreamParser()
+    async for delta in stream_completion_async(request):
+        for item in parser.feed(delta):
+            yield "attribute", Attribute(**item, source=source)
+    result = ExtractResponse.model_validate_json(parser.text)
+    for attribute in result.attributes:
+        attribute.source = source
+    yield "result", result
+
+async def merge_streams(*streams: AsyncIterator[Event]) -> AsyncIterator[Tuple[int, Event]]:
+    """
+    Interleave several event streams as their events arrive, tagged with the stream's position.
+    An exception raised by a stream is yielded in its place (and ends that stream).
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    async def pump(position: int, stream: AsyncIterator[Event]) -> None:
+        try:
+            async for event in stream:
+                await queue.put((position, event))
+        except Exception as exc:
+            await queue.put((position, exc))
+        finally:
+            await queue.put((position, done))
+
+    tasks = [asyncio.create_task(pump(position, stream)) for position, stream in enumerate(streams)]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            position, event = await queue.get()
+            if event is done:
+                remaining -= 1
+            else:
+                yield position, event
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def stream_basic(title: str, description: str, use_cache: bool = True) -> AsyncIterator[Event]:
+    """
+    Streaming version of run_extraction_basic_async.
+    """
+    prepared = preprocess_description(description)
+    async for event in _stream_basic(title, prepared, use_cache):
+        yield event
+
+async def _stream_basic(title: str, prepared: PreprocessResult, use_cache: bool = True) -> AsyncIterator[Event]:
+    key = fingerprint("basic", EXTRACTION_MODEL, prompt_version("basic", cascade=False), title, prepared.text)
+    result = cache_lookup(key, ExtractResponse) if use_cache else None
+    if result is None:
+        match = find_variant(title, prepared, use_cache)
+        if match is not None:
+            result = await extract_variant_async(title, prepared, match, use_cache)
+            if result is not None:
+                cache_store(key, result)
+    if result is not None:
+        async for event in _completed_attributes(result):
+            yield event
+        return
+
+    async for event, payload in stream_llm_attributes(build_basic_request(title, prepared.text)):
+        if event == "result":
+            payload.tokens_saved = prepared.tokens_saved
+            cache_store(key, payload)
+            if VARIANT_REUSE_ENABLED:
+                get_variant_index().add(title, prepared.text, payload.model_dump())
+        yield event, payload
+
+async def stream_targeted(title: str, description: str, schema_attributes: list,
+                          use_cache: bool = True) -> AsyncIterator[Event]:
+    """
+    Streaming version of run_targeted_prompt_async: attributes resolved by the rules are
+    emitted first, then the LLM's attributes as they are generated (one stream per shard).
+    """
+    prepared = preprocess_description(description)
+    async for event in _stream_targeted(title, prepared, schema_attributes, use_cache):
+        yield event
+
+async def _stream_targeted(title: str, prepared: PreprocessResult, schema_attributes: list,
+                           use_cache: bool = True) -> AsyncIterator[Event]:
+    resolved = extract_with_rules(title, prepared.text, schema_attributes, RULES_MIN_CONFIDENCE) if RULES_ENABLED else {}
+    for name, match in resolved.items():
+        yield "attribute", Attribute(name=name, value=match.values, source="rules")
+
+    unresolved = [name for name in schema_attributes if name not in resolved]
+    shards = shard_attributes(unresolved, TARGETED_SHARD_SIZE) if unresolved else []
+    outputs: List[Optional[ExtractResponse]] = [None] * len(shards)
+
+    async def shard_stream(shard: list) -> AsyncIterator[Event]:
+        key = fingerprint("targeted", EXTRACTION_MODEL, prompt_version("targeted", cascade=False), title, prepared.text, shard)
+        cached = cache_lookup(key, ExtractResponse) if use_cache else None
+        if cached is not None:
+            async for event in _completed_attributes(cached):
+                yield event
+            return
+        async for event, payload in stream_llm_attributes(build_targeted_request(title, prepared.text, shard), "llm"):
+            if event == "result":
+                payload.tokens_saved = prepared.tokens_saved
+                cache_store(key, payload)
+            yield event, payload
+
+    async for position, event in merge_streams(*(shard_stream(shard) for shard in shards)):
+        if isinstance(event, BaseException):
+            raise event
+        name, payload = event
+        if name == "result":
+            outputs[position] = payload
+        else:
+            yield name, payload
+
+    llm_output = None
+    if len(outputs) == 1:
+        llm_output = outputs[0]
+    elif outputs:
+        llm_output = merge_shard_outputs(unresolved, outputs, prepared.tokens_saved)
+    if resolved:
+        result = combine_rule_results(schema_attributes, resolved, llm_output, prepared.tokens_saved)
+    else:
+        result = llm_output or ExtractResponse(attributes=[], tokens_saved=prepared.tokens_saved)
+    yield "result", result
+
+async def stream_hybrid(title: str, description: str, schema_attributes: list,
+                        use_cache: bool = True) -> AsyncIterator[Event]:
+    """
+    Streaming version of run_hybrid_pipeline_async. The two first-stage extractions stream
+    concurrently as `partial` events (tagged with their stage); the merged attributes then
+    follow as `attribute` events and the CleanedExtractResponse as the `result`.
+    """
+    prepared = preprocess_description(description)
+    key = fingerprint("hybrid", EXTRACTION_MODEL, prompt_version("hybrid", cascade=False), title, prepared.text, schema_attributes)
+    cached = cache_lookup(key, CleanedExtractResponse) if use_cache else None
+    if cached is not None:
+        async for event in _completed_attributes(cached):
+            yield event
+        return
+
+    stages = ("non targeted", "targeted")
+    outputs: list = [None, None]
+    streams = (
+        _stream_basic(title, prepared, use_cache),
+        _stream_targeted(title, prepared, schema_attributes, use_cache),
+    )
+    async for position, event in merge_streams(*streams):
+        if isinstance(event, BaseException):
+            logger.warning("Hybrid stage '%s' failed: %r", stages[position], event)
+            outputs[position] = event
+            continue
+        name, payload = event
+        if name == "result":
+            outputs[position] = payload
+        else:
+            yield "partial", {"stage": stages[position], "attribute": payload.model_dump()}
+
+    failed_stages = [stages[i] for i, output in enumerate(outputs) if not isinstance(output, ExtractResponse)]
+    if len(failed_stages) == 2:
+        raise outputs[0] if isinstance(outputs[0], BaseException) else RuntimeError("Both stages failed")
+    non_targeted_output, targeted_output = (
+        output if isinstance(output, ExtractResponse) else ExtractResponse(attributes=[]) for output in outputs
+    )
+    merged = await merge_hybrid_outputs_async(title, prepared.text, non_targeted_output, targeted_output)
+    merged.failed_stages = failed_stages
+    merged.tokens_saved = prepared.tokens_saved
+    if not failed_stages:
+        cache_store(key, merged)
+    async for event in _completed_attributes(merged):
+        yield event
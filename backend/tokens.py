@@ -0,0 +1,30 @@
+"""
+Tokens module for the backend.
+
+This module provides a cheap token-count estimate for prompt budgeting. It avoids a
+tokenizer dependency; roughly four characters per token holds for English product copy.
+"""
+
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate number of tokens in `text`.
+    """
+    if not text:
+        return 0
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def estimate_request_tokens(request: dict) -> int:
+    """
+    Approximate rate-limit cost of a chat completion request: prompt text plus the
+    `max_tokens` completion allowance (which providers count against TPM up front).
+    """
+    total = 0
+    for message in request.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            total += estimate_tokens(content)
+        else:
+            total += sum(estimate_tokens(part.get("text", "")) for part in content or [])
+    return total + int(request.get("max_tokens") or 0)
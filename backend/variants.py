@@ -0,0 +1,217 @@
+"""
+Variants module for the backend.
+
+This module keeps a MinHash/LSH index of products already extracted by the basic
+(exploratory) call, so that near-duplicates such as the colour and size variants of one
+product, or the same listing posted twice, can reuse the attributes they share. Only the
+attributes whose values are tied to the text that differs are extracted again, and a
+product whose extra words are not accounted for by those is extracted in full.
+"""
+
+import hashlib
+import random
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from backend.config import VARIANT_INDEX_SIZE, VARIANT_MIN_SIMILARITY, VARIANT_MIN_TOKENS
+
+_TOKEN = re.compile(r"[^\W_]+(?:[.,]\d+)*")
+
+# 64 hash functions split into 16 bands of 4 rows: pairs with a Jaccard similarity of
+# 0.85 become candidates with probability > 0.99, unrelated products almost never do
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240611)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(MINHASH_PERMUTATIONS)]
+
+def tokenize(text: str) -> List[str]:
+    """
+    Case-folded word tokens of `text`; decimals such as "1.5" stay one token.
+    """
+    return _TOKEN.findall(text.casefold())
+
+def product_tokens(title: str, description: str) -> FrozenSet[str]:
+    """
+    The set of distinct tokens of a product's title and (preprocessed) description.
+    """
+    return frozenset(tokenize(title) + tokenize(description))
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+def minhash(tokens: FrozenSet[str]) -> Tuple[int, ...]:
+    """
+    MinHash signature of a token set (one minimum per hash function).
+    """
+    hashes = [_token_hash(token) for token in tokens]
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+def bands(signature: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+    """
+    LSH bucket keys of a signature: (band number, rows of that band).
+    """
+    rows = MINHASH_PERMUTATIONS // MINHASH_BANDS
+    return [(band, signature[band * rows:(band + 1) * rows]) for band in range(MINHASH_BANDS)]
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """
+    Exact Jaccard similarity of two token sets.
+    """
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+def explains_added_tokens(attributes: List[dict], added_tokens: FrozenSet[str]) -> bool:
+    """
+    Whether every word a variant gained appears in the values re-extracted for it; any
+    other new word may carry a value (or attribute) the reused result is missing.
+    """
+    value_tokens = set(tokenize(" ".join(value for attribute in attributes for value in attribute.get("value") or [])))
+    return added_tokens <= value_tokens
+
+def changed_attributes(result: dict, removed_tokens: FrozenSet[str]) -> List[str]:
+    """
+    Names of the attributes in an extracted `result` whose values mention a token that
+    is missing from the new product; those values cannot be carried over as they are.
+    """
+    names = []
+    for attribute in result.get("attributes", []):
+        value_tokens = set(tokenize(" ".join(attribute.get("value") or [])))
+        if value_tokens & removed_tokens:
+            names.append(attribute["name"])
+    return names
+
+@dataclass
+class VariantMatch:
+    """
+    An indexed product close enough to reuse, and how the new product differs from it:
+    the attributes tied to words it lost, and the words it gained.
+    """
+    result: dict
+    similarity: float
+    changed: List[str]
+    added: FrozenSet[str] = frozenset()
+
+@dataclass
+class VariantStats:
+    """
+    Counters showing how many basic extractions were served by variant reuse.
+    """
+    lookups: int = 0
+    matches: int = 0
+    full_reuse: int = 0
+    rules_only: int = 0
+    targeted_calls: int = 0
+    fallbacks: int = 0
+    attributes_reused: int = 0
+    attributes_reextracted: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "lookups": self.lookups,
+            "matches": self.matches,
+            "full_reuse": self.full_reuse,
+            "rules_only": self.rules_only,
+            "targeted_calls": self.targeted_calls,
+            "fallbacks": self.fallbacks,
+            "attributes_reused": self.attributes_reused,
+            "attributes_reextracted": self.attributes_reextracted,
+            "match_ratio": round(self.matches / self.lookups, 4) if self.lookups else 0.0,
+        }
+
+@dataclass
+class _Entry:
+    tokens: FrozenSet[str]
+    keys: List[Tuple[int, Tuple[int, ...]]]
+    result: dict = field(repr=False)
+
+class VariantIndex:
+    """
+    Bounded (LRU) index of extracted products, searched by MinHash LSH and confirmed
+    with the exact Jaccard similarity of the token sets.
+
+    Only results of real basic extractions are added, never reused ones, so every
+    member of a variant family is compared against the same fully extracted product.
+    """
+    def __init__(self, max_entries: int = VARIANT_INDEX_SIZE, min_similarity: float = VARIANT_MIN_SIMILARITY,
+                 min_tokens: int = VARIANT_MIN_TOKENS):
+        self.max_entries = max_entries
+        self.min_similarity = min_similarity
+        self.min_tokens = min_tokens
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], set] = {}
+        self._next_id = 0
+        self.stats = VariantStats()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, title: str, description: str, result: dict) -> None:
+        tokens = product_tokens(title, description)
+        if len(tokens) < self.min_tokens or not result.get("attributes"):
+            return
+        entry_id = self._next_id
+        self._next_id += 1
+        entry = _Entry(tokens, bands(minhash(tokens)), result)
+        self._entries[entry_id] = entry
+        for key in entry.keys:
+            self._buckets.setdefault(key, set()).add(entry_id)
+        while len(self._entries) > self.max_entries:
+            self._evict()
+
+    def find(self, title: str, description: str) -> Optional[VariantMatch]:
+        """
+        Return the most similar indexed product at or above `min_similarity`, if any.
+        """
+        tokens = product_tokens(title, description)
+        if len(tokens) < self.min_tokens or not self._entries:
+            return None
+        self.stats.lookups += 1
+        candidates = set()
+        for key in bands(minhash(tokens)):
+            candidates.update(self._buckets.get(key, ()))
+        best_id, best = None, self.min_similarity
+        for entry_id in candidates:
+            similarity = jaccard(tokens, self._entries[entry_id].tokens)
+            if similarity >= best:
+                best_id, best = entry_id, similarity
+        if best_id is None:
+            return None
+        self._entries.move_to_end(best_id)
+        entry = self._entries[best_id]
+        self.stats.matches += 1
+        return VariantMatch(
+            entry.result, round(best, 4), changed_attributes(entry.result, entry.tokens - tokens), tokens - entry.tokens
+        )
+
+    def _evict(self) -> None:
+        entry_id, entry = self._entries.popitem(last=False)
+        for key in entry.keys:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._buckets.clear()
+
+_index: Optional[VariantIndex] = None
+
+def get_variant_index() -> VariantIndex:
+    """
+    Return the process-wide variant index, creating it on first use.
+    """
+    global _index
+    if _index is None:
+        _index = VariantIndex()
+    return _index
+
+def variant_stats() -> dict:
+    """
+    Reuse counters and index size for /stats and /metrics.
+    """
+    index = get_variant_index()
+    return {"entries": len(index), **index.stats.as_dict()}
@@ -0,0 +1,3 @@
+"""
+Load-test benchmarks for the extraction API, run against a local fake OpenAI server.
+"""
@@ -0,0 +1,50 @@
+"""
+Compare two benchmark result files.
+
+Prints RPS and latency changes per endpoint and concurrency level, and exits non-zero
+when a level regressed by more than the threshold, so it can gate CI:
+    python -m benchmarks.compare baseline.json benchmarks/results/latest.json --threshold 10
+"""
+
+import argparse
+import json
+import sys
+
+def load(path: str) -> dict:
+    with open(path) as handle:
+        report = json.load(handle)
+    return {(result["endpoint"], result["concurrency"]): result for result in report["results"]}
+
+def change(before: float, after: float) -> float:
+    return (after - before) / before * 100 if before else 0.0
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """
+    Return (key, rps change %, p95 change %, p99 change %, regressed) for levels in both files.
+    """
+    rows = []
+    for key in sorted(set(baseline) & set(current)):
+        before, after = baseline[key], current[key]
+        rps = change(before["rps"], after["rps"])
+        p95 = change(before["latency_ms"]["p95"], after["latency_ms"]["p95"])
+        p99 = change(before["latency_ms"]["p99"], after["latency_ms"]["p99"])
+        regressed = rps < -threshold or p95 > threshold or p99 > threshold
+        rows.append((key, rps, p95, p99, regressed))
+    return rows
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed regression in percent")
+    args = parser.parse_args(argv)
+
+    rows = compare(load(args.baseline), load(args.current), args.threshold)
+    print(f"{'endpoint':<18} {'conc':>5} {'rps':>9} {'p95':>9} {'p99':>9}")
+    for (endpoint, concurrency), rps, p95, p99, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{endpoint:<18} {concurrency:>5} {rps:>+8.1f}% {p95:>+8.1f}% {p99:>+8.1f}%{flag}")
+    sys.exit(1 if any(row[4] for row in rows) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Fake OpenAI server for the benchmarks.
+
+This module serves a stand-in for the chat completions API with configurable latency
+distributions, error rates and canned structured outputs that satisfy the request's
+JSON schema, so the extraction API can be load-tested without the live service.
+
+Run it on its own with:
+    python -m benchmarks.fake_openai --port 8090 --latency lognormal:0.6:0.5 --error-rate 0.01
+"""
+
+import argparse
+import ast
+import asyncio
+import json
+import math
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Attributes returned for exploratory requests (no attribute list in the prompt)
+CANNED_ATTRIBUTES = [
+    ("Colour", ["Black"]),
+    ("Material", ["Stainless Steel"]),
+    ("Width", ["45 cm"]),
+    ("Weight", ["2.4 kg"]),
+    ("Finish", ["Matte"]),
+]
+
+_ATTRIBUTE_LIST = re.compile(r"Attributes: (\[.*?\])\s*$", re.MULTILINE)
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Parse a latency distribution spec into a sampler returning seconds:
+    'fixed:S', 'uniform:LOW:HIGH', 'lognormal:MEDIAN:SIGMA' or 'exponential:MEAN'.
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(":") if value]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(values[0])
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    if kind == "exponential" and len(values) == 1:
+        return lambda rng: rng.expovariate(1.0 / values[0])
+    raise ValueError(f"Invalid latency spec: {spec!r}")
+
+def requested_attributes(messages: list) -> Optional[List[str]]:
+    """
+    Attribute names listed in a targeted prompt ('Attributes: [...]'), if any.
+    """
+    names: List[str] = []
+    found = False
+    for message in messages:
+        content = message.get("content")
+        parts = content if isinstance(content, list) else [{"text": content or ""}]
+        for part in parts:
+            for match in _ATTRIBUTE_LIST.finditer(part.get("text", "")):
+                try:
+                    names.extend(ast.literal_eval(match.group(1)))
+                    found = True
+                except (ValueError, SyntaxError):
+                    continue
+    return names if found else None
+
+def canned_attributes(names: Optional[List[str]]) -> list:
+    if names is None:
+        return [{"name": name, "value": list(value)} for name, value in CANNED_ATTRIBUTES]
+    canned = dict(CANNED_ATTRIBUTES)
+    return [{"name": name, "value": list(canned.get(name, ["N/A"]))} for name in names]
+
+def fill_schema(schema: dict, attributes: list):
+    """
+    Build a value satisfying `schema`, using `attributes` wherever an attribute list is expected.
+    """
+    kind = schema.get("type")
+    if kind == "object":
+        properties = schema.get("properties", {})
+        if "attributes" in properties:
+            item_schema = properties["attributes"].get("items", {})
+            extra = {
+                key: fill_schema(value, attributes)
+                for key, value in item_schema.get("properties", {}).items()
+                if key not in ("name", "value")
+            }
+            return {"attributes": [{**attribute, **extra} for attribute in attributes]}
+        return {key: fill_schema(value, attributes) for key, value in properties.items()}
+    if kind == "array":
+        return [fill_schema(schema.get("items", {}), attributes)]
+    if "enum" in schema:
+        return schema["enum"][0]
+    if kind in ("integer", "number"):
+        return 0
+    if kind == "boolean":
+        return False
+    return "non targeted"
+
+@dataclass
+class FakeSettings:
+    latency: str = "fixed:0.2"
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    seed: Optional[int] = None
+
+def create_app(settings: FakeSettings = FakeSettings()) -> FastAPI:
+    """
+    Build the fake OpenAI ASGI app.
+    """
+    app = FastAPI(title="Fake OpenAI")
+    rng = random.Random(settings.seed)
+    sample_latency = parse_latency(settings.latency)
+    limit_headers = {
+        "x-ratelimit-limit-requests": "1000000",
+        "x-ratelimit-remaining-requests": "999999",
+        "x-ratelimit-limit-tokens": "1000000000",
+        "x-ratelimit-remaining-tokens": "999999999",
+    }
+    app.state.calls = 0
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [{"id": "gpt-4.1-mini", "object": "model", "created": 0, "owned_by": "fake"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.calls += 1
+        await asyncio.sleep(max(0.0, sample_latency(rng)))
+
+        roll = rng.random()
+        if roll < settings.rate_limit_rate:
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                headers={"retry-after-ms": "200"},
+            )
+        if roll < settings.rate_limit_rate + settings.error_rate:
+            return JSONResponse(status_code=500, content={"error": {"message": "Fake server error", "type": "server_error"}})
+
+        response_format = body.get("response_format") or {}
+        schema = response_format.get("json_schema", {}).get("schema", {"type": "object", "properties": {"attributes": {}}})
+        content = json.dumps(fill_schema(schema, canned_attributes(requested_attributes(body.get("messages", [])))))
+        prompt_tokens = len(str(body.get("messages", ""))) // 4
+        return JSONResponse(
+            {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "gpt-4.1-mini"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(content) // 4,
+                    "total_tokens": prompt_tokens + len(content) // 4,
+                },
+            },
+            headers=limit_headers,
+        )
+
+    return app
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake OpenAI chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", default="fixed:0.2", help="fixed:S, uniform:LOW:HIGH, lognormal:MEDIAN:SIGMA, exponential:MEAN")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of calls answered with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of calls answered with a 429")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    import uvicorn
+    settings = FakeSettings(args.latency, args.error_rate, args.rate_limit_rate, args.seed)
+    uvicorn.run(create_app(settings), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
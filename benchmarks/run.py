@@ -0,0 +1,275 @@
+"""
+Benchmark harness for the extraction API.
+
+Starts the fake OpenAI server in a subprocess, points the app at it, drives the
+extraction endpoints at each concurrency level in-process and writes RPS, latency
+percentiles and event-loop lag to a JSON file.
+
+Example:
+    python -m benchmarks.run --concurrency 1,16,64 --requests 300 \\
+        --latency lognormal:0.6:0.5 --error-rate 0.01 --output benchmarks/results/latest.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+ENDPOINTS = {
+    "extract": "/extract",
+    "extract-targeted": "/extract-targeted",
+    "extract-hybrid": "/extract-hybrid",
+}
+SCHEMA_ATTRIBUTES = ["Material", "Width", "Weight", "Finish", "Voltage", "Capacity"]
+API_KEY = "benchmark-key"
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile (0 for an empty list).
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+def summarize(values: List[float], scale: float = 1000.0) -> Dict[str, float]:
+    """
+    Mean, percentiles and max of `values`, scaled (seconds to milliseconds by default).
+    """
+    if not values:
+        return {"mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    return {
+        "mean": round(sum(values) / len(values) * scale, 3),
+        "p50": round(percentile(values, 50) * scale, 3),
+        "p95": round(percentile(values, 95) * scale, 3),
+        "p99": round(percentile(values, 99) * scale, 3),
+        "max": round(max(values) * scale, 3),
+    }
+
+def make_payload(endpoint: str, index: int) -> dict:
+    """
+    Request body for one call. Titles are unique so results are not served from the
+    cache or coalesced unless --repeat-products is given.
+    """
+    body = {
+        "title": f"Stainless Steel Pedal Bin {index}",
+        "description": (
+            "<p>Soft-close lid and removable inner bucket.</p>"
+            "<ul><li>Material: Stainless Steel</li><li>Width: 45 cm</li><li>Weight: 2.4 kg</li></ul>"
+            "Free delivery on orders over 50."
+        ),
+    }
+    if endpoint != "extract":
+        body["schema_attributes"] = SCHEMA_ATTRIBUTES
+    return body
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag: how late a periodic sleep wakes up.
+    """
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - started - self.interval))
+
+    def start(self) -> None:
+        self.samples = []
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> List[float]:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        return self.samples
+
+async def run_level(client: httpx.AsyncClient, endpoint: str, concurrency: int, requests: int,
+                    offset: int, repeat_products: bool) -> dict:
+    """
+    Send `requests` calls to one endpoint with `concurrency` callers and summarize them.
+    """
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    counter = iter(range(requests))
+    monitor = LoopLagMonitor()
+
+    async def worker():
+        for index in counter:
+            payload = make_payload(endpoint, 0 if repeat_products else offset + index)
+            started = time.perf_counter()
+            try:
+                resp = await client.post(ENDPOINTS[endpoint], json=payload, headers={"x-api-key": API_KEY})
+                status = str(resp.status_code)
+            except Exception as exc:
+                status = type(exc).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    monitor.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    lag = await monitor.stop()
+
+    errors = sum(count for status, count in statuses.items() if status != "200")
+    return {
+        "endpoint": ENDPOINTS[endpoint],
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "statuses": statuses,
+        "duration_s": round(elapsed, 3),
+        "rps": round(requests / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": summarize(latencies),
+        "loop_lag_ms": summarize(lag),
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def start_fake_server(args, port: int) -> subprocess.Popen:
+    """
+    Launch the fake OpenAI server and wait until it accepts connections.
+    """
+    command = [
+        sys.executable, "-m", "benchmarks.fake_openai", "--port", str(port),
+        "--latency", args.latency, "--error-rate", str(args.error_rate),
+        "--rate-limit-rate", str(args.rate_limit_rate),
+    ]
+    if args.seed is not None:
+        command += ["--seed", str(args.seed)]
+    process = subprocess.Popen(command)
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline and process.poll() is None:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/v1/models", timeout=0.5)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Fake OpenAI server did not start")
+
+def configure_environment(port: int, args) -> None:
+    """
+    Point the app at the fake server. Must run before `main` is imported, since settings
+    are read at import time. Explicitly set variables are left alone.
+    """
+    os.environ["API_KEY"] = API_KEY
+    os.environ["OPENAI_API_KEY"] = "fake-key"
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{port}/v1"
+    os.environ.setdefault("CACHE_ENABLED", "true" if args.cache else "false")
+    os.environ.setdefault("JOBS_ENABLED", "false")
+    # The synthetic products differ only by their index, so variant reuse would skip the LLM calls being measured
+    os.environ.setdefault("VARIANT_REUSE_ENABLED", "true" if args.cache else "false")
+    os.environ.setdefault("OPENAI_RPM_LIMIT", "1000000")
+    os.environ.setdefault("OPENAI_TPM_LIMIT", "1000000000")
+
+async def run_benchmark(args) -> dict:
+    import main as app_module
+
+    results = []
+    transport = httpx.ASGITransport(app=app_module.app)
+    timeout = httpx.Timeout(args.timeout)
+    async with app_module.lifespan(app_module.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=timeout) as client:
+            offset = 0
+            for endpoint in args.endpoints:
+                for concurrency in args.concurrency:
+                    if args.warmup:
+                        await run_level(client, endpoint, concurrency, args.warmup, offset, args.repeat_products)
+                        offset += args.warmup
+                    result = await run_level(client, endpoint, concurrency, args.requests, offset, args.repeat_products)
+                    offset += args.requests
+                    results.append(result)
+                    print(
+                        f"{result['endpoint']:<18} c={concurrency:<4} rps={result['rps']:<8} "
+                        f"p50={result['latency_ms']['p50']}ms p99={result['latency_ms']['p99']}ms "
+                        f"lag_p99={result['loop_lag_ms']['p99']}ms errors={result['errors']}"
+                    )
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": {
+                "latency": args.latency,
+                "error_rate": args.error_rate,
+                "rate_limit_rate": args.rate_limit_rate,
+                "requests": args.requests,
+                "warmup": args.warmup,
+                "cache": args.cache,
+                "repeat_products": args.repeat_products,
+            },
+        },
+        "results": results,
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the extraction endpoints against a fake OpenAI server")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), type=lambda v: [e for e in v.split(",") if e],
+                        help=f"Comma-separated subset of {', '.join(ENDPOINTS)}")
+    parser.add_argument("--concurrency", default="1,8,32", type=lambda v: [int(c) for c in v.split(",")])
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per endpoint and concurrency level")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests before each level")
+    parser.add_argument("--latency", default="lognormal:0.4:0.5", help="Fake server latency distribution")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--cache", action="store_true", help="Keep the result cache enabled")
+    parser.add_argument("--repeat-products", action="store_true", help="Send the same product every time")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", default="benchmarks/results/latest.json")
+    args = parser.parse_args(argv)
+    unknown = set(args.endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+    return args
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    port = free_port()
+    server = start_fake_server(args, port)
+    try:
+        configure_environment(port, args)
+        report = asyncio.run(run_benchmark(args))
+    finally:
+        server.terminate()
+        server.wait()
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
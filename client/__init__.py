@@ -0,0 +1,12 @@
+"""
+Client package for the attribute extraction API.
+
+AsyncExtractionClient is the asyncio client; ExtractionClient is its blocking facade.
+Results are the API's own Pydantic models from backend.schemas.
+"""
+
+from client.async_client import AsyncExtractionClient, StreamEvent
+from client.errors import ExtractionAPIError
+from client.sync_client import ExtractionClient
+
+__all__ = ["AsyncExtractionClient", "ExtractionClient", "ExtractionAPIError", "StreamEvent"]
@@ -0,0 +1,306 @@
+"""
+Async client module for the extraction API.
+
+This module provides AsyncExtractionClient: one pooled HTTP connection set per client,
+retries with jittered exponential backoff (honouring Retry-After), request deadlines,
+concurrent fan-out, automatic use of the batch and streaming endpoints, and results
+typed with the API's own Pydantic schemas.
+"""
+
+import asyncio
+import json
+import random
+from typing import AsyncIterable, AsyncIterator, Iterable, List, Optional, Tuple, Union
+
+import httpx
+
+from backend.schemas import (
+    Attribute,
+    BatchItem,
+    BatchItemResult,
+    CleanedAttribute,
+    CleanedBatchItemResult,
+    CleanedExtractBatchResponse,
+    CleanedExtractResponse,
+    ExtractBatchResponse,
+    ExtractResponse,
+)
+from client.errors import ExtractionAPIError
+
+DEFAULT_BASE_URL = "http://localhost:8080"
+
+# Statuses worth retrying: rate limited, shed by admission control, upstream unavailable
+RETRY_STATUSES = {429, 502, 503}
+# Slack added to the request deadline for the HTTP timeout, so the server's 504 arrives first
+TIMEOUT_SLACK = 5.0
+
+MODES = ("basic", "targeted", "hybrid")
+BATCH_PATHS = {"basic": "/extract-batch", "targeted": "/extract-targeted-batch", "hybrid": "/extract-hybrid-batch"}
+SINGLE_PATHS = {"basic": "/extract", "targeted": "/extract-targeted", "hybrid": "/extract-hybrid"}
+
+ItemLike = Union[BatchItem, dict]
+
+def _check_mode(mode: str) -> None:
+    if mode not in MODES:
+        raise ValueError(f"Unknown extraction mode: {mode}")
+
+def _schema_body(schema_attributes: Optional[List[str]], schema_id: Optional[str]) -> dict:
+    body = {}
+    if schema_attributes is not None:
+        body["schema_attributes"] = list(schema_attributes)
+    if schema_id is not None:
+        body["schema_id"] = schema_id
+    return body
+
+class StreamEvent:
+    """
+    One server-sent event from a streaming endpoint, with its payload parsed:
+    `attribute` (Attribute / CleanedAttribute), `partial` (dict with `stage` and an
+    Attribute) or `result` (ExtractResponse / CleanedExtractResponse).
+    """
+    __slots__ = ("event", "data")
+
+    def __init__(self, event: str, data):
+        self.event = event
+        self.data = data
+
+    def __repr__(self) -> str:
+        return f"StreamEvent({self.event!r}, {self.data!r})"
+
+class AsyncExtractionClient:
+    """
+    Async client for the attribute extraction API.
+
+    Use it as an async context manager (or call `aclose()`) so pooled connections are
+    released. All methods raise ExtractionAPIError once retries are exhausted.
+    """
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, api_key: Optional[str] = None, timeout: float = 60.0,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 20.0,
+                 max_connections: int = 20, batch_size: int = 100, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.batch_size = batch_size
+        headers = {"x-api-key": api_key} if api_key else {}
+        self._http = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            headers=headers,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport,
+        )
+        # Fan-out never opens more requests than the pool can carry at once
+        self._fan_out = asyncio.Semaphore(max_connections)
+
+    async def __aenter__(self) -> "AsyncExtractionClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+
+    def _options(self, deadline: Optional[float], cache: bool) -> dict:
+        """
+        Per-request headers and HTTP timeout. With a `deadline` the server is asked to give
+        up after that many seconds; without one only connecting is bounded.
+        """
+        headers = {}
+        if not cache:
+            headers["x-cache-bypass"] = "true"
+        if deadline is None:
+            return {"headers": headers, "timeout": httpx.Timeout(self.timeout, read=None)}
+        headers["x-request-timeout"] = f"{deadline:g}"
+        return {"headers": headers, "timeout": deadline + TIMEOUT_SLACK}
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """
+        Seconds to wait before retry `attempt`: the server's Retry-After when it sent one,
+        otherwise jittered exponential backoff.
+        """
+        if response is not None:
+            try:
+                return min(float(response.headers["retry-after"]), self.backoff_max)
+            except (KeyError, ValueError):
+                pass
+        return min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+    async def _request(self, method: str, path: str, deadline: Optional[float] = None, cache: bool = True,
+                       **kwargs) -> httpx.Response:
+        """
+        Send a request, retrying transport errors and RETRY_STATUSES with backoff.
+        """
+        options = self._options(deadline, cache)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self._http.request(method, path, **options, **kwargs)
+            except httpx.TransportError as exc:
+                if attempt == self.max_retries:
+                    raise ExtractionAPIError(None, f"{type(exc).__name__}: {exc}") from exc
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                await asyncio.sleep(self._backoff(attempt, response))
+                continue
+            ExtractionAPIError.raise_for_response(response)
+            return response
+
+    async def extract(self, title: str, description: str, timeout: Optional[float] = None,
+                      cache: bool = True) -> ExtractResponse:
+        """
+        Exploratory extraction (/extract).
+        """
+        response = await self._request(
+            "POST", "/extract", timeout or self.timeout, cache, json={"title": title, "description": description}
+        )
+        return ExtractResponse.model_validate_json(response.content)
+
+    async def extract_targeted(self, title: str, description: str, schema_attributes: Optional[List[str]] = None,
+                               schema_id: Optional[str] = None, timeout: Optional[float] = None,
+                               cache: bool = True) -> ExtractResponse:
+        """
+        Targeted extraction (/extract-targeted) for an inline schema or a registered `schema_id`.
+        """
+        body = {"title": title, "description": description, **_schema_body(schema_attributes, schema_id)}
+        response = await self._request("POST", "/extract-targeted", timeout or self.timeout, cache, json=body)
+        return ExtractResponse.model_validate_json(response.content)
+
+    async def extract_hybrid(self, title: str, description: str, schema_attributes: Optional[List[str]] = None,
+                             schema_id: Optional[str] = None, timeout: Optional[float] = None,
+                             cache: bool = True) -> CleanedExtractResponse:
+        """
+        Hybrid extraction (/extract-hybrid): both extractions merged server-side.
+        """
+        body = {"title": title, "description": description, **_schema_body(schema_attributes, schema_id)}
+        response = await self._request("POST", "/extract-hybrid", timeout or self.timeout, cache, json=body)
+        return CleanedExtractResponse.model_validate_json(response.content)
+
+    async def extract_all(self, title: str, description: str, schema_attributes: Optional[List[str]] = None,
+                          schema_id: Optional[str] = None, timeout: Optional[float] = None,
+                          cache: bool = True) -> Tuple[ExtractResponse, ExtractResponse, CleanedExtractResponse]:
+        """
+        Exploratory, targeted and hybrid results for one product, requested concurrently.
+        The server coalesces the shared first-stage calls, so this costs no more LLM calls
+        than the hybrid extraction alone.
+        """
+        return await asyncio.gather(
+            self.extract(title, description, timeout, cache),
+            self.extract_targeted(title, description, schema_attributes, schema_id, timeout, cache),
+            self.extract_hybrid(title, description, schema_attributes, schema_id, timeout, cache),
+        )
+
+    async def extract_many(self, mode: str, items: Iterable[ItemLike], schema_attributes: Optional[List[str]] = None,
+                           schema_id: Optional[str] = None, concurrency: Optional[int] = None, pack: bool = False,
+                           timeout: Optional[float] = None,
+                           cache: bool = True) -> List[Union[BatchItemResult, CleanedBatchItemResult]]:
+        """
+        Extract many products through the batch endpoint for `mode`. Lists longer than
+        `batch_size` are split into batches sent concurrently. Results come back in input
+        order with their `index` in the full list; failed items carry an `error`.
+        Batches have no deadline unless `timeout` is given.
+        """
+        _check_mode(mode)
+        items = [BatchItem.model_validate(item) for item in items]
+        response_cls = CleanedExtractBatchResponse if mode == "hybrid" else ExtractBatchResponse
+        schema = _schema_body(schema_attributes, schema_id)
+
+        async def send(offset: int) -> list:
+            chunk = items[offset:offset + self.batch_size]
+            body = {
+                "items": [item.model_dump(exclude_none=True) for item in chunk],
+                "concurrency": concurrency,
+                "pack": pack,
+                **schema,
+            }
+            async with self._fan_out:
+                response = await self._request("POST", BATCH_PATHS[mode], timeout, cache, json=body)
+            results = response_cls.model_validate_json(response.content).results
+            for result in results:
+                result.index += offset
+            return results
+
+        batches = await asyncio.gather(*(send(offset) for offset in range(0, len(items), self.batch_size)))
+        return [result for batch in batches for result in batch]
+
+    async def stream_many(self, mode: str, items: Union[Iterable[ItemLike], AsyncIterable[ItemLike]],
+                          schema_attributes: Optional[List[str]] = None, schema_id: Optional[str] = None,
+                          concurrency: Optional[int] = None, cache: bool = True
+                          ) -> AsyncIterator[Union[BatchItemResult, CleanedBatchItemResult]]:
+        """
+        Extract an arbitrarily long (possibly lazy) sequence of products through the NDJSON
+        streaming endpoint, yielding each result as soon as it completes (completion order,
+        tagged with `index`). Items are uploaded as they are produced, so the stream cannot
+        be replayed and is not retried.
+        """
+        _check_mode(mode)
+        result_cls = CleanedBatchItemResult if mode == "hybrid" else BatchItemResult
+        params = _schema_body(schema_attributes, schema_id)
+        if concurrency is not None:
+            params["concurrency"] = concurrency
+
+        async def body() -> AsyncIterator[bytes]:
+            if hasattr(items, "__aiter__"):
+                async for item in items:
+                    yield BatchItem.model_validate(item).model_dump_json(exclude_none=True).encode() + b"\n"
+            else:
+                for item in items:
+                    yield BatchItem.model_validate(item).model_dump_json(exclude_none=True).encode() + b"\n"
+
+        options = self._options(None, cache)
+        options["headers"]["content-type"] = "application/x-ndjson"
+        async with self._fan_out:
+            async with self._http.stream("POST", f"{BATCH_PATHS[mode]}/stream", content=body(), params=params,
+                                         **options) as response:
+                if response.status_code >= 400:
+                    await response.aread()
+                    ExtractionAPIError.raise_for_response(response)
+                async for line in response.aiter_lines():
+                    if line.strip():
+                        yield result_cls.model_validate_json(line)
+
+    async def extract_stream(self, mode: str, title: str, description: str,
+                             schema_attributes: Optional[List[str]] = None, schema_id: Optional[str] = None,
+                             timeout: Optional[float] = None, cache: bool = True) -> AsyncIterator[StreamEvent]:
+        """
+        One product through the server-sent events endpoint for `mode`, yielding each
+        attribute as the model generates it and the full response as the last `result` event.
+
+        Raises:
+            ExtractionAPIError: The request was rejected, or the stream ended with an `error` event.
+        """
+        _check_mode(mode)
+        body = {"title": title, "description": description}
+        if mode != "basic":
+            body.update(_schema_body(schema_attributes, schema_id))
+        attribute_cls = CleanedAttribute if mode == "hybrid" else Attribute
+        result_cls = CleanedExtractResponse if mode == "hybrid" else ExtractResponse
+
+        def parse(event: str, data: str) -> StreamEvent:
+            payload = json.loads(data)
+            if event == "error":
+                raise ExtractionAPIError(None, payload.get("detail", data))
+            if event == "attribute":
+                return StreamEvent(event, attribute_cls.model_validate(payload))
+            if event == "result":
+                return StreamEvent(event, result_cls.model_validate(payload))
+            if event == "partial":
+                return StreamEvent(event, {**payload, "attribute": Attribute.model_validate(payload["attribute"])})
+            return StreamEvent(event, payload)
+
+        async with self._http.stream("POST", f"{SINGLE_PATHS[mode]}/stream", json=body,
+                                     **self._options(timeout or self.timeout, cache)) as response:
+            if response.status_code >= 400:
+                await response.aread()
+                ExtractionAPIError.raise_for_response(response)
+            event, data = "message", []
+            async for line in response.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    data.append(line[len("data:"):].strip())
+                elif not line and data:
+                    yield parse(event, "\n".join(data))
+                    event, data = "message", []
+            if data:
+                yield parse(event, "\n".join(data))
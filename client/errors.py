@@ -0,0 +1,32 @@
+"""
+Errors module for the extraction API client.
+
+This module defines the single exception raised by the clients for failed requests.
+"""
+
+from typing import Optional
+
+import httpx
+
+class ExtractionAPIError(Exception):
+    """
+    A request failed: an HTTP error status (`status_code`, server `detail`), a
+    transport error after all retries (`status_code` None), or an `error` stream event.
+    """
+    def __init__(self, status_code: Optional[int], detail: str):
+        super().__init__(f"{status_code}: {detail}" if status_code is not None else detail)
+        self.status_code = status_code
+        self.detail = detail
+
+    @classmethod
+    def raise_for_response(cls, response: httpx.Response) -> None:
+        """
+        Raise for a 4xx/5xx response, using the API's `detail` message when it sent one.
+        """
+        if response.status_code < 400:
+            return
+        try:
+            detail = response.json().get("detail", response.text)
+        except ValueError:
+            detail = response.text
+        raise cls(response.status_code, detail if isinstance(detail, str) else str(detail))
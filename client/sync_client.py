@@ -0,0 +1,125 @@
+"""
+Sync client module for the extraction API.
+
+This module provides ExtractionClient, a blocking facade over AsyncExtractionClient for
+scripts and thread-based callers (e.g. Gradio handlers). Calls run on one background
+event loop, so every thread shares the same connection pool, retries and fan-out.
+"""
+
+import asyncio
+import threading
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from backend.schemas import CleanedExtractResponse, ExtractResponse
+from client.async_client import AsyncExtractionClient, ItemLike, StreamEvent
+
+class ExtractionClient:
+    """
+    Blocking client for the attribute extraction API; takes the same arguments as
+    AsyncExtractionClient. Safe to share between threads. Close it (or use it as a
+    context manager) to release the connections and the background loop.
+    """
+    def __init__(self, *args, **kwargs):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="extraction-client", daemon=True)
+        self._thread.start()
+        self._client = self._run(self._create(*args, **kwargs))
+
+    @staticmethod
+    async def _create(*args, **kwargs) -> AsyncExtractionClient:
+        # Created on the background loop, which owns its semaphore and connections
+        return AsyncExtractionClient(*args, **kwargs)
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def __enter__(self) -> "ExtractionClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._loop.is_closed():
+            return
+        self._run(self._client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def extract(self, title: str, description: str, timeout: Optional[float] = None,
+                cache: bool = True) -> ExtractResponse:
+        """
+        Exploratory extraction (/extract).
+        """
+        return self._run(self._client.extract(title, description, timeout, cache))
+
+    def extract_targeted(self, title: str, description: str, schema_attributes: Optional[List[str]] = None,
+                         schema_id: Optional[str] = None, timeout: Optional[float] = None,
+                         cache: bool = True) -> ExtractResponse:
+        """
+        Targeted extraction (/extract-targeted).
+        """
+        return self._run(
+            self._client.extract_targeted(title, description, schema_attributes, schema_id, timeout, cache)
+        )
+
+    def extract_hybrid(self, title: str, description: str, schema_attributes: Optional[List[str]] = None,
+                       schema_id: Optional[str] = None, timeout: Optional[float] = None,
+                       cache: bool = True) -> CleanedExtractResponse:
+        """
+        Hybrid extraction (/extract-hybrid).
+        """
+        return self._run(
+            self._client.extract_hybrid(title, description, schema_attributes, schema_id, timeout, cache)
+        )
+
+    def extract_all(self, title: str, description: str, schema_attributes: Optional[List[str]] = None,
+                    schema_id: Optional[str] = None, timeout: Optional[float] = None,
+                    cache: bool = True) -> Tuple[ExtractResponse, ExtractResponse, CleanedExtractResponse]:
+        """
+        Exploratory, targeted and hybrid results for one product, requested concurrently.
+        """
+        return self._run(self._client.extract_all(title, description, schema_attributes, schema_id, timeout, cache))
+
+    def extract_many(self, mode: str, items: Iterable[ItemLike], schema_attributes: Optional[List[str]] = None,
+                     schema_id: Optional[str] = None, concurrency: Optional[int] = None, pack: bool = False,
+                     timeout: Optional[float] = None, cache: bool = True) -> list:
+        """
+        Many products through the batch endpoints, in input order (see AsyncExtractionClient).
+        """
+        return self._run(
+            self._client.extract_many(mode, list(items), schema_attributes, schema_id, concurrency, pack, timeout, cache)
+        )
+
+    def stream_many(self, mode: str, items: Iterable[ItemLike], schema_attributes: Optional[List[str]] = None,
+                    schema_id: Optional[str] = None, concurrency: Optional[int] = None,
+                    cache: bool = True) -> Iterator:
+        """
+        Many products through the NDJSON streaming endpoint, yielding results as they complete.
+        """
+        return self._iterate(self._client.stream_many(mode, items, schema_attributes, schema_id, concurrency, cache))
+
+    def extract_stream(self, mode: str, title: str, description: str, schema_attributes: Optional[List[str]] = None,
+                       schema_id: Optional[str] = None, timeout: Optional[float] = None,
+                       cache: bool = True) -> Iterator[StreamEvent]:
+        """
+        One product through the server-sent events endpoint, yielding events as they arrive.
+        """
+        return self._iterate(
+            self._client.extract_stream(mode, title, description, schema_attributes, schema_id, timeout, cache)
+        )
+
+    def _iterate(self, generator) -> Iterator:
+        """
+        Drive an async generator on the background loop, one item per step.
+        """
+        try:
+            while True:
+                try:
+                    yield self._run(generator.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            if not self._loop.is_closed():
+                self._run(generator.aclose())
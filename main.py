@@ -4,27 +4,140 @@ Main FastAPI application module.
 This module defines the FastAPI app and its endpoints for handling requests.
 """
 import os
-from fastapi import FastAPI, HTTPException, Header
-from backend.config import API_KEY
-from backend.models import run_targeted_prompt, run_extraction_basic, run_hybrid_prompt
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Header, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+import openai
+from starlette.requests import ClientDisconnect
+from backend.config import API_KEY, JOBS_ENABLED, BATCH_MAX_ITEMS, JOBS_MAX_ITEMS, SYNC_MAX_ITEMS
+from backend.client import startup_openai_client, shutdown_openai_client
+from backend.cache import get_result_cache
+from backend.singleflight import get_single_flight
+from backend import rules
+from backend.ratelimit import scheduler_stats, retry_after
+from backend.hedging import endpoint, hedging_stats
+from backend.metrics import MetricsMiddleware, render_metrics
+from backend.responses import default_response_class
+from backend.batch import run_batch, stream_batch, parse_ndjson_items
+from backend.jobs import get_job_runner, startup_jobs, shutdown_jobs
+from backend.catalog import get_sku_store, run_sync
+from backend.registry import get_schema_registry, resolve_schema
+from backend.variants import variant_stats
+from backend.cascade import cascade_stats
+from backend.admission import AdmissionMiddleware, DeadlineExceeded, admission_stats, get_admission_controller
+from backend.streaming import sse_stream, stream_basic, stream_targeted, stream_hybrid
+from backend.models import run_targeted_prompt_async, run_extraction_basic_async, run_hybrid_pipeline_async
 from backend.schemas import (
     ExtractResponse,
     ExtractRequestTargeted,
     ExtractRequest,
     ExtractRequestHybrid,
-    CleanedExtractResponse
+    CleanedExtractResponse,
+    ExtractBatchRequest,
+    ExtractBatchResponse,
+    CleanedExtractBatchResponse,
+    JobRequest,
+    JobStatus,
+    SyncRequest,
+    SyncResponse,
+    SchemaRegisterRequest,
+    RegisteredSchema
 )
 
-app = FastAPI(title="Attribute Extraction API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Create the shared, pre-warmed OpenAI client and start the job workers (resuming
+    unfinished jobs) at startup; stop both at shutdown.
+    """
+    await startup_openai_client()
+    if JOBS_ENABLED:
+        await startup_jobs()
+    yield
+    await shutdown_jobs()
+    await shutdown_openai_client()
+
+app = FastAPI(title="Attribute Extraction API", lifespan=lifespan, default_response_class=default_response_class())
+
+class EndpointContextMiddleware:
+    """
+    Tag each HTTP request's LLM calls with its path, so hedging budgets and latency
+    samples are kept per endpoint. Plain ASGI, so streamed request bodies are untouched.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with endpoint(scope["path"]):
+            await self.app(scope, receive, send)
+
+app.add_middleware(EndpointContextMiddleware)
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(MetricsMiddleware, routes=app.routes)
+
+@app.exception_handler(openai.RateLimitError)
+async def openai_rate_limit_handler(request: Request, exc: openai.RateLimitError):
+    """
+    OpenAI still rate limiting after the scheduler's retries: tell the caller to back off.
+    """
+    delay = retry_after(exc) or 1
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Upstream rate limit exceeded, retry later"},
+        headers={"Retry-After": str(max(1, round(delay)))},
+    )
+
+@app.exception_handler(openai.APIConnectionError)
+@app.exception_handler(openai.InternalServerError)
+async def openai_unavailable_handler(request: Request, exc: openai.OpenAIError):
+    """
+    OpenAI unreachable or failing after the scheduler's retries.
+    """
+    return JSONResponse(status_code=503, content={"detail": "Upstream LLM unavailable"}, headers={"Retry-After": "5"})
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    """
+    The request's deadline passed while LLM calls were still outstanding (they are cancelled).
+    """
+    get_admission_controller().deadline_exceeded += 1
+    return JSONResponse(status_code=504, content={"detail": "Request deadline exceeded"})
+
+def request_schema(schema_attributes: Optional[List[str]], schema_id: Optional[str]) -> Optional[List[str]]:
+    """
+    Attribute list for a request: the registered schema for `schema_id`, or the inline list.
+
+    Raises:
+        HTTPException: Returns 404 if `schema_id` is not registered.
+    """
+    try:
+        return resolve_schema(schema_attributes, schema_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown schema_id: {schema_id}")
+
+def check_item_count(items: list, limit: int) -> None:
+    """
+    Enforce the configured maximum number of items of a list request.
+
+    Raises:
+        HTTPException: Returns 422 if the request carries more than `limit` items.
+    """
+    if len(items) > limit:
+        raise HTTPException(status_code=422, detail=f"Too many items: {len(items)} (maximum {limit})")
 
 @app.post("/extract", response_model=ExtractResponse)
-async def extract_endpoint(request: ExtractRequest, x_api_key: str = Header(None)):
+async def extract_endpoint(request: ExtractRequest, x_api_key: str = Header(None), x_cache_bypass: bool = Header(False)):
     """
     Endpoint to extract attributes from a product title and description.
 
     Args:
         request (ExtractRequest): The request body containing `title` and `description`.
         x_api_key (str, optional): API key sent in the header for authentication.
+        x_cache_bypass (bool, optional): Skip the result cache lookup and re-extract.
 
     Raises:
         HTTPException: Returns 403 if the API key is invalid.
@@ -37,20 +150,22 @@ async def extract_endpoint(request: ExtractRequest, x_api_key: str = Header(None
         raise HTTPException(status_code=403, detail="Invalid API Key")
 
     # Run the extraction function (returns a Pydantic model)
-    attributes = run_extraction_basic(request.title, request.description)
+    attributes = await run_extraction_basic_async(request.title, request.description, use_cache=not x_cache_bypass)
     return attributes
 
 @app.post("/extract-targeted", response_model=ExtractResponse)
-async def extract_targeted_endpoint(request: ExtractRequestTargeted, x_api_key: str = Header(None)):
+async def extract_targeted_endpoint(request: ExtractRequestTargeted, x_api_key: str = Header(None), x_cache_bypass: bool = Header(False)):
     """
     Endpoint to extract attributes from a product title and description using a targeted approach.
 
     Args:
-        request (ExtractRequestTargeted): The request body containing `title` and `description`.
+        request (ExtractRequestTargeted): The request body containing `title`, `description` and either
+            `schema_attributes` or a registered `schema_id`.
         x_api_key (str, optional): API key sent in the header for authentication.
+        x_cache_bypass (bool, optional): Skip the result cache lookup and re-extract.
 
     Raises:
-        HTTPException: Returns 403 if the API key is invalid.
+        HTTPException: Returns 403 if the API key is invalid, 404 for an unknown `schema_id`.
 
     Returns:
         ExtractResponse: Extracted attributes as a Pydantic model.
@@ -60,25 +175,28 @@ async def extract_targeted_endpoint(request: ExtractRequestTargeted, x_api_key:
         raise HTTPException(status_code=403, detail="Invalid API Key")
 
     # Run the extraction function (returns a Pydantic model)
-    attributes = run_targeted_prompt(
+    attributes = await run_targeted_prompt_async(
         title=request.title,
         description=request.description,
-        schema_attributes=request.schema_attributes
+        schema_attributes=request_schema(request.schema_attributes, request.schema_id),
+        use_cache=not x_cache_bypass
     )
 
     return attributes
 
 @app.post("/extract-hybrid", response_model=CleanedExtractResponse)
-async def extract_hybrid_endpoint(request: ExtractRequestHybrid, x_api_key: str = Header(None)):
+async def extract_hybrid_endpoint(request: ExtractRequestHybrid, x_api_key: str = Header(None), x_cache_bypass: bool = Header(False)):
     """
     Endpoint to extract attributes from a product title and description using a hybrid approach.
 
     Args:
-        request (ExtractRequestHybrid): The request body containing `title` and `description`.
+        request (ExtractRequestHybrid): The request body containing `title`, `description` and either
+            `schema_attributes` or a registered `schema_id`.
         x_api_key (str, optional): API key sent in the header for authentication.
+        x_cache_bypass (bool, optional): Skip the result cache lookup and re-extract.
 
     Raises:
-        HTTPException: Returns 403 if the API key is invalid.
+        HTTPException: Returns 403 if the API key is invalid, 404 for an unknown `schema_id`.
 
     Returns:
         CleanedExtractResponse: Extracted attributes as a Pydantic model.
@@ -87,23 +205,479 @@ async def extract_hybrid_endpoint(request: ExtractRequestHybrid, x_api_key: str
     if x_api_key != API_KEY:
         raise HTTPException(status_code=403, detail="Invalid API Key")
 
-    # Run the extraction function (returns a Pydantic model)
-    non_targeted_output = run_extraction_basic(request.title, request.description)
-    targeted_output = run_targeted_prompt(
-        title=  request.title,
-        description=request.description,
-        schema_attributes=request.schema_attributes
-    )
-
-    attributes = run_hybrid_prompt(
+    # Run both extractions concurrently, then merge (returns a Pydantic model)
+    attributes = await run_hybrid_pipeline_async(
         title=request.title,
         description=request.description,
-        non_targeted_output=non_targeted_output,
-        targeted_output=targeted_output
+        schema_attributes=request_schema(request.schema_attributes, request.schema_id),
+        use_cache=not x_cache_bypass
     )
 
     return attributes
 
+def sse_response(events) -> StreamingResponse:
+    """
+    Server-sent events response for a stream of extraction events.
+    """
+    return StreamingResponse(
+        sse_stream(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/extract/stream")
+async def extract_stream_endpoint(request: ExtractRequest, x_api_key: str = Header(None), x_cache_bypass: bool = Header(False)):
+    """
+    Streaming variant of /extract (server-sent events).
+
+    Each `attribute` event carries one Attribute as soon as the model has finished generating it;
+    the final `result` event carries the validated ExtractResponse. A failure ends the stream
+    with an `error` event.
+
+    Raises:
+        HTTPException: Returns 403 if the API key is invalid.
+    """
+    if x_api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API Key")
+
+    return sse_response(stream_basic(request.title, request.description, use_cache=not x_cache_bypass))
+
+@app.post("/extract-targeted/stream")
+async def extract_targeted_stream_endpoint(request: ExtractRequestTargeted, x_api_key: str = Header(None),
+                                           x_cache_bypass: bool = Header(False)):
+    """
+    Streaming variant of /extract-targeted (server-sent events).
+
+    Attributes resolved by the rules are emitted first, then the LLM's attributes as they are
+    generated, then the validated ExtractResponse as the `result` event.
+
+    Raises:
+        HTTPException: Returns 403 if the API key is invalid, 404 for an unknown `schema_id`.
+    """
+    if x_api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API Key")
+
+    schema_attributes = request_schema(request.schema_attributes, request.schema_id)
+    return sse_response(
+        stream_targeted(request.title, request.description, schema_attributes, use_cache=not x_cache_bypass)
+    )
+
+@app.post("/extract-hybrid/stream")
+async def extract_hybrid_stream_endpoint(request: ExtractRequestHybrid, x_api_key: str = Header(None),
+                                         x_cache_bypass: bool = Header(False)):
+    """
+    Streaming variant of /extract-hybrid (server-sent events).
+
+    First-stage attributes arrive as `partial` events tagged with their stage; the merged
+    CleanedAttributes follow as `attribute` events and the CleanedExtractResponse as `result`.
+
+    Raises:
+        HTTPException: Returns 403 if the API key is invalid, 404 for an unknown `schema_id`.
+    """
+    if x_api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API Key")
+
+    schema_attributes = request_schema(request.schema_attributes, request.schema_id)
+    return sse_response(
+        stream_hybrid(request.title, request.description, schema_attributes, use_cache=not x_cache_bypass)
+    )
+
+@app.post("/extract-batch", response_model=ExtractBatchResponse)
+async def extract_batch_endpoint(request: ExtractBatchRequest, x_api_key: str = Header(None), x_cache_bypass: bool = Header(False)):
+    """
+    Endpoint to run exploratory extraction over a list of products.
+
+    Args:
+        request (ExtractBatchRequest): The request body containing `items` and optional `concurrency`.
+        x_api_key (str, optional): API key sent in the header for authentication.
+        x_cache_bypass (bool, optional): Skip the result cache lookup and re-extract.
+
+    Raises:
+        HTTPException: Returns 403 if the API key is invalid, 422 for more than BATCH_MAX_ITEMS items.
+
+    Returns:
+        ExtractBatchResponse: Per-item results and errors, in input order.
+    """
+    if x_api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API Key")
+    check_item_count(request.items, BATCH_MAX_ITEMS)
+
+    return await run_batch(
+        "basic",
+        request.items,
+        concurrency=request.concurrency,
+        use_cache=not x_cache_bypass,
+        pack=request.pack
+    )
+
+@app.post("/extract-targeted-batch", response_model=ExtractBatchResponse)
+async def extract_targeted_batch_endpoint(request: ExtractBatchRequest, x_api_key: str = Header(None), x_cache_bypass: bool = Header(False)):
+    """
+    Endpoint to run targeted extraction over a list of products.
+
+    Args:
+        request (ExtractBatchRequest): The request body containing `items`, a default `schema_attributes`
+            (items may override it) and optional `concurrency`.
+        x_api_key (str, optional): API key sent in the header for authentication.
+        x_cache_bypass (bool, optional): Skip the result cache lookup and re-extract.
+
+    Raises:
+        HTTPException: Returns 403 if the API key is invalid, 404 for an unknown `schema_id`,
+            422 for more than BATCH_MAX_ITEMS items.
+
+    Returns:
+        ExtractBatchResponse: Per-item results and errors, in input order.
+    """
+    if x_api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API Key")
+    check_item_count(request.items, BATCH_MAX_ITEMS)
+
+    return await run_batch(
+        "targeted",
+        request.items,
+        default_schema=request_schema(request.schema_attributes, request.schema_id),
+        concurrency=request.concurrency,
+        use_cache=not x_cache_bypass,
+        pack=request.pack
+    )
+
+@app.post("/extract-hybrid-batch", response_model=CleanedExtractBatchResponse)
+async def extract_hybrid_batch_endpoint(request: ExtractBatchRequest, x_api_key: str = Header(None), x_cache_bypass: bool = Header(False)):
+    """
+    Endpoint to run hybrid extraction over a list of products.
+
+    Args:
+        request (ExtractBatchRequest): The request body containing `items`, a default `schema_attributes`
+            (items may override it) and optional `concurrency`.
+        x_api_key (str, optional): API key sent in the header for authentication.
+        x_cache_bypass (bool, optional): Skip the result cache lookup and re-extract.
+
+    Raises:
+        HTTPException: Returns 403 if the API key is invalid, 404 for an unknown `schema_id`,
+            422 for more than BATCH_MAX_ITEMS items.
+
+    Returns:
+        CleanedExtractBatchResponse: Per-item results and errors, in input order.
+    """
+    if x_api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API Key")
+    check_item_count(request.items, BATCH_MAX_ITEMS)
+
+    return await run_batch(
+        "hybrid",
+        request.items,
+        default_schema=request_schema(request.schema_attributes, request.schema_id),
+        concurrency=request.concurrency,
+        use_cache=not x_cache_bypass
+    )
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body generator itself consumes the request body.
+    Starlette would otherwise read `receive` concurrently to watch for disconnects and
+    swallow the request chunks; a disconnect still surfaces through the failed send.
+    """
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+
+def ndjson_batch_response(mode: str, request: Request, schema_attributes: Optional[List[str]],
+                          concurrency: Optional[int], x_cache_bypass: bool) -> StreamingResponse:
+    """
+    Stream NDJSON results for an NDJSON request body that is read incrementally.
+    """
+    results = stream_batch(
+        mode,
+        parse_ndjson_items(request.stream()),
+        default_schema=schema_attributes,
+        concurrency=concurrency,
+        use_cache=not x_cache_bypass
+    )
+    return DuplexStreamingResponse(results, media_type="application/x-ndjson")
+
+@app.post("/extract-batch/stream")
+async def extract_batch_stream_endpoint(request: Request, concurrency: Optional[int] = Query(None, ge=1),
+                                        x_api_key: str = Header(None), x_cache_bypass: bool = Header(False)):
+    """
+    Streaming variant of /extract-batch.
+
+    The body is NDJSON, one `{"id", "title", "description"}` object per line, read as it arrives.
+    Each line of the NDJSON response is a BatchItemResult, emitted as soon as that item completes.
+
+    Raises:
+        HTTPException: Returns 403 if the API key is invalid.
+    """
+    if x_api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API Key")
+
+    return ndjson_batch_response("basic", request, None, concurrency, x_cache_bypass)
+
+@app.post("/extract-targeted-batch/stream")
+async def extract_targeted_batch_stream_endpoint(request: Request, schema_attributes: Optional[List[str]] = Query(None),
+                                                 schema_id: Optional[str] = Query(None),
+                                                 concurrency: Optional[int] = Query(None, ge=1),
+                                                 x_api_key: str = Header(None), x_cache_bypass: bool = Header(False)):
+    """
+    Streaming variant of /extract-targeted-batch.
+
+    The body is NDJSON, one BatchItem per line, read as it arrives. The default schema is passed as
+    repeated `schema_attributes` query parameters or as a registered `schema_id`. Each line of
+    the NDJSON response is a BatchItemResult, emitted as soon as that item completes.
+
+    Raises:
+        HTTPException: Returns 403 if the API key is invalid, 404 for an unknown `schema_id`.
+    """
+    if x_api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API Key")
+
+    schema_attributes = request_schema(schema_attributes, schema_id)
+    return ndjson_batch_response("targeted", request, schema_attributes, concurrency, x_cache_bypass)
+
+@app.post("/extract-hybrid-batch/stream")
+async def extract_hybrid_batch_stream_endpoint(request: Request, schema_attributes: Optional[List[str]] = Query(None),
+                                               schema_id: Optional[str] = Query(None),
+                                               concurrency: Optional[int] = Query(None, ge=1),
+                                               x_api_key: str = Header(None), x_cache_bypass: bool = Header(False)):
+    """
+    Streaming variant of /extract-hybrid-batch.
+
+    The body is NDJSON, one BatchItem per line, read as it arrives. The default schema is passed as
+    repeated `schema_attributes` query parameters or as a registered `schema_id`. Each line of
+    the NDJSON response is a CleanedBatchItemResult, emitted as soon as that item completes.
+
+    Raises:
+        HTTPException: Returns 403 if the API key is invalid, 404 for an unknown `schema_id`.
+    """
+    if x_api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API Key")
+
+    schema_attributes = request_schema(schema_attributes, schema_id)
+    return ndjson_batch_response("hybrid", request, schema_attributes, concurrency, x_cache_bypass)
+
+@app.post("/jobs", response_model=JobStatus, status_code=202)
+async def create_job_endpoint(request: JobRequest, x_api_key: str = Header(None), x_cache_bypass: bool = Header(False)):
+    """
+    Queue an asynchronous extraction job for a large product set.
+
+    Items are checkpointed as they finish, so the job survives client disconnects, request
+    timeouts and restarts; poll GET /jobs/{id} for progress and read GET /jobs/{id}/results.
+
+    Args:
+        request (JobRequest): `mode` ('basic', 'targeted' or 'hybrid'), `items` and an optional
+            default `schema_attributes`.
+        x_api_key (str, optional): API key sent in the header for authentication.
+        x_cache_bypass (bool, optional): Skip the result cache lookup and re-extract.
+
+    Raises:
+        HTTPException: Returns 403 if the API key is invalid, 404 for an unknown `schema_id`,
+            422 for more than JOBS_MAX_ITEMS items, 503 if jobs are disabled.
+
+    Returns:
+        JobStatus: The queued job, including its `id`.
+    """
+    if x_api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API Key")
+    if not JOBS_ENABLED:
+        raise HTTPException(status_code=503, detail="Jobs are disabled")
+    check_item_count(request.items, JOBS_MAX_ITEMS)
+
+    return await get_job_runner().submit(
+        request.mode, request.items, request_schema(request.schema_attributes, request.schema_id), not x_cache_bypass
+    )
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job_endpoint(job_id: str, x_api_key: str = Header(None)):
+    """
+    Report the progress of a job.
+
+    Raises:
+        HTTPException: Returns 403 if the API key is invalid, 404 if the job does not exist.
+
+    Returns:
+        JobStatus: Status ('queued', 'running', 'completed') and item counts.
+    """
+    if x_api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API Key")
+
+    job = await get_job_runner().get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}/results")
+async def get_job_results_endpoint(job_id: str, after: int = Query(0, ge=0), follow: bool = Query(True),
+                                   x_api_key: str = Header(None)):
+    """
+    Stream a job's finished items as NDJSON, in completion order.
+
+    Each line is a batch item result (`index`, `id`, `result` or `error`). Pass `after=N` to
+    skip the first N lines already received; with `follow` (default) the stream stays open
+    until the job completes.
+
+    Raises:
+        HTTPException: Returns 403 if the API key is invalid, 404 if the job does not exist.
+    """
+    if x_api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API Key")
+
+    runner = get_job_runner()
+    if await runner.get_job(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(runner.stream_results(job_id, after, follow), media_type="application/x-ndjson")
+
+@app.post("/sync", response_model=SyncResponse)
+async def sync_endpoint(request: SyncRequest, x_api_key: str = Header(None), x_cache_bypass: bool = Header(False)):
+    """
+    Incremental re-extraction of a full catalog feed.
+
+    Each item's title, description, schema and prompt version are fingerprinted and compared
+    with the last stored result for its SKU (`id`); only new and changed items are extracted.
+    More than SYNC_INLINE_MAX_ITEMS of them are queued as a job instead of extracted inline.
+
+    Args:
+        request (SyncRequest): The feed (`items` with SKU `id`s), `mode` (default 'hybrid'),
+            optional default `schema_attributes`, `concurrency`, `force` and `prune`.
+        x_api_key (str, optional): API key sent in the header for authentication.
+        x_cache_bypass (bool, optional): Skip the result cache lookup and re-extract.
+
+    Raises:
+        HTTPException: Returns 403 if the API key is invalid, 404 for an unknown `schema_id`,
+            422 for more than SYNC_MAX_ITEMS items.
+
+    Returns:
+        SyncResponse: Counts of unchanged, new, changed, failed and removed SKUs, and the
+        results of the items that were re-extracted or failed (or the queued `job`).
+    """
+    if x_api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API Key")
+    check_item_count(request.items, SYNC_MAX_ITEMS)
+
+    return await run_sync(
+        request.mode,
+        request.items,
+        default_schema=request_schema(request.schema_attributes, request.schema_id),
+        concurrency=request.concurrency,
+        use_cache=not x_cache_bypass,
+        force=request.force,
+        prune=request.prune,
+    )
+
+@app.get("/skus/{sku}")
+async def get_sku_endpoint(sku: str, mode: str = Query("hybrid"), x_api_key: str = Header(None)):
+    """
+    Last stored result for a SKU.
+
+    Raises:
+        HTTPException: Returns 403 if the API key is invalid, 404 if the SKU has no stored result.
+    """
+    if x_api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API Key")
+
+    stored = get_sku_store().get(mode, sku)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="SKU not found")
+    fingerprint, result, updated_at = stored
+    return {"sku": sku, "mode": mode, "fingerprint": fingerprint, "updated_at": updated_at, "result": result}
+
+@app.post("/schemas", response_model=RegisteredSchema)
+async def register_schema_endpoint(request: SchemaRegisterRequest, response: Response, x_api_key: str = Header(None)):
+    """
+    Register (or version) a category schema.
+
+    Attribute names are normalized (whitespace collapsed, duplicates dropped, order kept) and the
+    prompt fragment is rendered once. Registering attributes identical to the latest version
+    returns that version (200); anything else creates the next version (201).
+
+    Args:
+        request (SchemaRegisterRequest): The schema `name` and its `attributes`.
+        x_api_key (str, optional): API key sent in the header for authentication.
+
+    Raises:
+        HTTPException: Returns 403 if the API key is invalid, 422 if no attribute remains.
+
+    Returns:
+        RegisteredSchema: The schema version, with its `id` ('name@vN') to pass as `schema_id`.
+    """
+    if x_api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API Key")
+
+    try:
+        schema, created = get_schema_registry().register(request.name, request.attributes)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    response.status_code = 201 if created else 200
+    return schema
+
+@app.get("/schemas", response_model=List[RegisteredSchema])
+async def list_schemas_endpoint(x_api_key: str = Header(None)):
+    """
+    List the latest version of every registered schema.
+
+    Raises:
+        HTTPException: Returns 403 if the API key is invalid.
+    """
+    if x_api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API Key")
+
+    return get_schema_registry().list()
+
+@app.get("/schemas/{schema_id}", response_model=RegisteredSchema)
+async def get_schema_endpoint(schema_id: str, x_api_key: str = Header(None)):
+    """
+    Fetch a registered schema by 'name' (latest version) or 'name@vN'.
+
+    Raises:
+        HTTPException: Returns 403 if the API key is invalid, 404 if the schema is unknown.
+    """
+    if x_api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API Key")
+
+    try:
+        return get_schema_registry().get(schema_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown schema_id: {schema_id}")
+
+@app.get("/stats")
+async def stats_endpoint(x_api_key: str = Header(None)):
+    """
+    Endpoint reporting runtime counters (result cache hits/misses, coalesced requests,
+    attributes resolved by the rule-based fast path, outbound OpenAI scheduling, hedged calls,
+    basic extractions served by variant reuse, model cascade tiers, inbound admission control).
+
+    Raises:
+        HTTPException: Returns 403 if the API key is invalid.
+    """
+    if x_api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API Key")
+
+    return {
+        "cache": get_result_cache().stats(),
+        "coalescing": get_single_flight().stats(),
+        "fast_path": rules.stats.as_dict(),
+        "openai": scheduler_stats(),
+        "hedging": hedging_stats(),
+        "variants": variant_stats(),
+        "cascade": cascade_stats(),
+        "admission": admission_stats(),
+    }
+
+@app.get("/metrics")
+async def metrics_endpoint(x_api_key: str = Header(None)):
+    """
+    Prometheus scrape endpoint: request, stage and LLM call latency histograms, token
+    usage, in-flight requests, errors by type, and the runtime counters from /stats.
+
+    Raises:
+        HTTPException: Returns 403 if the API key is invalid.
+    """
+    if x_api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API Key")
+
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 
 port = int(os.environ.get("PORT", 8080))
 
@@ -0,0 +1,130 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from backend import cache as cache_module
+from backend import ratelimit
+from backend import hedging
+from backend import variants
+from backend import admission
+
+
+class FakeRawResponse:
+    """
+    Stand-in for the SDK's raw response wrapper (`with_raw_response`).
+    """
+    def __init__(self, parsed, headers):
+        self.headers = headers
+        self._parsed = parsed
+
+    def parse(self):
+        return self._parsed
+
+
+class FakeCompletions:
+    """
+    Stand-in for `client.chat.completions` that answers from a handler function.
+    """
+    def __init__(self, handler, delay: float = 0.0, headers: dict = None):
+        self.handler = handler
+        self.delay = delay
+        self.headers = headers or {}
+        self.calls = []
+        self.with_raw_response = SimpleNamespace(create=self._create_raw)
+
+    async def _create_raw(self, **kwargs):
+        return FakeRawResponse(await self.create(**kwargs), self.headers)
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        payload = self.handler(kwargs)
+        content = payload if isinstance(payload, str) else json.dumps(payload)
+        if kwargs.get("stream"):
+            return FakeStream(content)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15),
+        )
+
+
+class FakeStream:
+    """
+    Stand-in for the SDK's async chunk stream: the content in small deltas, then a usage chunk.
+    """
+    def __init__(self, content: str, size: int = 7):
+        self.chunks = [
+            SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content[i:i + size]))], usage=None)
+            for i in range(0, len(content), size)
+        ]
+        self.chunks.append(
+            SimpleNamespace(choices=[], usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15))
+        )
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(0)
+            yield chunk
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeAsyncClient:
+    """
+    Minimal async OpenAI client double exposing `chat.completions.create`.
+    """
+    def __init__(self, handler, delay: float = 0.0, headers: dict = None):
+        self.completions = FakeCompletions(handler, delay, headers)
+        self.chat = SimpleNamespace(completions=self.completions)
+
+    @property
+    def calls(self):
+        return self.completions.calls
+
+
+@pytest.fixture(autouse=True)
+def fresh_result_cache(monkeypatch):
+    """
+    Give every test an empty in-memory result cache.
+    """
+    monkeypatch.setattr(cache_module, "_cache", cache_module.ResultCache())
+
+
+@pytest.fixture(autouse=True)
+def fresh_schedulers(monkeypatch):
+    """
+    Give every test its own outbound schedulers (they hold event-loop timers).
+    """
+    monkeypatch.setattr(ratelimit, "_schedulers", {})
+
+
+@pytest.fixture(autouse=True)
+def fresh_hedgers(monkeypatch):
+    """
+    Give every test empty hedging policies and latency windows.
+    """
+    monkeypatch.setattr(hedging, "_hedgers", {})
+
+
+@pytest.fixture(autouse=True)
+def fresh_variant_index(monkeypatch):
+    """
+    Give every test an empty variant index.
+    """
+    monkeypatch.setattr(variants, "_index", variants.VariantIndex())
+
+
+@pytest.fixture(autouse=True)
+def fresh_admission(monkeypatch):
+    """
+    Give every test its own admission controller (its queue holds event-loop futures).
+    """
+    monkeypatch.setattr(admission, "_controller", admission.AdmissionController())
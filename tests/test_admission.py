@@ -0,0 +1,151 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from backend import admission, models
+from backend.admission import AdmissionController, DeadlineExceeded, Overloaded, request_deadline, within_deadline
+from conftest import FakeAsyncClient
+
+HEADERS = {"x-api-key": "test-key"}
+BASIC = {"attributes": [{"name": "Colour", "value": ["Red"]}]}
+
+
+def make_client(monkeypatch, delay=0.0):
+    fake = FakeAsyncClient(lambda kwargs: BASIC, delay=delay)
+    monkeypatch.setattr(main, "API_KEY", "test-key")
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: fake)
+    return TestClient(main.app), fake
+
+
+def test_queue_is_fifo_and_bounded():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=5)
+        await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as shed:
+            await controller.acquire()
+        controller.release(2.0)
+        await waiter
+        return controller, shed.value
+
+    controller, shed = asyncio.run(scenario())
+    assert shed.status_code == 429 and shed.retry_after >= 1
+    assert controller.in_flight == 1 and controller.admitted == 2 and controller.rejected == 1
+
+
+def test_waiting_too_long_is_shed_with_503():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=4, queue_timeout=0.01)
+        await controller.acquire()
+        with pytest.raises(Overloaded) as shed:
+            await controller.acquire()
+        return controller, shed.value
+
+    controller, shed = asyncio.run(scenario())
+    assert shed.status_code == 503
+    assert controller.timed_out == 1 and controller.stats()["waiting"] == 0
+
+
+def test_expired_deadline_never_starts_the_call():
+    started = []
+
+    async def call():
+        started.append(True)
+
+    async def scenario():
+        request_deadline.set(asyncio.get_running_loop().time() - 1)
+        with pytest.raises(DeadlineExceeded):
+            await within_deadline(call())
+
+    asyncio.run(scenario())
+    assert started == []
+
+
+def test_deadline_header_cancels_the_llm_call(monkeypatch):
+    client, fake = make_client(monkeypatch, delay=2.0)
+
+    started = time.perf_counter()
+    resp = client.post("/extract", json={"title": "t", "description": "d"}, headers={**HEADERS, "x-request-timeout": "0.1"})
+
+    assert resp.status_code == 504
+    assert time.perf_counter() - started < 1.5
+    stats = client.get("/stats", headers=HEADERS).json()["admission"]
+    assert stats["in_flight"] == 0 and stats["admitted"] == 1 and stats["deadline_exceeded"] == 1
+
+
+def test_other_timeouts_are_not_reported_as_the_deadline(monkeypatch):
+    async def pool_timeout():
+        raise asyncio.TimeoutError()
+
+    async def scenario():
+        request_deadline.set(asyncio.get_running_loop().time() + 5)
+        await within_deadline(pool_timeout())
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(scenario())
+
+    def handler(kwargs):
+        raise asyncio.TimeoutError()
+
+    monkeypatch.setattr(main, "API_KEY", "test-key")
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: FakeAsyncClient(handler))
+    client = TestClient(main.app, raise_server_exceptions=False)
+
+    resp = client.post("/extract", json={"title": "t", "description": "d"}, headers={**HEADERS, "x-request-timeout": "5"})
+
+    assert resp.status_code == 500
+    stats = client.get("/stats", headers=HEADERS).json()["admission"]
+    assert stats["deadline_exceeded"] == 0 and stats["in_flight"] == 0
+
+
+def test_coalesced_callers_keep_their_own_deadlines(monkeypatch):
+    fake = FakeAsyncClient(lambda kwargs: BASIC, delay=0.3)
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: fake)
+
+    async def call(timeout):
+        if timeout is not None:
+            request_deadline.set(asyncio.get_running_loop().time() + timeout)
+        return await models.run_extraction_basic_async("Red shirt", "Cotton")
+
+    async def scenario():
+        # The short deadline belongs to the leader; the follower has none
+        return await asyncio.gather(call(0.05), call(None), return_exceptions=True)
+
+    leader, follower = asyncio.run(scenario())
+
+    assert isinstance(leader, DeadlineExceeded)
+    assert follower.attributes[0].value == ["Red"]
+    assert len(fake.calls) == 1
+
+
+def test_batch_deadline_fails_items_not_the_request(monkeypatch):
+    client, _ = make_client(monkeypatch, delay=2.0)
+    body = {"items": [{"id": "a", "title": "t", "description": "d"}]}
+
+    resp = client.post("/extract-batch", json=body, headers={**HEADERS, "x-request-timeout": "0.1"})
+
+    assert resp.status_code == 200
+    assert resp.json()["results"][0]["error"].startswith("DeadlineExceeded")
+
+
+def test_overload_is_shed_with_retry_after(monkeypatch):
+    client, fake = make_client(monkeypatch)
+    monkeypatch.setattr(admission, "_controller", AdmissionController(max_in_flight=0, max_queue=0))
+
+    resp = client.post("/extract", json={"title": "t", "description": "d"}, headers=HEADERS)
+
+    assert resp.status_code == 429
+    assert int(resp.headers["retry-after"]) >= 1
+    assert fake.calls == []
+    # Endpoints that do no extraction work are never shed
+    assert client.get("/stats", headers=HEADERS).status_code == 200
+
+
+def test_request_timeout_defaults():
+    assert admission.request_timeout("/extract", [(b"x-request-timeout", b"2.5")]) == 2.5
+    assert admission.request_timeout("/extract", [(b"x-request-timeout", b"nonsense")]) == admission.REQUEST_TIMEOUT
+    assert admission.request_timeout("/extract-batch", []) is None
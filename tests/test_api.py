@@ -0,0 +1,86 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+from backend import models
+from conftest import FakeAsyncClient
+
+BASIC = {"attributes": [{"name": "Colour", "value": ["Red"]}]}
+HEADERS = {"x-api-key": "test-key"}
+
+
+def make_client(monkeypatch, handler=lambda kwargs: BASIC):
+    fake = FakeAsyncClient(handler)
+    monkeypatch.setattr(main, "API_KEY", "test-key")
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: fake)
+    return TestClient(main.app), fake
+
+
+def test_invalid_api_key_is_rejected(monkeypatch):
+    client, _ = make_client(monkeypatch)
+    resp = client.post("/extract", json={"title": "t", "description": "d"}, headers={"x-api-key": "wrong"})
+    assert resp.status_code == 403
+
+
+def test_cache_bypass_header_and_stats(monkeypatch):
+    client, fake = make_client(monkeypatch)
+    body = {"title": "Red T-shirt", "description": "Cotton"}
+
+    first = client.post("/extract", json=body, headers=HEADERS).json()
+    assert [(a["name"], a["value"]) for a in first["attributes"]] == [("Colour", ["Red"])]
+    client.post("/extract", json=body, headers=HEADERS)
+    client.post("/extract", json=body, headers={**HEADERS, "x-cache-bypass": "true"})
+    assert len(fake.calls) == 2
+
+    stats = client.get("/stats", headers=HEADERS).json()["cache"]
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_targeted_with_empty_schema_returns_no_attributes(monkeypatch):
+    client, fake = make_client(monkeypatch)
+    resp = client.post("/extract-targeted", json={"title": "t", "description": "d", "schema_attributes": []}, headers=HEADERS)
+    assert resp.status_code == 200
+    assert resp.json()["attributes"] == []
+    assert fake.calls == []
+
+
+def test_batch_item_limit_is_enforced_by_the_endpoint(monkeypatch):
+    client, fake = make_client(monkeypatch)
+    monkeypatch.setattr(main, "BATCH_MAX_ITEMS", 1)
+    body = {"items": [{"title": "t", "description": "d"}] * 2}
+    resp = client.post("/extract-batch", json=body, headers=HEADERS)
+    assert resp.status_code == 422
+    assert resp.json()["detail"] == "Too many items: 2 (maximum 1)"
+    assert fake.calls == []
+
+
+def test_hybrid_batch_endpoint(monkeypatch):
+    client, _ = make_client(monkeypatch)
+    body = {
+        "schema_attributes": ["Colour"],
+        "items": [{"id": "sku-1", "title": "Red T-shirt", "description": "Cotton"}],
+    }
+
+    resp = client.post("/extract-hybrid-batch", json=body, headers=HEADERS)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["succeeded"] == 1
+    assert data["results"][0]["id"] == "sku-1"
+    assert data["results"][0]["result"]["attributes"][0]["method"] == "non targeted; targeted"
+
+
+def test_streaming_batch_endpoint(monkeypatch):
+    client, _ = make_client(monkeypatch)
+    body = b'{"id": "a", "title": "Red T-shirt", "description": "Cotton"}\n{"id": "b", "title": "Blue T-shirt", "description": "Cotton"}\n'
+
+    resp = client.post(
+        "/extract-targeted-batch/stream?schema_attributes=Colour",
+        content=body,
+        headers={**HEADERS, "content-type": "application/x-ndjson"},
+    )
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = [line for line in resp.text.splitlines() if line]
+    assert sorted(json.loads(line)["id"] for line in lines) == ["a", "b"]
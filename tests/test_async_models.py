@@ -0,0 +1,43 @@
+import asyncio
+import time
+
+from backend import models
+from backend.schemas import ExtractResponse, CleanedExtractResponse
+from conftest import FakeAsyncClient
+
+BASIC = {"attributes": [{"name": "Colour", "value": ["Red"]}]}
+MERGED = {"attributes": [{"name": "Colour", "value": ["Red"], "method": "non targeted; targeted"}]}
+
+
+def test_basic_async_returns_model(monkeypatch):
+    client = FakeAsyncClient(lambda kwargs: BASIC)
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+    result = asyncio.run(models.run_extraction_basic_async("Red T-shirt", "Cotton"))
+    assert isinstance(result, ExtractResponse)
+    assert result.attributes[0].value == ["Red"]
+    assert client.calls[0]["model"] == "gpt-4.1-mini"
+
+
+def test_hybrid_async_returns_cleaned_model(monkeypatch):
+    client = FakeAsyncClient(lambda kwargs: MERGED)
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+    result = asyncio.run(models.run_hybrid_prompt_async("Red T-shirt", "Cotton", BASIC, BASIC))
+    assert isinstance(result, CleanedExtractResponse)
+    assert client.calls[0]["model"] == "gpt-4o-mini"
+
+
+def test_async_calls_overlap(monkeypatch):
+    client = FakeAsyncClient(lambda kwargs: BASIC, delay=0.2)
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+
+    async def run_many():
+        return await asyncio.gather(*(
+            # Distinct titles, so the calls are not coalesced into one
+            models.run_targeted_prompt_async(f"Plain T-shirt {i}", "Cotton", ["Colour"]) for i in range(20)
+        ))
+
+    start = time.perf_counter()
+    results = asyncio.run(run_many())
+    assert len(results) == 20
+    assert len(client.calls) == 20
+    assert time.perf_counter() - start < 1.0
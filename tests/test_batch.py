@@ -0,0 +1,123 @@
+import asyncio
+import json
+import time
+
+from backend import models, batch
+from backend.schemas import BatchItem
+from conftest import FakeAsyncClient
+
+
+def handler(kwargs):
+    text = kwargs["messages"][1]["content"][0]["text"]
+    if "broken" in text:
+        raise RuntimeError("LLM error")
+    return {"attributes": [{"name": "Colour", "value": [text.split()[0]]}]}
+
+
+def test_batch_keeps_input_order_and_isolates_failures(monkeypatch):
+    client = FakeAsyncClient(handler)
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+    items = [
+        BatchItem(id="a", title="Red shirt", description="x"),
+        BatchItem(id="b", title="broken shirt", description="x"),
+        BatchItem(id="c", title="Blue shirt", description="x"),
+    ]
+
+    response = asyncio.run(batch.run_batch("basic", items))
+
+    assert [r.id for r in response.results] == ["a", "b", "c"]
+    assert response.results[0].result.attributes[0].value == ["Red"]
+    assert response.results[1].result is None
+    assert "LLM error" in response.results[1].error
+    assert (response.succeeded, response.failed) == (2, 1)
+
+
+def test_targeted_batch_requires_a_schema(monkeypatch):
+    client = FakeAsyncClient(handler)
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+    items = [
+        BatchItem(title="Red shirt", description="x"),
+        BatchItem(title="Blue shirt", description="x", schema_attributes=["Colour"]),
+    ]
+
+    response = asyncio.run(batch.run_batch("targeted", items))
+    assert "schema_attributes is required" in response.results[0].error
+    assert response.results[1].error is None
+
+    response = asyncio.run(batch.run_batch("targeted", items, default_schema=["Colour"]))
+    assert response.failed == 0
+
+
+def test_concurrency_is_bounded(monkeypatch):
+    client = FakeAsyncClient(handler, delay=0.1)
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+    items = [BatchItem(title=f"Shirt{i} x", description="x") for i in range(6)]
+
+    start = time.perf_counter()
+    asyncio.run(batch.run_batch("basic", items, concurrency=3))
+    elapsed = time.perf_counter() - start
+    assert 0.2 <= elapsed < 0.35
+
+
+def test_slow_item_times_out(monkeypatch):
+    client = FakeAsyncClient(handler, delay=0.2)
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+    monkeypatch.setattr(batch, "BATCH_ITEM_TIMEOUT", 0.05)
+
+    response = asyncio.run(batch.run_batch("basic", [BatchItem(title="Red shirt", description="x")]))
+    assert response.results[0].error.startswith("Timed out")
+
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+
+async def collect(agen):
+    return [line async for line in agen]
+
+
+def test_ndjson_items_are_parsed_across_chunk_boundaries():
+    body = (b'{"id": "a", "title": "Red", "desc', b'ription": "x"}\n\n{"title": 1}\n', b'{"title": "Blue", "description": "y"}')
+    items = asyncio.run(collect(batch.parse_ndjson_items(chunks(*body))))
+    assert items[0].id == "a"
+    assert isinstance(items[1], ValueError)
+    assert items[2].title == "Blue"
+
+
+def test_stream_batch_emits_results_as_they_complete(monkeypatch):
+    client = FakeAsyncClient(handler)
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+
+    async def items():
+        yield BatchItem(id="a", title="Red shirt", description="x")
+        yield ValueError("Invalid item: bad")
+        yield BatchItem(id="c", title="broken shirt", description="x")
+
+    lines = asyncio.run(collect(batch.stream_batch("basic", items(), concurrency=2)))
+    results = sorted((json.loads(line) for line in lines), key=lambda r: r["index"])
+    assert [r["index"] for r in results] == [0, 1, 2]
+    assert results[0]["result"]["attributes"][0]["value"] == ["Red"]
+    assert results[1]["error"] == "Invalid item: bad"
+    assert "LLM error" in results[2]["error"]
+
+
+def test_stream_batch_reads_input_lazily(monkeypatch):
+    client = FakeAsyncClient(handler, delay=0.05)
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+    read = []
+
+    async def items():
+        for i in range(6):
+            read.append(i)
+            yield BatchItem(title=f"Shirt{i} x", description="x")
+
+    async def scenario():
+        stream = batch.stream_batch("basic", items(), concurrency=2)
+        first = await stream.__anext__()
+        # Only the in-flight window and the bounded result queue have been pulled from the body
+        assert len(read) <= 2 * 2 + 1
+        rest = [line async for line in stream]
+        return [first] + rest
+
+    assert len(asyncio.run(scenario())) == 6
@@ -0,0 +1,74 @@
+import json
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import models
+from backend.packing import build_packed_request
+from backend.schemas import BatchItem
+from benchmarks import compare, run
+from benchmarks.fake_openai import FakeSettings, create_app, parse_latency
+
+
+def completion_content(resp):
+    assert resp.status_code == 200
+    return json.loads(resp.json()["choices"][0]["message"]["content"])
+
+
+def test_latency_specs():
+    rng = random.Random(1)
+    assert parse_latency("fixed:0.25")(rng) == 0.25
+    assert 0.1 <= parse_latency("uniform:0.1:0.2")(rng) <= 0.2
+    assert parse_latency("lognormal:0.5:0.4")(rng) > 0
+    with pytest.raises(ValueError):
+        parse_latency("gamma:1")
+
+
+def test_fake_server_answers_each_request_shape():
+    client = TestClient(create_app(FakeSettings(latency="fixed:0")))
+
+    basic = completion_content(client.post("/v1/chat/completions", json=models.build_basic_request("Bin", "Steel")))
+    assert basic["attributes"][0]["name"] == "Colour"
+
+    targeted = models.build_targeted_request("Bin", "Steel", ["Material", "Voltage"])
+    content = completion_content(client.post("/v1/chat/completions", json=targeted))
+    assert content["attributes"] == [
+        {"name": "Material", "value": ["Stainless Steel"]},
+        {"name": "Voltage", "value": ["N/A"]},
+    ]
+
+    hybrid = models.build_hybrid_request("Bin", "Steel", {"attributes": []}, {"attributes": []})
+    content = completion_content(client.post("/v1/chat/completions", json=hybrid))
+    assert all("method" in attribute for attribute in content["attributes"])
+
+    items = [BatchItem(title="A", description="a"), BatchItem(title="B", description="b")]
+    packed = build_packed_request("basic", items, [None, None])
+    assert set(completion_content(client.post("/v1/chat/completions", json=packed))) == {"product_1", "product_2"}
+
+
+def test_fake_server_error_rates():
+    client = TestClient(create_app(FakeSettings(latency="fixed:0", error_rate=1.0)))
+    assert client.post("/v1/chat/completions", json=models.build_basic_request("Bin", "Steel")).status_code == 500
+
+    client = TestClient(create_app(FakeSettings(latency="fixed:0", rate_limit_rate=1.0)))
+    resp = client.post("/v1/chat/completions", json=models.build_basic_request("Bin", "Steel"))
+    assert resp.status_code == 429
+    assert resp.headers["retry-after-ms"] == "200"
+
+
+def test_summary_percentiles():
+    summary = run.summarize([i / 1000 for i in range(1, 101)])
+    assert summary["p50"] == 50.0
+    assert summary["p99"] == 99.0
+    assert summary["max"] == 100.0
+
+
+def test_compare_flags_regressions():
+    def level(rps, p95, p99):
+        return {"rps": rps, "latency_ms": {"p95": p95, "p99": p99}}
+
+    baseline = {("/extract", 8): level(100, 500, 900), ("/extract", 32): level(300, 600, 1000)}
+    current = {("/extract", 8): level(98, 510, 920), ("/extract", 32): level(240, 600, 1000)}
+    rows = compare.compare(baseline, current, threshold=10)
+    assert [row[4] for row in rows] == [False, True]
@@ -0,0 +1,53 @@
+import asyncio
+
+from backend import models
+from backend.cache import ResultCache, SQLiteCacheTier, fingerprint
+from conftest import FakeAsyncClient
+
+BASIC = {"attributes": [{"name": "Colour", "value": ["Red"]}]}
+
+
+def test_fingerprint_normalizes_schema_attributes():
+    a = fingerprint("targeted", "m", "v1", "Title", "Desc", [" Colour", "Size", "size", ""])
+    b = fingerprint("targeted", "m", "v1", "Title ", "Desc", ["Colour", "Size"])
+    assert a == b
+    assert a != fingerprint("targeted", "m", "v2", "Title", "Desc", ["Colour", "Size"])
+    # Results come back in schema order, so a reordered schema is a different entry
+    assert a != fingerprint("targeted", "m", "v1", "Title", "Desc", ["Size", "Colour"])
+
+
+def test_lru_eviction_and_ttl():
+    cache = ResultCache(max_entries=2, ttl=60)
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    cache.get("a")
+    cache.set("c", {"v": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+    assert cache.evictions == 1
+
+    expired = ResultCache(ttl=-1)
+    expired.set("a", {"v": 1})
+    assert expired.get("a") is None
+
+
+def test_sqlite_tier_survives_a_new_cache(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    ResultCache(persistent=SQLiteCacheTier(path)).set("k", {"v": 1})
+
+    restarted = ResultCache(persistent=SQLiteCacheTier(path))
+    assert restarted.get("k") == {"v": 1}
+    assert restarted.stats()["disk_hits"] == 1
+
+
+def test_repeated_request_is_served_from_cache(monkeypatch):
+    client = FakeAsyncClient(lambda kwargs: BASIC)
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+
+    first = asyncio.run(models.run_extraction_basic_async("Red T-shirt", "Cotton"))
+    second = asyncio.run(models.run_extraction_basic_async("Red T-shirt", "Cotton"))
+    assert first == second
+    assert len(client.calls) == 1
+
+    asyncio.run(models.run_extraction_basic_async("Red T-shirt", "Cotton", use_cache=False))
+    assert len(client.calls) == 2
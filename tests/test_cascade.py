@@ -0,0 +1,101 @@
+import asyncio
+
+from backend import cascade, models, streaming
+from backend.cascade import quality_issues
+from backend.schemas import ExtractResponse
+from conftest import FakeAsyncClient
+
+
+def response(*attributes):
+    return ExtractResponse(attributes=[{"name": name, "value": value} for name, value in attributes])
+
+
+def test_quality_checks():
+    assert quality_issues(response(("Colour", ["Red"]), ("Size", ["M"])), ["colour", "Size"]) == []
+    assert quality_issues(response()) == ["empty"]
+    assert quality_issues(response(("Colour", ["Red"])), ["Colour", "Size"]) == ["missing"]
+    assert quality_issues(response(("Colour", ["N/A"]), ("Size", ["n/a"]), ("Fit", ["Slim"]))) == ["na_ratio"]
+    assert quality_issues(response(("Colour: Red", ["Red"]), ("Size", [" "]))) == ["bad_name", "empty_value"]
+
+
+def test_without_a_cascade_the_request_is_sent_once_as_built(monkeypatch):
+    monkeypatch.setattr(cascade, "CASCADE_MODELS", {})
+    client = FakeAsyncClient(lambda kwargs: {"attributes": []})
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+
+    result = asyncio.run(models.run_extraction_basic_async("Red T-shirt", "Cotton"))
+
+    assert result.attributes == []
+    assert [call["model"] for call in client.calls] == [models.EXTRACTION_MODEL]
+
+
+def test_good_output_from_the_fast_tier_is_kept(monkeypatch):
+    monkeypatch.setattr(cascade, "CASCADE_MODELS", {"targeted": ["fast@0.2", "strong"]})
+    monkeypatch.setattr(cascade, "_stats", {})
+    client = FakeAsyncClient(lambda kwargs: {"attributes": [{"name": "Fit", "value": ["Slim"]}]})
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+
+    result = asyncio.run(models.run_targeted_prompt_async("Shirt", "Slim fit shirt", ["Fit"]))
+
+    assert [(a.name, a.value, a.source) for a in result.attributes] == [("Fit", ["Slim"], "llm")]
+    assert [(call["model"], call["temperature"]) for call in client.calls] == [("fast", 0.2)]
+    assert cascade.cascade_stats()["targeted"]["fast"]["accepted"] == 1
+
+
+def test_failing_output_escalates_to_the_next_tier(monkeypatch):
+    monkeypatch.setattr(cascade, "CASCADE_MODELS", {"targeted": ["fast", "strong"]})
+    monkeypatch.setattr(cascade, "_stats", {})
+
+    def handler(kwargs):
+        if kwargs["model"] == "fast":
+            return {"attributes": [{"name": "Fit", "value": ["Slim"]}]}
+        return {"attributes": [{"name": "Fit", "value": ["Slim"]}, {"name": "Collar", "value": ["Button-down"]}]}
+
+    client = FakeAsyncClient(handler)
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+
+    result = asyncio.run(models.run_targeted_prompt_async("Shirt", "Slim fit shirt", ["Fit", "Collar"]))
+
+    assert [a.name for a in result.attributes] == ["Fit", "Collar"]
+    assert [call["model"] for call in client.calls] == ["fast", "strong"]
+    stats = cascade.cascade_stats()["targeted"]
+    assert stats["fast"]["escalated"] == 1 and stats["fast"]["reasons"] == {"missing": 1}
+    assert stats["strong"]["accepted"] == 1
+
+
+def test_unparseable_output_escalates_and_the_last_tier_is_always_kept(monkeypatch):
+    monkeypatch.setattr(cascade, "CASCADE_MODELS", {"basic": ["fast", "strong"]})
+    monkeypatch.setattr(cascade, "_stats", {})
+    client = FakeAsyncClient(lambda kwargs: "not json" if kwargs["model"] == "fast" else {"attributes": []})
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+
+    result = asyncio.run(models.run_extraction_basic_async("Red T-shirt", "Cotton"))
+
+    assert result.attributes == []
+    assert cascade.cascade_stats()["basic"]["fast"]["reasons"] == {"invalid_output": 1}
+
+
+def test_cascade_is_part_of_the_cache_key(monkeypatch):
+    monkeypatch.setattr(cascade, "CASCADE_MODELS", {})
+    plain = models.prompt_version("hybrid")
+    monkeypatch.setattr(cascade, "CASCADE_MODELS", {"merge": ["fast", "strong"]})
+
+    assert models.prompt_version("basic") == models.BASIC_PROMPT_VERSION
+    assert models.prompt_version("hybrid") == f"{plain}:merge=fast>strong"
+
+
+def test_streamed_results_are_not_served_as_cascaded_ones(monkeypatch):
+    monkeypatch.setattr(cascade, "CASCADE_MODELS", {"basic": ["fast", "strong"]})
+    monkeypatch.setattr(cascade, "_stats", {})
+    client = FakeAsyncClient(lambda kwargs: {"attributes": [{"name": "Colour", "value": ["Red"]}]})
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+
+    async def scenario():
+        events = [event async for event in streaming.stream_basic("Red T-shirt", "Cotton")]
+        return events, await models.run_extraction_basic_async("Red T-shirt", "Cotton")
+
+    events, result = asyncio.run(scenario())
+
+    assert events[-1][0] == "result" and result.attributes[0].value == ["Red"]
+    # The streamed call skipped the quality checks, so the JSON endpoint runs the cascade itself
+    assert [call["model"] for call in client.calls] == [models.EXTRACTION_MODEL, "fast"]
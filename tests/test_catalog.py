@@ -0,0 +1,113 @@
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+from backend import catalog, jobs, models
+from backend.catalog import SkuStore
+from backend.jobs import JobRunner, JobStore
+from conftest import FakeAsyncClient
+from test_api import HEADERS
+
+TARGETED = {"attributes": [{"name": "Material", "value": ["Cotton"]}]}
+
+
+def feed(*descriptions):
+    return [
+        {"id": f"sku-{i}", "title": f"Plain T-shirt {i}", "description": description}
+        for i, description in enumerate(descriptions)
+    ]
+
+
+def make_client(monkeypatch, tmp_path):
+    fake = FakeAsyncClient(lambda kwargs: TARGETED)
+    monkeypatch.setattr(main, "API_KEY", "test-key")
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: fake)
+    monkeypatch.setattr(catalog, "_store", SkuStore(str(tmp_path / "skus.sqlite3")))
+    return TestClient(main.app), fake
+
+
+def sync(client, items, **options):
+    body = {"mode": "targeted", "items": items, "schema_attributes": ["Material"], **options}
+    resp = client.post("/sync", json=body, headers=HEADERS)
+    assert resp.status_code == 200
+    return resp.json()
+
+
+def counts(report):
+    return {key: report[key] for key in ("total", "unchanged", "new", "changed", "failed", "removed")}
+
+
+def test_sync_only_reextracts_new_and_changed_items(monkeypatch, tmp_path):
+    client, fake = make_client(monkeypatch, tmp_path)
+
+    first = sync(client, feed("Cotton", "Wool", "Linen"))
+    assert counts(first) == {"total": 3, "unchanged": 0, "new": 3, "changed": 0, "failed": 0, "removed": 0}
+    calls = len(fake.calls)
+
+    second = sync(client, feed("Cotton", "Wool blend", "Linen") + [
+        {"id": "sku-9", "title": "Plain hoodie", "description": "Fleece"}
+    ])
+    assert counts(second) == {"total": 4, "unchanged": 2, "new": 1, "changed": 1, "failed": 0, "removed": 0}
+    assert [(r["id"], r["status"]) for r in second["results"]] == [("sku-1", "changed"), ("sku-9", "new")]
+    assert len(fake.calls) == calls + 2
+
+    stored = client.get("/skus/sku-1", params={"mode": "targeted"}, headers=HEADERS).json()
+    assert stored["result"]["attributes"][0]["value"] == ["Cotton"]
+    assert client.get("/skus/sku-1", headers=HEADERS).status_code == 404  # nothing stored for hybrid
+
+
+def test_schema_or_prompt_version_change_invalidates(monkeypatch, tmp_path):
+    client, _ = make_client(monkeypatch, tmp_path)
+    sync(client, feed("Cotton"))
+    assert sync(client, feed("Cotton"))["unchanged"] == 1
+
+    report = sync(client, feed("Cotton"), schema_attributes=["Material", "Fit"])
+    assert report["changed"] == 1
+
+    monkeypatch.setattr(models, "TARGETED_PROMPT_VERSION", "targeted-v-next")
+    assert sync(client, feed("Cotton"), schema_attributes=["Material", "Fit"])["changed"] == 1
+
+
+def test_failures_are_retried_and_prune_removes_missing_skus(monkeypatch, tmp_path):
+    client, fake = make_client(monkeypatch, tmp_path)
+    report = sync(client, feed("Cotton", "Wool"), schema_attributes=None)  # no schema: both fail
+    assert report["failed"] == 2
+    assert all(r["error"] for r in report["results"])
+
+    assert sync(client, feed("Cotton", "Wool"))["new"] == 2
+    report = sync(client, feed("Cotton") + feed("Cotton")[:1], prune=True)
+    assert counts(report) == {"total": 2, "unchanged": 1, "new": 0, "changed": 0, "failed": 1, "removed": 1}
+    assert report["results"][0]["error"] == "Duplicate SKU in feed"
+
+
+def test_large_sync_runs_as_a_job_that_stores_each_sku(monkeypatch, tmp_path):
+    async def noop():
+        return None
+
+    client, fake = make_client(monkeypatch, tmp_path)
+    monkeypatch.setattr(main, "startup_openai_client", noop)
+    monkeypatch.setattr(main, "shutdown_openai_client", noop)
+    monkeypatch.setattr(catalog, "SYNC_INLINE_MAX_ITEMS", 2)
+    monkeypatch.setattr(catalog, "JOBS_ENABLED", True)
+    monkeypatch.setattr(jobs, "_runner", JobRunner(JobStore(str(tmp_path / "jobs.sqlite3")), workers=2))
+
+    with client:
+        report = sync(client, feed("Cotton", "Wool", "Linen"))
+        assert counts(report) == {"total": 3, "unchanged": 0, "new": 3, "changed": 0, "failed": 0, "removed": 0}
+        assert report["results"] == [] and report["job"]["total"] == 3
+
+        deadline = time.monotonic() + 5
+        while client.get(f"/jobs/{report['job']['id']}", headers=HEADERS).json()["status"] != "completed":
+            assert time.monotonic() < deadline
+            time.sleep(0.02)
+
+        assert client.get("/skus/sku-2", params={"mode": "targeted"}, headers=HEADERS).status_code == 200
+        assert sync(client, feed("Cotton", "Wool", "Linen"))["unchanged"] == 3
+    assert len(fake.calls) == 3
+
+
+def test_sync_requires_skus(monkeypatch, tmp_path):
+    client, _ = make_client(monkeypatch, tmp_path)
+    body = {"mode": "basic", "items": [{"title": "t", "description": "d"}]}
+    assert client.post("/sync", json=body, headers=HEADERS).status_code == 422
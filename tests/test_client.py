@@ -0,0 +1,43 @@
+import asyncio
+
+from backend import client as client_module
+
+
+def test_async_client_is_shared_and_closed(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(client_module, "_async_client", None)
+
+    async def scenario():
+        first = client_module.get_async_openai_client()
+        second = client_module.get_async_openai_client()
+        assert first is second
+        await client_module.shutdown_openai_client()
+        assert client_module._async_client is None
+        assert first.is_closed()
+
+    asyncio.run(scenario())
+
+
+def test_warm_up_swallows_failures():
+    class Models:
+        async def list(self):
+            raise ConnectionError("offline")
+
+    class Client:
+        models = Models()
+
+    assert asyncio.run(client_module.warm_up(Client(), connections=3)) == 0
+    assert asyncio.run(client_module.warm_up(Client(), connections=0)) == 0
+
+
+def test_sync_client_keeps_sdk_retries(monkeypatch):
+    monkeypatch.setattr(client_module, "OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(client_module, "_sync_client", None)
+
+    sync_client = client_module.get_openai_client()
+    try:
+        # The sync path does not go through the outbound scheduler's retries
+        assert sync_client.max_retries == client_module.OPENAI_SYNC_MAX_RETRIES == 2
+    finally:
+        sync_client.close()
+        client_module._sync_client = None
@@ -0,0 +1,156 @@
+import asyncio
+
+import pytest
+
+from backend import hedging, models
+from backend.hedging import Hedger, LatencyTracker
+from conftest import FakeAsyncClient
+
+
+def warmed_hedger(latency=0.01, samples=20, **kwargs):
+    hedger = Hedger(min_samples=samples, min_delay=0.0, **kwargs)
+    for _ in range(samples):
+        hedger.tracker("m").record(latency)
+        hedger.recent.append(False)
+    return hedger
+
+
+def test_percentile_is_nearest_rank():
+    tracker = LatencyTracker(size=100)
+    for value in range(1, 101):
+        tracker.record(value / 100)
+    assert tracker.percentile(95) == 0.95
+    assert tracker.percentile(50) == 0.5
+    assert LatencyTracker().percentile(95) is None
+
+
+def test_no_hedge_until_enough_samples():
+    hedger = Hedger(min_samples=5, max_rate=1.0)
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    assert asyncio.run(hedger.run(call, key="m")) == "ok"
+    assert len(calls) == 1
+    assert hedger.hedged == 0
+    assert len(hedger.tracker("m").samples) == 1
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    hedger = warmed_hedger(max_rate=1.0)
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return "slow"
+
+    async def fast():
+        return "fast"
+
+    assert asyncio.run(hedger.run(slow, fast, key="m")) == "fast"
+    assert hedger.hedged == 1
+    assert hedger.hedge_wins == 1
+    assert cancelled == [True]
+
+
+def test_failed_hedge_falls_back_to_primary():
+    hedger = warmed_hedger(max_rate=1.0)
+
+    async def primary():
+        await asyncio.sleep(0.05)
+        return "primary"
+
+    async def broken():
+        raise ValueError("invalid")
+
+    assert asyncio.run(hedger.run(primary, broken, key="m")) == "primary"
+    assert hedger.primary_wins == 1
+
+
+def test_both_failing_raises_primary_error():
+    hedger = warmed_hedger(max_rate=1.0)
+
+    async def primary():
+        await asyncio.sleep(0.05)
+        raise KeyError("primary")
+
+    async def broken():
+        raise ValueError("hedge")
+
+    with pytest.raises(KeyError):
+        asyncio.run(hedger.run(primary, broken, key="m"))
+
+
+def test_hedge_rate_is_capped():
+    hedger = warmed_hedger(max_rate=0.02, samples=100, percentile=50)
+
+    async def slow():
+        await asyncio.sleep(0.03)
+        return "ok"
+
+    async def scenario():
+        for _ in range(10):
+            await hedger.run(slow, key="m")
+
+    asyncio.run(scenario())
+    # About 110 calls in the window at a 2% cap allow two hedges
+    assert hedger.hedged == 2
+    assert hedger.capped == 8
+
+
+def test_budgets_are_per_endpoint(monkeypatch):
+    monkeypatch.setattr(hedging, "HEDGE_ENDPOINT_RATES", {"/extract": 0.2})
+    with hedging.endpoint("/extract"):
+        assert hedging.get_hedger().max_rate == 0.2
+    assert hedging.get_hedger("/extract-hybrid").max_rate == hedging.HEDGE_MAX_RATE
+    assert set(hedging.hedging_stats()) == {"/extract", "/extract-hybrid"}
+
+
+def test_completion_calls_are_hedged_when_enabled(monkeypatch):
+    monkeypatch.setattr(hedging, "HEDGE_ENABLED", True)
+    hedger = warmed_hedger(max_rate=1.0)
+    hedger.trackers[models.EXTRACTION_MODEL] = hedger.trackers.pop("m")
+    monkeypatch.setattr(hedging, "_hedgers", {"default": hedger})
+
+    delays = iter([1.0, 0.0])
+
+    client = FakeAsyncClient(lambda kwargs: {"attributes": [{"name": "Colour", "value": ["Red"]}]})
+    original = client.completions.create
+
+    async def create(**kwargs):
+        await asyncio.sleep(next(delays))
+        return await original(**kwargs)
+
+    client.completions.create = create
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+
+    result = asyncio.run(models.run_extraction_basic_async("Plain T-shirt", "Cotton"))
+    assert result.attributes[0].value == ["Red"]
+    assert hedger.hedge_wins == 1
+
+
+def test_cached_calls_are_hedged_as_the_calling_endpoint(monkeypatch):
+    monkeypatch.setattr(hedging, "HEDGE_ENABLED", True)
+    hedgers = {}
+    monkeypatch.setattr(hedging, "_hedgers", hedgers)
+    client = FakeAsyncClient(lambda kwargs: {"attributes": [{"name": "Colour", "value": ["Red"]}]})
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+
+    async def call(path, title):
+        with hedging.endpoint(path):
+            return await models.run_extraction_basic_async(title, "Cotton")
+
+    async def scenario():
+        await call("/extract", "Plain T-shirt")
+        await call("/extract-targeted", "Striped T-shirt")
+
+    asyncio.run(scenario())
+    assert set(hedgers) == {"/extract", "/extract-targeted"}
+    assert all(len(hedger.recent) == 1 for hedger in hedgers.values())
@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+import pytest
+
+from backend import models
+from conftest import FakeAsyncClient
+
+BASIC = {"attributes": [{"name": "Material", "value": ["Cotton"]}]}
+TARGETED = {"attributes": [{"name": "Colour", "value": ["Red"]}]}
+
+
+def user_text(kwargs):
+    return kwargs["messages"][1]["content"][0]["text"]
+
+
+def fake_handler(fail_stage=None):
+    def handler(kwargs):
+        text = user_text(kwargs)
+        if "Targeted extraction JSON" in text:
+            return {"attributes": [{"name": "Colour", "value": ["Red"], "method": "targeted"}]}
+        stage = "targeted" if "Attributes:" in text else "non targeted"
+        if stage == fail_stage:
+            raise RuntimeError(f"{stage} failed")
+        return TARGETED if stage == "targeted" else BASIC
+    return handler
+
+
+def test_first_stages_run_concurrently(monkeypatch):
+    client = FakeAsyncClient(fake_handler(), delay=0.2)
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+
+    start = time.perf_counter()
+    result = asyncio.run(models.run_hybrid_pipeline_async("Plain T-shirt", "Cotton", ["Colour"]))
+    elapsed = time.perf_counter() - start
+
+    # Unambiguous outputs are merged locally, so only the two overlapping stages hit the LLM
+    assert len(client.calls) == 2
+    assert result.failed_stages == []
+    assert elapsed < 0.35
+    assert [(a.name, a.method) for a in result.attributes] == [("Colour", "targeted"), ("Material", "non targeted")]
+
+
+def test_llm_merge_mode_calls_merge_prompt(monkeypatch):
+    client = FakeAsyncClient(fake_handler())
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+    monkeypatch.setattr(models, "HYBRID_MERGE_MODE", "llm")
+
+    asyncio.run(models.run_hybrid_pipeline_async("Plain T-shirt", "Cotton", ["Colour"]))
+    assert len(client.calls) == 3
+    assert client.calls[-1]["model"] == "gpt-4o-mini"
+
+
+def test_one_failed_stage_returns_partial_result(monkeypatch):
+    client = FakeAsyncClient(fake_handler(fail_stage="targeted"))
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+
+    result = asyncio.run(models.run_hybrid_pipeline_async("Plain T-shirt", "Cotton", ["Colour"]))
+    assert result.failed_stages == ["targeted"]
+    assert result.attributes
+
+
+def test_both_stages_failing_raises(monkeypatch):
+    def handler(kwargs):
+        raise RuntimeError("down")
+
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: FakeAsyncClient(handler))
+    with pytest.raises(RuntimeError):
+        asyncio.run(models.run_hybrid_pipeline_async("Plain T-shirt", "Cotton", ["Colour"]))
+
+
+def test_description_is_preprocessed_once(monkeypatch):
+    client = FakeAsyncClient(fake_handler())
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+    calls = []
+    preprocess = models.preprocess_description
+    monkeypatch.setattr(models, "preprocess_description", lambda text: calls.append(text) or preprocess(text))
+
+    asyncio.run(models.run_hybrid_pipeline_async("Plain T-shirt", "<p>Cotton &lt;5% elastane</p>", ["Colour"]))
+
+    assert calls == ["<p>Cotton &lt;5% elastane</p>"]
+    assert all("Cotton <5% elastane" in user_text(kwargs) for kwargs in client.calls)
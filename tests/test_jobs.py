@@ -0,0 +1,190 @@
+import asyncio
+import json
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+from backend import jobs, models
+from backend.admission import DeadlineExceeded
+from backend.jobs import JobRunner, JobStore
+from backend.schemas import BatchItem
+from conftest import FakeAsyncClient
+from test_api import HEADERS
+
+BASIC = {"attributes": [{"name": "Colour", "value": ["Red"]}]}
+
+
+def items(count):
+    return [BatchItem(id=f"sku-{i}", title=f"Plain T-shirt {i}", description="Cotton") for i in range(count)]
+
+
+async def wait_until_complete(store, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while store.get_job(job_id).status != "completed":
+        assert time.monotonic() < deadline, "job did not complete"
+        await asyncio.sleep(0.01)
+    return store.get_job(job_id)
+
+
+def test_store_checkpoints_each_item_once(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job = store.create_job("basic", items(2))
+    assert (job.status, job.total, job.completed) == ("queued", 2, 0)
+
+    pending = store.pending_items(10)
+    assert [entry[1] for entry in pending] == [0, 1]
+    assert store.pending_items(10, exclude={(job.id, 0)})[0][1] == 1
+
+    assert store.complete_item(job.id, 1, '{"index": 1}', failed=False)
+    assert not store.complete_item(job.id, 1, '{"index": 1}', failed=False)
+    assert store.get_job(job.id).status == "running"
+    assert store.complete_item(job.id, 0, '{"index": 0}', failed=True)
+
+    job = store.get_job(job.id)
+    assert (job.status, job.succeeded, job.failed) == ("completed", 1, 1)
+    assert [seq for seq, _ in store.results(job.id)] == [1, 2]
+    assert store.results(job.id, after=1) == [(2, '{"index": 0}')]
+
+
+def test_runner_processes_jobs_and_records_failures(tmp_path, monkeypatch):
+    client = FakeAsyncClient(lambda kwargs: BASIC)
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+
+    async def scenario():
+        runner = JobRunner(store, workers=3)
+        runner.start()
+        job = await runner.submit("targeted", items(4))  # no schema: every item fails
+        basic = await runner.submit("basic", items(5))
+        done = [await wait_until_complete(store, job.id), await wait_until_complete(store, basic.id)]
+        lines = [line async for line in runner.stream_results(basic.id)]
+        await runner.stop()
+        return done, lines
+
+    (targeted, basic), lines = asyncio.run(scenario())
+    assert targeted.failed == 4
+    assert basic.succeeded == 5
+    assert sorted(json.loads(line)["id"] for line in lines) == [f"sku-{i}" for i in range(5)]
+    assert len(client.completions.calls) == 5
+
+
+def test_runner_keeps_sqlite_work_off_the_event_loop(tmp_path, monkeypatch):
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: FakeAsyncClient(lambda kwargs: BASIC))
+    loop_thread = threading.get_ident()
+    calls = set()
+
+    def recorded(method):
+        def call(self, *args, **kwargs):
+            calls.add((method.__name__, threading.get_ident() == loop_thread))
+            return method(self, *args, **kwargs)
+        return call
+
+    class RecordingStore(JobStore):
+        create_job = recorded(JobStore.create_job)
+        get_job = recorded(JobStore.get_job)
+        pending_items = recorded(JobStore.pending_items)
+        complete_item = recorded(JobStore.complete_item)
+        results = recorded(JobStore.results)
+
+    store = RecordingStore(str(tmp_path / "jobs.sqlite3"))
+
+    async def scenario():
+        runner = JobRunner(store, workers=2)
+        runner.start()
+        job = await runner.submit("basic", items(3))
+        lines = [line async for line in runner.stream_results(job.id)]
+        await runner.stop()
+        return lines
+
+    assert len(asyncio.run(scenario())) == 3
+    assert {name for name, _ in calls} == {"create_job", "get_job", "pending_items", "complete_item", "results"}
+    assert [name for name, on_loop in calls if on_loop] == []
+
+
+def test_jobs_resume_without_redoing_finished_items(tmp_path, monkeypatch):
+    client = FakeAsyncClient(lambda kwargs: BASIC)
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+    path = str(tmp_path / "jobs.sqlite3")
+
+    # A previous process finished two items, then died
+    before = JobStore(path)
+    job = before.create_job("basic", items(5))
+    before.complete_item(job.id, 0, '{"index": 0}', failed=False)
+    before.complete_item(job.id, 3, '{"index": 3}', failed=False)
+    before.close()
+
+    async def scenario():
+        runner = JobRunner(JobStore(path), workers=2)
+        runner.start()
+        done = await wait_until_complete(runner.store, job.id)
+        await runner.stop()
+        return done
+
+    assert asyncio.run(scenario()).succeeded == 5
+    titles = sorted(call["messages"][1]["content"][0]["text"].split("\n")[0] for call in client.completions.calls)
+    assert titles == ["Plain T-shirt 1", "Plain T-shirt 2", "Plain T-shirt 4"]
+
+
+def test_transient_failures_are_retried_a_bounded_number_of_times(tmp_path, monkeypatch):
+    def handler(kwargs):
+        title = kwargs["messages"][1]["content"][0]["text"].split("\n")[0]
+        # Item 0 recovers on its third attempt, item 1 never does
+        if title.endswith("1") or sum(title in str(call["messages"]) for call in client.calls) < 3:
+            raise DeadlineExceeded("Request deadline exceeded")
+        return BASIC
+
+    client = FakeAsyncClient(handler)
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+    monkeypatch.setattr(jobs, "JOBS_RETRY_BACKOFF", 0.0)
+    monkeypatch.setattr(jobs, "JOBS_MAX_ATTEMPTS", 4)
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+
+    async def scenario():
+        runner = JobRunner(store, workers=2)
+        runner.start()
+        job = await runner.submit("basic", items(2))
+        done = await wait_until_complete(store, job.id)
+        lines = [json.loads(line) async for line in runner.stream_results(job.id)]
+        await runner.stop()
+        return done, lines
+
+    done, lines = asyncio.run(scenario())
+    assert (done.succeeded, done.failed) == (1, 1)
+    assert [line["error"] for line in sorted(lines, key=lambda line: line["index"])] == [
+        None, "DeadlineExceeded: Request deadline exceeded"
+    ]
+    assert len(client.calls) == 3 + 4
+
+
+def test_job_endpoints(tmp_path, monkeypatch):
+    async def noop():
+        return None
+
+    fake = FakeAsyncClient(lambda kwargs: BASIC)
+    monkeypatch.setattr(main, "API_KEY", "test-key")
+    monkeypatch.setattr(main, "startup_openai_client", noop)
+    monkeypatch.setattr(main, "shutdown_openai_client", noop)
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: fake)
+    monkeypatch.setattr(jobs, "_runner", JobRunner(JobStore(str(tmp_path / "jobs.sqlite3")), workers=2))
+
+    with TestClient(main.app) as client:
+        body = {"mode": "basic", "items": [item.model_dump() for item in items(3)]}
+        assert client.post("/jobs", json=body, headers={"x-api-key": "wrong"}).status_code == 403
+        resp = client.post("/jobs", json=body, headers=HEADERS)
+        assert resp.status_code == 202
+        job_id = resp.json()["id"]
+
+        deadline = time.monotonic() + 5
+        while client.get(f"/jobs/{job_id}", headers=HEADERS).json()["status"] != "completed":
+            assert time.monotonic() < deadline
+            time.sleep(0.02)
+
+        status = client.get(f"/jobs/{job_id}", headers=HEADERS).json()
+        assert (status["total"], status["completed"], status["succeeded"]) == (3, 3, 3)
+
+        lines = client.get(f"/jobs/{job_id}/results", headers=HEADERS).text.splitlines()
+        assert len(lines) == 3
+        assert len(client.get(f"/jobs/{job_id}/results?after=2", headers=HEADERS).text.splitlines()) == 1
+        assert client.get("/jobs/missing", headers=HEADERS).status_code == 404
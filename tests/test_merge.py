@@ -0,0 +1,42 @@
+from backend.merge import merge_outputs, find_ambiguities, tidy_values, values_match
+from backend.schemas import ExtractResponse
+
+
+def test_tidy_values_drops_na_and_folds_case_and_hyphens():
+    assert tidy_values(["T-Shirt", "t shirt", "N/A", "tshirt", " Red ", "red"]) == ["T-Shirt", "Red"]
+
+
+def test_values_with_different_numbers_are_not_folded():
+    assert not values_match("10 cm", "12 cm")
+    assert values_match("Stainless-Steel", "stainless steel")
+
+
+def test_merge_prefers_targeted_and_tags_methods():
+    non_targeted = ExtractResponse(attributes=[
+        {"name": "Color", "value": ["red", "Blue"]},
+        {"name": "Material", "value": ["Cotton"]},
+        {"name": "Fit", "value": ["N/A"]},
+    ])
+    targeted = {"attributes": [
+        {"name": "Colour", "value": ["Red"]},
+        {"name": "Size", "value": ["N/A"]},
+    ]}
+
+    merged = merge_outputs(non_targeted, targeted)
+
+    assert [a.model_dump() for a in merged.attributes] == [
+        {"name": "Colour", "value": ["Red", "Blue"], "method": "non targeted; targeted"},
+        {"name": "Material", "value": ["Cotton"], "method": "non targeted"},
+    ]
+
+
+def test_ambiguities():
+    targeted = {"attributes": [{"name": "Colour", "value": ["Red"]}, {"name": "Max Load", "value": ["10 kg"]}]}
+    agreeing = {"attributes": [{"name": "colour", "value": ["RED"]}]}
+    conflicting = {"attributes": [{"name": "Colour", "value": ["Blue"]}]}
+    near_name = {"attributes": [{"name": "Max Loading", "value": ["10 kg"]}, {"name": "Pack Qty", "value": ["10"]}]}
+
+    assert find_ambiguities(agreeing, targeted) == []
+    assert find_ambiguities(conflicting, targeted) == ["conflicting values for 'Colour'"]
+    assert find_ambiguities(conflicting, targeted, conflicts_are_ambiguous=False) == []
+    assert find_ambiguities(near_name, targeted) == ["similar names 'Max Load' / 'Max Loading'"]
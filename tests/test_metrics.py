@@ -0,0 +1,84 @@
+import json
+
+from prometheus_client import REGISTRY
+
+from backend.metrics import server_timing_header, stage, stage_timings
+from test_api import HEADERS, make_client
+
+TARGETED = {"attributes": [{"name": "Material", "value": ["Cotton"]}]}
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_stage_times_accumulate_for_server_timing():
+    token = stage_timings.set({})
+    try:
+        with stage("basic"):
+            pass
+        with stage("basic"):
+            pass
+        timings = stage_timings.get()
+    finally:
+        stage_timings.reset(token)
+    assert list(timings) == ["basic"]
+    header = server_timing_header({"basic": 0.0123}, 0.05)
+    assert header == "basic;dur=12.3, total;dur=50.0"
+
+
+def test_hybrid_request_reports_stages_tokens_and_latency(monkeypatch):
+    client, _ = make_client(
+        monkeypatch, lambda kwargs: TARGETED if "Material" in json.dumps(kwargs["messages"]) else {"attributes": []}
+    )
+    before_tokens = sample("llm_tokens_total", model="gpt-4.1-mini", kind="prompt")
+    before_requests = sample(
+        "http_request_duration_seconds_count", method="POST", endpoint="/extract-hybrid", status="200"
+    )
+
+    resp = client.post(
+        "/extract-hybrid",
+        json={"title": "Plain T-shirt", "description": "Soft", "schema_attributes": ["Material"]},
+        headers=HEADERS,
+    )
+    assert resp.status_code == 200
+    timing = resp.headers["server-timing"]
+    for name in ("preprocess", "basic", "targeted", "merge", "llm", "total"):
+        assert f"{name};dur=" in timing
+
+    # Two first-stage calls, 10 prompt tokens each in the fake usage
+    assert sample("llm_tokens_total", model="gpt-4.1-mini", kind="prompt") == before_tokens + 20
+    assert sample(
+        "http_request_duration_seconds_count", method="POST", endpoint="/extract-hybrid", status="200"
+    ) == before_requests + 1
+    assert sample("http_requests_in_flight", method="POST", endpoint="/extract-hybrid") == 0
+
+
+def test_errors_are_counted_by_type(monkeypatch):
+    def fail(kwargs):
+        raise ValueError("boom")
+
+    client, _ = make_client(monkeypatch, fail)
+    before = sample("llm_errors_total", model="gpt-4.1-mini", type="ValueError")
+    before_http = sample("http_errors_total", endpoint="/extract", type="http_403")
+
+    client.post("/extract", json={"title": "t", "description": "d"}, headers={"x-api-key": "wrong"})
+    try:
+        client.post("/extract", json={"title": "t", "description": "d"}, headers=HEADERS)
+    except ValueError:
+        pass
+
+    assert sample("llm_errors_total", model="gpt-4.1-mini", type="ValueError") == before + 1
+    assert sample("http_errors_total", endpoint="/extract", type="http_403") == before_http + 1
+
+
+def test_metrics_endpoint_exposes_prometheus_text(monkeypatch):
+    client, _ = make_client(monkeypatch)
+    client.post("/extract", json={"title": "Plain T-shirt", "description": "Cotton"}, headers=HEADERS)
+
+    assert client.get("/metrics").status_code == 403
+    resp = client.get("/metrics", headers=HEADERS)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert "http_request_duration_seconds_bucket" in resp.text
+    assert 'result_cache_lookups_total{result="miss"}' in resp.text
@@ -0,0 +1,67 @@
+import asyncio
+import json
+
+from backend import models, batch
+from backend.packing import plan_packs, run_pack_async, build_packed_request
+from backend.schemas import BatchItem
+from conftest import FakeAsyncClient
+
+
+def packed_handler(drop=None):
+    def handler(kwargs):
+        schema = kwargs["response_format"]["json_schema"]
+        if schema["name"] != "packed_attributes":
+            return {"attributes": [{"name": "Source", "value": ["single"]}]}
+        ids = schema["schema"]["required"]
+        return {pid: {"attributes": [{"name": "Source", "value": [pid]}]} for pid in ids if pid != drop}
+    return handler
+
+
+def test_plan_packs_adapts_to_token_length():
+    short = [BatchItem(title=f"Item {i}", description="short") for i in range(5)]
+    long = BatchItem(title="Long", description="word " * 2000)
+    items = short[:2] + [long] + short[2:]
+    packs = plan_packs("basic", items, [None] * len(items), max_items=2)
+    assert packs == [[2], [0, 1], [3, 4], [5]]
+
+
+def test_packed_schema_is_keyed_by_product_id():
+    request = build_packed_request("targeted", [BatchItem(title="a", description="b")] * 2, [["Colour"], ["Size"]])
+    schema = request["response_format"]["json_schema"]["schema"]
+    assert schema["required"] == ["product_1", "product_2"]
+    assert 'Attributes: ["Size"]\nTitle: ' in request["messages"][1]["content"][0]["text"]
+
+
+def test_pack_splits_results_and_falls_back_for_missing_items(monkeypatch):
+    client = FakeAsyncClient(packed_handler(drop="product_2"))
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+    # The fallback reuses the pack's preprocessing instead of cleaning the text again
+    monkeypatch.setattr(models, "preprocess_description", None)
+    items = [BatchItem(title=f"Item {i}", description="Cotton. Free delivery on all UK orders.") for i in range(3)]
+
+    results = asyncio.run(run_pack_async("basic", items, [None] * 3))
+
+    assert [r.attributes[0].value[0] for r in results] == ["product_1", "single", "product_3"]
+    assert len(client.calls) == 2
+    assert results[1].tokens_saved == results[0].tokens_saved > 0
+
+
+def test_invalid_packed_output_falls_back_to_single_calls(monkeypatch):
+    client = FakeAsyncClient(lambda kwargs: "not json" if "packed" in json.dumps(kwargs) else
+                             {"attributes": [{"name": "Source", "value": ["single"]}]})
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+    items = [BatchItem(title=f"Item {i}", description="x") for i in range(2)]
+
+    results = asyncio.run(run_pack_async("targeted", items, [["Colour"], ["Colour"]]))
+    assert all(r.attributes[0].value == ["single"] for r in results)
+
+
+def test_packed_batch_uses_fewer_calls(monkeypatch):
+    client = FakeAsyncClient(packed_handler())
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+    items = [BatchItem(id=str(i), title=f"Item {i}", description="x") for i in range(10)]
+
+    response = asyncio.run(batch.run_batch("basic", items, pack=True))
+    assert response.succeeded == 10
+    assert [r.id for r in response.results] == [str(i) for i in range(10)]
+    assert len(client.calls) == 2
@@ -0,0 +1,74 @@
+import asyncio
+
+from backend import models
+from backend.preprocess import preprocess_description
+from conftest import FakeAsyncClient
+
+HTML_DESCRIPTION = """<div><p>Great drill!&nbsp; Great drill! Perfect for DIY.</p>
+<p>FREE DELIVERY on orders over £50</p>
+<h3>Specifications</h3>
+<table><tr><td>Voltage</td><td>18V</td></tr><tr><td>Weight</td><td>1.2 kg</td></tr></table>
+<p>30-day returns policy applies.</p><script>var tracking = 1;</script></div>"""
+
+
+def test_markup_boilerplate_and_repeats_are_removed():
+    result = preprocess_description(HTML_DESCRIPTION)
+    assert result.text == "Great drill! Perfect for DIY.\nSpecifications\nVoltage | 18V\nWeight | 1.2 kg"
+    assert result.tokens_saved > 0
+
+
+def test_boilerplate_sentences_are_dropped_from_single_line_descriptions():
+    cases = {
+        "Cordless drill 18V with two batteries, colour blue. Free delivery on all UK orders.":
+            "Cordless drill 18V with two batteries, colour blue.",
+        "Oil-filled radiator, 3000 W. Contact us for trade pricing.": "Oil-filled radiator, 3000 W.",
+        "Solid oak dining table. Add to cart today! Dimensions: 180 x 90 x 40 cm":
+            "Solid oak dining table. Dimensions: 180 x 90 x 40 cm",
+    }
+    for description, expected in cases.items():
+        result = preprocess_description(description)
+        assert result.text == expected
+        assert 0 < result.tokens_saved < result.original_tokens
+
+
+def test_preprocessing_is_idempotent():
+    once = preprocess_description(HTML_DESCRIPTION).text
+    again = preprocess_description(once)
+    assert again.text == once
+    assert again.tokens_saved == 0
+
+
+def test_bare_angle_brackets_in_specs_are_kept():
+    description = "Standby power <0.5 W\nColour: Black\nWeight: 2 kg\nEfficiency >90%"
+    result = preprocess_description(description)
+    assert result.text == description
+    assert preprocess_description(result.text).text == description
+
+
+def test_escaped_comparisons_are_decoded_once_and_kept():
+    result = preprocess_description("<p>&lt;5W standby, &gt;90% efficiency</p>")
+    assert result.text == "<5W standby, >90% efficiency"
+    assert preprocess_description(result.text).text == result.text
+
+
+def test_trim_keeps_spec_block_within_budget():
+    description = (
+        "Our best seller.\n"
+        + "This product will change the way you think about cleaning your home forever. " * 50
+        + "\nSpecifications\nVoltage: 18V\nCapacity: 2 L\n"
+    )
+    result = preprocess_description(description, max_tokens=40)
+    assert result.tokens <= 40
+    assert "Voltage: 18V" in result.text
+    assert "Capacity: 2 L" in result.text
+
+
+def test_model_functions_send_cleaned_text_and_report_savings(monkeypatch):
+    client = FakeAsyncClient(lambda kwargs: {"attributes": [{"name": "Voltage", "value": ["18V"]}]})
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+
+    result = asyncio.run(models.run_extraction_basic_async("Cordless Drill", HTML_DESCRIPTION))
+
+    prompt = client.calls[0]["messages"][1]["content"][0]["text"]
+    assert "<td>" not in prompt and "FREE DELIVERY" not in prompt
+    assert result.tokens_saved == preprocess_description(HTML_DESCRIPTION).tokens_saved
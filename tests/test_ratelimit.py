@@ -0,0 +1,100 @@
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+from backend import models, ratelimit
+from backend.ratelimit import OutboundScheduler, TokenBucket, parse_reset, priority, PRIORITY_BATCH
+from conftest import FakeAsyncClient
+
+
+def rate_limit_error(retry_after="0"):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(429, request=request, headers={"retry-after": retry_after})
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+def test_parse_reset_durations():
+    assert parse_reset("20ms") == pytest.approx(0.02)
+    assert parse_reset("6m0s") == 360
+    assert parse_reset("1.5s") == 1.5
+    assert parse_reset(None) is None
+
+
+def test_bucket_sync_from_headers():
+    scheduler = OutboundScheduler(rpm=100, tpm=1000)
+    scheduler.observe_headers({
+        "x-ratelimit-limit-requests": "60",
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-limit-tokens": "5000",
+    })
+    assert scheduler.requests.capacity == 60
+    assert scheduler.requests.wait_time(1) > 0
+    assert scheduler.tokens.capacity == 5000
+
+
+def test_interactive_requests_go_before_batch():
+    async def scenario():
+        # 6000 RPM refills one request slot every 10ms
+        scheduler = OutboundScheduler(rpm=6000, tpm=10 ** 6)
+        scheduler.requests.level = 0
+        order = []
+
+        async def call(name, level):
+            await scheduler.acquire(1, level)
+            order.append(name)
+
+        batch = asyncio.ensure_future(call("batch", PRIORITY_BATCH))
+        await asyncio.sleep(0)
+        interactive = asyncio.ensure_future(call("interactive", ratelimit.PRIORITY_INTERACTIVE))
+        await asyncio.gather(batch, interactive)
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive", "batch"]
+
+
+def test_batch_priority_context_reaches_the_scheduler():
+    async def scenario():
+        with priority(PRIORITY_BATCH):
+            return await asyncio.create_task(asyncio.sleep(0, result=ratelimit.request_priority.get()))
+
+    assert asyncio.run(scenario()) == PRIORITY_BATCH
+
+
+def test_429_is_retried_then_succeeds(monkeypatch):
+    attempts = []
+
+    def handler(kwargs):
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise rate_limit_error()
+        return {"attributes": [{"name": "Colour", "value": ["Red"]}]}
+
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_BACKOFF_BASE", 0.001)
+    client = FakeAsyncClient(handler, headers={"x-ratelimit-remaining-requests": "499"})
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+
+    result = asyncio.run(models.run_extraction_basic_async("Red T-shirt", "Cotton"))
+    assert result.attributes[0].value == ["Red"]
+    assert len(attempts) == 3
+    assert ratelimit.get_scheduler(models.EXTRACTION_MODEL).retries == 2
+
+
+def test_non_retryable_errors_are_raised_immediately(monkeypatch):
+    attempts = []
+
+    def handler(kwargs):
+        attempts.append(1)
+        raise ValueError("bad output")
+
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: FakeAsyncClient(handler))
+    with pytest.raises(ValueError):
+        asyncio.run(models.run_extraction_basic_async("Red T-shirt", "Cotton"))
+    assert len(attempts) == 1
+
+
+def test_token_bucket_refills_over_a_minute():
+    bucket = TokenBucket(60)
+    bucket.take(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0, abs=0.05)
@@ -0,0 +1,90 @@
+from fastapi.testclient import TestClient
+
+import main
+from backend import models, registry
+from backend.registry import SchemaRegistry, normalize_attributes, render_schema_fragment
+from conftest import FakeAsyncClient
+from test_api import HEADERS
+
+TARGETED = {"attributes": [{"name": "Fit", "value": ["Slim"]}]}
+
+
+def make_client(monkeypatch, tmp_path):
+    fake = FakeAsyncClient(lambda kwargs: TARGETED)
+    monkeypatch.setattr(main, "API_KEY", "test-key")
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: fake)
+    monkeypatch.setattr(registry, "_registry", SchemaRegistry(str(tmp_path / "schemas.sqlite3")))
+    return TestClient(main.app), fake
+
+
+def test_normalization_and_fragment():
+    assert normalize_attributes([" Fit ", "Sleeve  Length", "fit", ""]) == ("Fit", "Sleeve Length")
+    assert render_schema_fragment(("Fit", "Größe")) == 'Attributes: ["Fit", "Größe"]'
+
+
+def test_versions_persist_and_identical_registrations_are_reused(tmp_path):
+    path = str(tmp_path / "schemas.sqlite3")
+    first = SchemaRegistry(path)
+    v1, created = first.register("shirts", ["Fit", "Sleeve Length"])
+    assert (v1.id, created) == ("shirts@v1", True)
+    assert first.register("shirts", ["Fit ", "Sleeve Length"]) == (v1, False)
+    v2, created = first.register("shirts", ["Fit", "Sleeve Length", "Collar"])
+    assert (v2.id, created) == ("shirts@v2", True)
+    first.close()
+
+    reopened = SchemaRegistry(path)
+    assert reopened.get("shirts").id == "shirts@v2"
+    assert reopened.get("shirts@v1").attributes == ["Fit", "Sleeve Length"]
+    assert [s.id for s in reopened.list()] == ["shirts@v2"]
+
+
+def test_registrations_from_other_workers_are_seen(tmp_path):
+    path = str(tmp_path / "schemas.sqlite3")
+    one, other = SchemaRegistry(path), SchemaRegistry(path)
+    assert one.register("shirts", ["Fit"])[0].id == "shirts@v1"
+
+    assert other.get("shirts@v1").attributes == ["Fit"]
+    assert other.register("shirts", ["Fit", "Collar"])[0].id == "shirts@v2"
+    assert one.get("shirts").id == "shirts@v2"
+    assert one.register("shirts", ["Fit", "Collar", "Cuff"])[0].id == "shirts@v3"
+
+
+def test_schema_id_requests_share_the_prompt_prefix(monkeypatch, tmp_path):
+    client, fake = make_client(monkeypatch, tmp_path)
+    resp = client.post("/schemas", json={"name": "shirts", "attributes": ["Fit", "Sleeve Length"]}, headers=HEADERS)
+    assert resp.status_code == 201
+    schema = resp.json()
+    assert client.post("/schemas", json={"name": "shirts", "attributes": ["Fit", "Sleeve Length"]}, headers=HEADERS).status_code == 200
+
+    for title in ("Plain shirt A", "Plain shirt B"):
+        resp = client.post(
+            "/extract-targeted",
+            json={"title": title, "description": "Soft", "schema_id": "shirts"},
+            headers=HEADERS,
+        )
+        assert resp.status_code == 200
+        assert resp.json()["attributes"][0]["name"] == "Fit"
+
+    texts = [call["messages"][1]["content"][0]["text"] for call in fake.calls]
+    assert all(text.startswith(schema["fragment"] + "\n") for text in texts)
+    assert fake.calls[0]["messages"][0] is fake.calls[1]["messages"][0]
+
+
+def test_schema_reference_validation(monkeypatch, tmp_path):
+    client, _ = make_client(monkeypatch, tmp_path)
+    body = {"title": "t", "description": "d"}
+    assert client.post("/extract-hybrid", json=body, headers=HEADERS).status_code == 422
+    both = {**body, "schema_attributes": ["Fit"], "schema_id": "shirts"}
+    assert client.post("/extract-targeted", json=both, headers=HEADERS).status_code == 422
+    assert client.post("/extract-targeted", json={**body, "schema_id": "missing"}, headers=HEADERS).status_code == 404
+    assert client.get("/schemas/missing@v1", headers=HEADERS).status_code == 404
+    assert client.post("/schemas", json={"name": "a@b", "attributes": ["Fit"]}, headers=HEADERS).status_code == 422
+
+
+def test_batch_default_schema_by_id(monkeypatch, tmp_path):
+    client, fake = make_client(monkeypatch, tmp_path)
+    client.post("/schemas", json={"name": "shirts", "attributes": ["Fit"]}, headers=HEADERS)
+    body = {"items": [{"title": "Plain shirt", "description": "Soft"}], "schema_id": "shirts@v1"}
+    resp = client.post("/extract-targeted-batch", json=body, headers=HEADERS).json()
+    assert resp["succeeded"] == 1
+    assert fake.calls[0]["messages"][1]["content"][0]["text"].startswith('Attributes: ["Fit"]')
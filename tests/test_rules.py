@@ -0,0 +1,83 @@
+import asyncio
+
+from backend import models, rules
+from backend.rules import extract_with_rules
+from conftest import FakeAsyncClient
+
+TITLE = "Makita Black Cordless Drill 18V 2 Pack"
+DESCRIPTION = "Specifications\nWeight: 1.5 kg\nChuck Size | 13 mm\nSize 200 x 80 x 220 mm. IP54 rated."
+
+
+def resolve(names, title=TITLE, description=DESCRIPTION):
+    return {name: match.values for name, match in extract_with_rules(title, description, names, 0.9).items()}
+
+
+def test_patterns_and_units():
+    assert resolve(["Voltage", "IP Rating", "Pack Quantity", "Dimensions"]) == {
+        "Voltage": ["18V"],
+        "IP Rating": ["IP54"],
+        "Pack Quantity": ["2"],
+        "Dimensions": ["200 x 80 x 220 mm"],
+    }
+
+
+def test_title_only_matches_are_less_confident_than_stated_specs():
+    matches = extract_with_rules(TITLE, DESCRIPTION, ["Voltage", "IP Rating", "Colour"], 0.0)
+    assert matches["Voltage"].confidence < matches["IP Rating"].confidence == rules.SPEC_CONFIDENCE
+    assert matches["Colour"].values == ["Black"] and matches["Colour"].confidence < 0.9
+
+
+def test_bare_title_words_are_left_to_the_llm():
+    assert resolve(["Colour", "Voltage"], title="Black+Decker 18V Cordless Drill", description="") == {"Voltage": ["18V"]}
+    assert resolve(["Colour"], title="Gold Medal Popcorn Maker", description="") == {}
+    assert resolve(["Material"], title="Oak Furniture Land Gift Card", description="") == {}
+    assert resolve(["Colour"], title="Black+Decker Drill", description="Colour: Orange") == {"Colour": ["Orange"]}
+
+
+def test_5g_is_not_a_weight():
+    assert resolve(["Weight", "Capacity"], title="Samsung Galaxy S24 5G 256GB", description="") == {"Capacity": ["256GB"]}
+    assert resolve(["Weight"], title="Coffee beans 500g", description="") == {"Weight": ["500 g"]}
+
+
+def test_explicit_spec_rows_answer_any_attribute():
+    assert resolve(["Chuck Size", "weight"]) == {"Chuck Size": ["13 mm"], "weight": ["1.5 kg"]}
+
+
+def test_multi_valued_spec_rows_are_split():
+    description = "Size: S, M, L, XL\nColour: Black/White\nVoltage: 220/240V\nWeight: 1,5 kg"
+    assert resolve(["Size", "Colour", "Voltage", "Weight"], title="Shirt", description=description) == {
+        "Size": ["S", "M", "L", "XL"],
+        "Colour": ["Black", "White"],
+        "Voltage": ["220/240V"],
+        "Weight": ["1,5 kg"],
+    }
+
+
+def test_ambiguous_values_are_left_to_the_llm():
+    assert resolve(["Voltage"], title="Drill", description="Works with 12V and 18V batteries") == {}
+    assert resolve(["Material"], title="Drill", description="Steel chuck") == {}
+
+
+def test_fully_resolved_request_skips_the_llm(monkeypatch):
+    client = FakeAsyncClient(lambda kwargs: {"attributes": []})
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+    monkeypatch.setattr(rules, "stats", rules.RuleStats())
+
+    result = asyncio.run(models.run_targeted_prompt_async(TITLE, DESCRIPTION, ["Voltage", "IP Rating"]))
+
+    assert client.calls == []
+    assert [(a.name, a.value, a.source) for a in result.attributes] == [
+        ("Voltage", ["18V"], "rules"),
+        ("IP Rating", ["IP54"], "rules"),
+    ]
+    assert rules.stats.short_circuited == 1
+
+
+def test_only_unresolved_attributes_go_to_the_llm(monkeypatch):
+    client = FakeAsyncClient(lambda kwargs: {"attributes": [{"name": "Brushless", "value": ["Yes"]}]})
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+
+    result = asyncio.run(models.run_targeted_prompt_async(TITLE, DESCRIPTION, ["Brushless", "Voltage"]))
+
+    assert 'Attributes: ["Brushless"]' in client.calls[0]["messages"][1]["content"][0]["text"]
+    assert [(a.name, a.source) for a in result.attributes] == [("Brushless", "llm"), ("Voltage", "rules")]
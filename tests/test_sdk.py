@@ -0,0 +1,121 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import httpx
+import pytest
+
+import main
+from backend import models
+from backend.schemas import CleanedExtractResponse, ExtractResponse
+from client import AsyncExtractionClient, ExtractionAPIError, ExtractionClient
+from conftest import FakeAsyncClient
+
+BASIC = {"attributes": [{"name": "Colour", "value": ["Red"]}]}
+
+
+def handler(kwargs):
+    text = kwargs["messages"][1]["content"][0]["text"]
+    if text.startswith("Attributes:"):
+        return {"attributes": [{"name": "Fit", "value": ["Slim"]}]}
+    return {"attributes": [{"name": "Colour", "value": [text.split()[0]]}]}
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    fake = FakeAsyncClient(handler, delay=0.05)
+    monkeypatch.setattr(main, "API_KEY", "test-key")
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: fake)
+    monkeypatch.setattr(models, "HYBRID_MERGE_MODE", "local")
+    return fake
+
+
+def asgi_client(**kwargs):
+    return AsyncExtractionClient("http://api", api_key="test-key", transport=httpx.ASGITransport(app=main.app), **kwargs)
+
+
+def test_fan_out_returns_typed_results_and_shares_llm_calls(fake):
+    async def scenario():
+        async with asgi_client() as client:
+            return await client.extract_all("Red shirt", "Slim fit", ["Fit"])
+
+    basic, targeted, hybrid = asyncio.run(scenario())
+
+    assert isinstance(basic, ExtractResponse) and isinstance(hybrid, CleanedExtractResponse)
+    assert basic.attributes[0].value == ["Red"]
+    assert [(a.name, a.source) for a in targeted.attributes] == [("Fit", "llm")]
+    assert sorted(a.name for a in hybrid.attributes) == ["Colour", "Fit"]
+    # Concurrent calls are coalesced per endpoint, but the results are cached for all of them
+    assert len(fake.calls) == 4
+    asyncio.run(scenario())
+    assert len(fake.calls) == 4
+
+
+def test_extract_many_splits_into_concurrent_batches(fake):
+    items = [{"id": f"sku-{i}", "title": f"T{i} shirt", "description": "Cotton"} for i in range(5)]
+
+    async def scenario():
+        async with asgi_client(batch_size=2) as client:
+            return await client.extract_many("basic", items)
+
+    results = asyncio.run(scenario())
+
+    assert [(r.index, r.id) for r in results] == [(i, f"sku-{i}") for i in range(5)]
+    assert [r.result.attributes[0].value for r in results] == [[f"T{i}"] for i in range(5)]
+
+
+def test_stream_endpoints(fake):
+    async def scenario():
+        async with asgi_client() as client:
+            events = [event async for event in client.extract_stream("targeted", "Black shirt", "Slim fit", ["Fit"])]
+            streamed = [r async for r in client.stream_many("basic", ({"title": f"T{i}", "description": "d"} for i in range(3)))]
+        return events, streamed
+
+    events, streamed = asyncio.run(scenario())
+
+    assert [event.event for event in events] == ["attribute", "result"]
+    assert isinstance(events[-1].data, ExtractResponse)
+    assert sorted(r.index for r in streamed) == [0, 1, 2]
+
+
+def test_retries_honour_retry_after_then_raise_api_errors():
+    attempts = []
+
+    def respond(request):
+        attempts.append(request.headers.get("x-request-timeout"))
+        if len(attempts) == 1:
+            return httpx.Response(503, headers={"Retry-After": "0"}, json={"detail": "Server busy, retry later"})
+        if request.url.path == "/extract-targeted":
+            return httpx.Response(404, json={"detail": "Unknown schema_id: nope@v1"})
+        return httpx.Response(200, json=BASIC)
+
+    async def scenario():
+        async with AsyncExtractionClient("http://api", transport=httpx.MockTransport(respond), timeout=12) as client:
+            result = await client.extract("t", "d")
+            with pytest.raises(ExtractionAPIError) as error:
+                await client.extract_targeted("t", "d", schema_id="nope@v1")
+        return result, error.value
+
+    result, error = asyncio.run(scenario())
+
+    assert result.attributes[0].name == "Colour"
+    assert attempts[:2] == ["12", "12"]
+    assert error.status_code == 404 and error.detail == "Unknown schema_id: nope@v1"
+
+
+def test_sync_client_runs_on_its_own_loop(fake):
+    with ExtractionClient("http://api", api_key="test-key", transport=httpx.ASGITransport(app=main.app)) as client:
+        result = client.extract("Blue shirt", "Cotton")
+        events = list(client.extract_stream("basic", "Green shirt", "Cotton"))
+
+    assert result.attributes[0].value == ["Blue"]
+    assert json.loads(events[-1].data.model_dump_json())["attributes"][0]["value"] == ["Green"]
+
+
+def test_client_does_not_load_the_server_configuration():
+    script = "import sys, client; print(sorted(m for m in sys.modules if m.startswith('backend')))"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True, cwd=root).stdout
+    assert output.strip() == "['backend', 'backend.schemas']"
@@ -0,0 +1,39 @@
+import asyncio
+import re
+import time
+
+from backend import models
+from backend.models import shard_attributes
+from conftest import FakeAsyncClient
+
+
+def test_shards_are_balanced():
+    names = [f"A{i}" for i in range(11)]
+    shards = shard_attributes(names, 5)
+    assert [len(s) for s in shards] == [4, 4, 3]
+    assert sum(shards, []) == names
+    assert shard_attributes(names, 0) == [names]
+    assert shard_attributes(names, 20) == [names]
+
+
+def echo_requested(kwargs):
+    text = kwargs["messages"][1]["content"][0]["text"]
+    requested = re.search(r"Attributes: \[(.*)\]", text).group(1)
+    names = [n.strip(' "') for n in requested.split(",")]
+    # Answer in reverse, lower-cased, to check ordering and name matching
+    return {"attributes": [{"name": n.lower(), "value": [f"v-{n}"]} for n in reversed(names)]}
+
+
+def test_large_schema_runs_as_parallel_shards(monkeypatch):
+    client = FakeAsyncClient(echo_requested, delay=0.1)
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+    monkeypatch.setattr(models, "TARGETED_SHARD_SIZE", 10)
+    schema = [f"Spec {i}" for i in range(35)]
+
+    start = time.perf_counter()
+    result = asyncio.run(models.run_targeted_prompt_async("Plain widget", "Nothing to see", schema))
+    elapsed = time.perf_counter() - start
+
+    assert len(client.calls) == 4
+    assert elapsed < 0.3
+    assert [a.value[0] for a in result.attributes] == [f"v-{name}" for name in schema]
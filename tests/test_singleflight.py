@@ -0,0 +1,93 @@
+import asyncio
+import contextvars
+
+import pytest
+
+from backend import models
+from backend.singleflight import SingleFlight
+from conftest import FakeAsyncClient
+
+BASIC = {"attributes": [{"name": "Colour", "value": ["Red"]}]}
+
+
+def test_followers_share_the_leader_result():
+    group = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def scenario():
+        return await asyncio.gather(*(group.do("k", work) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["done"] * 5
+    assert len(calls) == 1
+    assert group.stats() == {"leaders": 1, "followers": 4, "in_flight": 0}
+
+
+def test_work_does_not_run_in_the_leader_context():
+    group = SingleFlight()
+    tag = contextvars.ContextVar("tag", default=None)
+
+    async def work():
+        await asyncio.sleep(0.01)
+        return tag.get()
+
+    async def caller(value):
+        tag.set(value)
+        return await group.do("k", work)
+
+    async def scenario():
+        return await asyncio.gather(caller("leader"), caller("follower"))
+
+    assert asyncio.run(scenario()) == [None, None]
+
+
+def test_leader_failure_propagates_to_followers():
+    group = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def scenario():
+        return await asyncio.gather(*(group.do("k", work) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    group = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def scenario():
+        leader = asyncio.ensure_future(group.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(group.do("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == "done"
+
+
+def test_identical_concurrent_extractions_share_one_llm_call(monkeypatch):
+    client = FakeAsyncClient(lambda kwargs: BASIC, delay=0.05)
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+
+    async def scenario():
+        return await asyncio.gather(*(
+            models.run_extraction_basic_async("Red T-shirt", "Cotton", use_cache=False) for _ in range(10)
+        ))
+
+    results = asyncio.run(scenario())
+    assert len(results) == 10
+    assert len(client.calls) == 1
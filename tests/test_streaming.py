@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+from backend import models
+from backend.streaming import AttributeStreamParser, stream_targeted
+from conftest import FakeAsyncClient
+
+HEADERS = {"x-api-key": "test-key"}
+BASIC = {"attributes": [{"name": "Colour", "value": ["Red"]}, {"name": "Note", "value": ["a \"}{\" b"]}]}
+
+
+def parse_events(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_parser_emits_each_attribute_once_it_is_complete():
+    content = json.dumps(BASIC)
+    parser = AttributeStreamParser()
+    emitted = []
+    for i in range(len(content)):
+        items = parser.feed(content[i])
+        emitted.extend((i, item) for item in items)
+
+    # Braces and escaped quotes inside strings do not end an object early
+    assert [item for _, item in emitted] == BASIC["attributes"]
+    assert emitted[0][0] == content.index("}")
+    assert parser.text == content
+
+
+def test_parser_ignores_objects_outside_the_attributes_array():
+    parser = AttributeStreamParser()
+    items = parser.feed('{"meta": {"x": [{"name": "no"}]}, "attributes": [{"name": "yes", "value": []}]}')
+    assert items == [{"name": "yes", "value": []}]
+
+
+def test_extract_stream_sends_attributes_then_the_result(monkeypatch):
+    fake = FakeAsyncClient(lambda kwargs: BASIC)
+    monkeypatch.setattr(main, "API_KEY", "test-key")
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: fake)
+    client = TestClient(main.app)
+    body = {"title": "Red T-shirt", "description": "Cotton"}
+
+    resp = client.post("/extract/stream", json=body, headers=HEADERS)
+
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    events = parse_events(resp.text)
+    assert [name for name, _ in events] == ["attribute", "attribute", "result"]
+    assert events[0][1]["name"] == "Colour"
+    assert [a["name"] for a in events[-1][1]["attributes"]] == ["Colour", "Note"]
+    assert fake.calls[0]["stream"] is True
+
+    # The streamed result was cached: the non-streaming endpoint reuses it
+    assert client.post("/extract", json=body, headers=HEADERS).json()["attributes"][0]["value"] == ["Red"]
+    assert len(fake.calls) == 1
+
+
+def test_targeted_stream_emits_rule_matches_before_the_llm(monkeypatch):
+    fake = FakeAsyncClient(lambda kwargs: {"attributes": [{"name": "Fit", "value": ["Slim"]}]})
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: fake)
+
+    async def collect():
+        return [event async for event in stream_targeted("Shirt", "Slim fit\nColour: Black", ["Fit", "Colour"])]
+
+    events = asyncio.run(collect())
+
+    assert [(name, payload.name, payload.source) for name, payload in events[:2]] == [
+        ("attribute", "Colour", "rules"),
+        ("attribute", "Fit", "llm"),
+    ]
+    assert [(a.name, a.source) for a in events[-1][1].attributes] == [("Fit", "llm"), ("Colour", "rules")]
+
+
+def test_hybrid_stream_reports_partials_and_the_merged_result(monkeypatch):
+    fake = FakeAsyncClient(lambda kwargs: {"attributes": [{"name": "Colour", "value": ["Red"]}]})
+    monkeypatch.setattr(main, "API_KEY", "test-key")
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: fake)
+    monkeypatch.setattr(models, "HYBRID_MERGE_MODE", "local")
+    client = TestClient(main.app)
+    body = {"title": "T-shirt", "description": "Cotton", "schema_attributes": ["Colour"]}
+
+    events = parse_events(client.post("/extract-hybrid/stream", json=body, headers=HEADERS).text)
+
+    partials = [payload for name, payload in events if name == "partial"]
+    assert sorted(p["stage"] for p in partials) == ["non targeted", "targeted"]
+    assert events[-1][0] == "result"
+    assert [(a["name"], a["method"]) for a in events[-1][1]["attributes"]] == [("Colour", "non targeted; targeted")]
+
+
+def test_stream_failure_ends_with_an_error_event(monkeypatch):
+    fake = FakeAsyncClient(lambda kwargs: '{"attributes": [{"name": "Colour", "value": ["Red"]}, {"na')
+    monkeypatch.setattr(main, "API_KEY", "test-key")
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: fake)
+    client = TestClient(main.app)
+
+    events = parse_events(client.post("/extract/stream", json={"title": "t", "description": "d"}, headers=HEADERS).text)
+
+    assert [name for name, _ in events] == ["attribute", "error"]
+    assert events[-1][1]["detail"].startswith("ValidationError")
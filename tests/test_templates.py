@@ -0,0 +1,45 @@
+import copy
+import json
+
+from backend import models, responses
+from backend.packing import build_packed_request, packed_response_format
+from backend.schemas import Attribute, BatchItem, ExtractResponse
+
+
+def test_requests_share_prebuilt_templates():
+    first = models.build_basic_request("Bin", "Steel")
+    second = models.build_targeted_request("Bin", "Steel", ["Material"])
+    assert first["messages"][0] is models.BASIC_SYSTEM_MESSAGE
+    assert second["messages"][0] is models.TARGETED_SYSTEM_MESSAGE
+    assert first["response_format"] is second["response_format"] is models.ATTRIBUTES_RESPONSE_FORMAT
+    assert first["response_format"]["json_schema"]["schema"] is models.ATTRIBUTES_JSON_SCHEMA
+
+
+def test_templates_are_not_mutated_by_building_requests():
+    snapshot = copy.deepcopy((models.BASIC_SYSTEM_MESSAGE, models.ATTRIBUTES_RESPONSE_FORMAT, models.SAMPLING_PARAMS))
+    items = [BatchItem(title="A", description="a"), BatchItem(title="B", description="b")]
+    request = build_packed_request("basic", items, [None, None])
+    models.build_basic_request("Bin", "Steel")
+    assert (models.BASIC_SYSTEM_MESSAGE, models.ATTRIBUTES_RESPONSE_FORMAT, models.SAMPLING_PARAMS) == snapshot
+    assert packed_response_format(2) is request["response_format"]
+
+
+def test_hybrid_request_serializes_outputs_directly():
+    non_targeted = ExtractResponse(attributes=[Attribute(name="Colour", value=["Red"])], tokens_saved=3)
+    targeted = {"attributes": [{"name": "Material", "value": ["Cotton"]}]}
+    request = models.build_hybrid_request("Shirt", "Cotton", non_targeted, targeted)
+    text = request["messages"][1]["content"][0]["text"]
+    assert 'Non targeted extraction JSON: {"attributes":[{"name":"Colour","value":["Red"]}]}' in text
+    assert 'Targeted extraction JSON: {"attributes":[{"name":"Material","value":["Cotton"]}]}' in text
+    assert request["messages"][0] is models.HYBRID_SYSTEM_MESSAGE
+
+
+def test_fast_json_response_with_and_without_orjson(monkeypatch):
+    content = {"attributes": [{"name": "Größe", "value": ["M"]}]}
+    rendered = responses.FastJSONResponse(content).body
+    assert json.loads(rendered) == content
+
+    monkeypatch.setattr(responses, "orjson", None)
+    assert responses.FastJSONResponse(content).body == json.dumps(
+        content, ensure_ascii=False, separators=(",", ":")
+    ).encode()
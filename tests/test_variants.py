@@ -0,0 +1,114 @@
+import asyncio
+
+from backend import models, variants
+from backend.variants import VariantIndex
+from conftest import FakeAsyncClient
+
+DESCRIPTION = (
+    "Classic crew neck t-shirt made from soft combed cotton jersey with a relaxed fit. "
+    "Ribbed collar, taped shoulder seams and a double stitched hem for durability. "
+    "Machine washable at 30 degrees, tumble dry low, do not bleach. Part of our everyday essentials range."
+)
+RED_TITLE = "Everyday Crew Neck T-Shirt Red Size M"
+BLUE_TITLE = "Everyday Crew Neck T-Shirt Blue Size L"
+RED_RESULT = {
+    "attributes": [
+        {"name": "Colour", "value": ["Red"]},
+        {"name": "Size", "value": ["M"]},
+        {"name": "Material", "value": ["Combed Cotton"]},
+        {"name": "Neckline", "value": ["Crew Neck"]},
+    ]
+}
+
+
+def test_variant_is_found_with_the_attributes_tied_to_the_differing_text():
+    index = VariantIndex()
+    index.add(RED_TITLE, DESCRIPTION, RED_RESULT)
+
+    match = index.find(BLUE_TITLE, DESCRIPTION)
+
+    assert match is not None and match.similarity >= 0.85
+    assert match.changed == ["Colour", "Size"]
+
+
+def test_unrelated_and_short_products_are_not_matched():
+    index = VariantIndex()
+    index.add(RED_TITLE, DESCRIPTION, RED_RESULT)
+
+    other = "Cordless drill driver with two speed gearbox, LED work light, 13 mm keyless chuck and a belt clip " * 2
+    assert index.find("Makita Cordless Drill 18V", other) is None
+    assert index.find("Red T-shirt", "Cotton") is None
+    index.add("Red T-shirt", "Cotton", RED_RESULT)
+    assert len(index) == 1
+
+
+def test_eviction_drops_the_oldest_product_from_the_buckets():
+    index = VariantIndex(max_entries=1)
+    index.add(RED_TITLE, DESCRIPTION, RED_RESULT)
+    index.add("Makita Cordless Drill 18V", "Cordless drill driver " + DESCRIPTION.replace("cotton", "steel"), RED_RESULT)
+
+    assert len(index) == 1
+    assert sum(len(bucket) for bucket in index._buckets.values()) == variants.MINHASH_BANDS
+
+
+def test_variant_reuses_shared_attributes_and_only_reextracts_the_rest(monkeypatch):
+    def handler(kwargs):
+        if kwargs["response_format"]["json_schema"]["name"] == "attributes" and "Attributes:" in str(kwargs["messages"]):
+            return {"attributes": [{"name": "Colour", "value": ["Blue"]}, {"name": "Size", "value": ["L"]}]}
+        return RED_RESULT
+
+    client = FakeAsyncClient(handler)
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+
+    asyncio.run(models.run_extraction_basic_async(RED_TITLE, DESCRIPTION))
+    result = asyncio.run(models.run_extraction_basic_async(BLUE_TITLE, DESCRIPTION))
+
+    # One full call for the first product, one targeted call for the attributes tied to the differing words
+    assert len(client.calls) == 2
+    assert 'Attributes: ["Colour", "Size"]' in client.calls[1]["messages"][1]["content"][0]["text"]
+    assert [(a.name, a.value, a.source) for a in result.attributes] == [
+        ("Colour", ["Blue"], "llm"),
+        ("Size", ["L"], "llm"),
+        ("Material", ["Combed Cotton"], "variant"),
+        ("Neckline", ["Crew Neck"], "variant"),
+    ]
+    stats = variants.variant_stats()
+    assert stats["matches"] == 1 and stats["targeted_calls"] == 1
+    assert stats["attributes_reused"] == 2 and stats["attributes_reextracted"] == 2
+
+
+def test_variant_that_only_lost_unrelated_words_is_served_without_any_call(monkeypatch):
+    client = FakeAsyncClient(lambda kwargs: RED_RESULT)
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+
+    asyncio.run(models.run_extraction_basic_async(RED_TITLE, DESCRIPTION + " New season."))
+    result = asyncio.run(models.run_extraction_basic_async(RED_TITLE, DESCRIPTION))
+
+    assert len(client.calls) == 1
+    assert {a.source for a in result.attributes} == {"variant"}
+    assert variants.variant_stats()["full_reuse"] == 1
+
+
+def test_variant_that_gained_words_is_never_fully_reused(monkeypatch):
+    plain = {"attributes": [attribute for attribute in RED_RESULT["attributes"] if attribute["name"] != "Colour"]}
+    client = FakeAsyncClient(lambda kwargs: RED_RESULT if "Red" in str(kwargs["messages"]) else plain)
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+
+    asyncio.run(models.run_extraction_basic_async("Everyday Crew Neck T-Shirt Size M", DESCRIPTION))
+    result = asyncio.run(models.run_extraction_basic_async(RED_TITLE, DESCRIPTION))
+
+    # The new colour word is not in any reusable value, so the variant gets a full extraction
+    assert len(client.calls) == 2
+    assert ("Colour", ["Red"]) in [(a.name, a.value) for a in result.attributes]
+    stats = variants.variant_stats()
+    assert stats["matches"] == 1 and stats["fallbacks"] == 1 and stats["full_reuse"] == 0
+
+
+def test_cache_bypass_skips_variant_reuse(monkeypatch):
+    client = FakeAsyncClient(lambda kwargs: RED_RESULT)
+    monkeypatch.setattr(models, "get_async_openai_client", lambda: client)
+
+    asyncio.run(models.run_extraction_basic_async(RED_TITLE, DESCRIPTION))
+    asyncio.run(models.run_extraction_basic_async(BLUE_TITLE, DESCRIPTION, use_cache=False))
+
+    assert len(client.calls) == 2